@@ -0,0 +1,118 @@
+#apps/core/batch_exports.py
+"""
+Exportação em lote das avaliações em um único ZIP.
+
+O pedido só registra o ExportBatch e enfileira uma tarefa (apps.jobs); o worker
+que a executa distribui a renderização dos arquivos entre processos
+(ProcessPoolExecutor), já que PDF/XLSX são trabalho de CPU e não liberam o GIL.
+Cada arquivo pronto entra no ZIP assim que termina e o progresso é gravado no lote.
+"""
+import logging
+import multiprocessing
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import django
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from .exports import EXPORT_WRITERS
+from apps.jobs.queue import enqueue
+from .models import Evaluation, ExportBatch, sanitize_filename
+
+logger = logging.getLogger(__name__)
+
+EXPORTS_DIR = 'exports'
+
+
+def export_workers():
+    """
+    EXPORT_BATCH_WORKERS = 0 (padrão) usa todos os núcleos; 1 renderiza no próprio processo
+    """
+    workers = getattr(settings, 'EXPORT_BATCH_WORKERS', 0)
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def export_filename(evaluation, export_format):
+    period = evaluation.period.strftime('%Y%m') if evaluation.period else 'sem-periodo'
+    company = sanitize_filename(evaluation.company.name) or 'empresa'
+    return f"{period}_{company}_avaliacao_{evaluation.id}.{export_format}"
+
+
+def render_evaluation_file(evaluation_id, export_format, directory):
+    """
+    Renderiza uma avaliação em directory e devolve o caminho do arquivo.
+    Roda dentro dos processos do pool (ou no próprio processo quando há um só worker).
+    """
+    writer, _ = EXPORT_WRITERS[export_format]
+    evaluation = Evaluation.objects.select_related('company', 'form').get(pk=evaluation_id)
+    path = os.path.join(directory, export_filename(evaluation, export_format))
+    with open(path, 'wb') as fileobj:
+        writer(evaluation, fileobj)
+    return path
+
+
+def _render_all(evaluation_ids, export_format, directory):
+    workers = min(export_workers(), len(evaluation_ids))
+    if workers <= 1:
+        for evaluation_id in evaluation_ids:
+            yield render_evaluation_file(evaluation_id, export_format, directory)
+        return
+
+    # spawn: processos limpos, sem herdar conexões de banco nem threads do servidor
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    ) as pool:
+        futures = [
+            pool.submit(render_evaluation_file, evaluation_id, export_format, directory)
+            for evaluation_id in evaluation_ids
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_export_batch(batch_id):
+    """
+    Gera o ZIP do lote. Falhas marcam o lote como FAILED e são repassadas à tarefa,
+    que decide pela nova tentativa.
+    """
+    batch = ExportBatch.objects.get(pk=batch_id)
+    ExportBatch.objects.filter(pk=batch_id).update(status='RUNNING', started_at=timezone.now(), processed=0)
+
+    relative_path = os.path.join(EXPORTS_DIR, f"avaliacoes_{batch.id}_{batch.format}.zip")
+    final_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+
+    partial_path = f"{final_path}.part"
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            with zipfile.ZipFile(partial_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for path in _render_all(batch.evaluation_ids, batch.format, directory):
+                    archive.write(path, arcname=os.path.basename(path))
+                    os.remove(path)
+                    ExportBatch.objects.filter(pk=batch_id).update(processed=F('processed') + 1)
+            os.replace(partial_path, final_path)
+    except Exception as exc:
+        logger.exception("Falha na exportação em lote %s", batch_id)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        ExportBatch.objects.filter(pk=batch_id).update(
+            status='FAILED', error=str(exc), finished_at=timezone.now()
+        )
+        raise
+
+    ExportBatch.objects.filter(pk=batch_id).update(
+        status='COMPLETED', file=relative_path, finished_at=timezone.now()
+    )
+
+
+def start_export_batch(batch):
+    """
+    Enfileira a geração do lote; o comando run_workers a executa.
+    """
+    batch.job = enqueue('core.export_batch', {'batch_id': batch.id}, created_by=batch.created_by)
+    batch.save(update_fields=['job'])
+    return batch.job
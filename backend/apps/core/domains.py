@@ -0,0 +1,58 @@
+#apps/core/domains.py
+"""
+Mapa domínio -> empresa ativa usado no login (ver apps.users.utils.domain_utils).
+
+O mapa inteiro é carregado uma vez por processo e consultado em memória. Salvar ou
+excluir uma empresa troca, após o commit, a versão guardada no cache do Django
+(signals.py); cada processo compara a versão a cada consulta e recarrega o mapa
+quando ela muda (inclusive se a chave sair do cache) ou quando a cópia local passa
+de MAX_AGE segundos.
+"""
+import time
+import uuid
+from django.core.cache import cache
+from django.db import transaction
+from .models import Company
+
+VERSION_KEY = 'core:company_domains:version'
+MAX_AGE = 300
+
+_local = {'version': None, 'loaded_at': 0.0, 'domains': {}}
+
+
+def _current_version():
+    cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    return cache.get(VERSION_KEY)
+
+
+def load_domain_map():
+    """
+    Domínio (minúsculo) -> ID da empresa ativa; havendo repetição, vale a de menor ID
+    """
+    domains = {}
+    rows = Company.objects.filter(is_active=True).exclude(dominio='').order_by('pk').values_list('dominio', 'pk')
+    for domain, company_id in rows:
+        domains.setdefault(domain.strip().lower(), company_id)
+    return domains
+
+
+def company_id_for_domain(domain):
+    if not domain:
+        return None
+    version = _current_version()
+    if _local['version'] != version or time.monotonic() - _local['loaded_at'] > MAX_AGE:
+        _local.update(version=version, loaded_at=time.monotonic(), domains=load_domain_map())
+    return _local['domains'].get(domain.strip().lower())
+
+
+def invalidate_domains():
+    """
+    Descarta o mapa deste processo e, após o commit, o dos demais
+    """
+    _local['version'] = None
+
+    def bump():
+        _local['version'] = None
+        cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+    transaction.on_commit(bump, robust=True)
@@ -0,0 +1,157 @@
+#apps/core/export_cache.py
+"""
+Cache em disco dos arquivos de exportação (PDF/XLSX) das avaliações.
+
+A chave é a avaliação, o formato e o content_fingerprint (versão da avaliação + versão
+do conjunto de perguntas), que muda a cada resposta, plano de ação, nota ou status
+alterados, mais os nomes da empresa, do formulário e do avaliador. Uma chave
+encontrada é servida direto do disco. Cada processo mantém uma estimativa do tamanho
+do cache; só quando ela passa de EXPORT_CACHE_MAX_SIZE (ou fica antiga) o diretório é
+percorrido e os arquivos menos usados (mtime mais antigo) são removidos.
+"""
+import logging
+import os
+import tempfile
+import time
+from django.conf import settings
+from .exports import EXPORT_WRITERS, render_to_spooled_file
+
+logger = logging.getLogger(__name__)
+
+# Após uma limpeza o cache fica com esta fração do limite, para não limpar a cada gravação
+EVICTION_TARGET_RATIO = 0.9
+# Outros processos também gravam: a estimativa local é refeita a cada intervalo (segundos)
+RESCAN_INTERVAL = 300
+
+_usage = {'total': None, 'scanned_at': float('-inf')}
+
+
+def cache_root():
+    return getattr(settings, 'EXPORT_CACHE_ROOT', None) or os.path.join(settings.MEDIA_ROOT, 'export_cache')
+
+
+def cache_max_size():
+    return getattr(settings, 'EXPORT_CACHE_MAX_SIZE', 0)
+
+
+def cache_path(evaluation, export_format):
+    return os.path.join(cache_root(), str(evaluation.pk), f"{evaluation.content_fingerprint()}.{export_format}")
+
+
+def open_cached_export(evaluation, export_format):
+    """
+    Devolve (arquivo, tamanho) da exportação, renderizando e gravando no cache só
+    quando a versão atual ainda não está em disco. Com o cache desligado
+    (EXPORT_CACHE_MAX_SIZE = 0) renderiza em arquivo temporário a cada chamada.
+    """
+    if cache_max_size() <= 0:
+        writer, _ = EXPORT_WRITERS[export_format]
+        return render_to_spooled_file(writer, evaluation)
+
+    path = cache_path(evaluation, export_format)
+    try:
+        fileobj = open(path, 'rb')
+    except FileNotFoundError:
+        fileobj = store(evaluation, export_format, path)
+    else:
+        # Marca o acesso para a política LRU
+        os.utime(path)
+    return fileobj, os.fstat(fileobj.fileno()).st_size
+
+
+def store(evaluation, export_format, path):
+    """
+    Renderiza e grava a exportação no cache; devolve o arquivo já aberto, que continua
+    legível mesmo que outro processo o remova em seguida
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    # Grava em arquivo temporário no mesmo diretório e troca de forma atômica,
+    # assim downloads concorrentes nunca leem um arquivo pela metade
+    writer, _ = EXPORT_WRITERS[export_format]
+    handle, partial_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(handle, 'wb') as fileobj:
+            writer(evaluation, fileobj)
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    fileobj = open(path, 'rb')
+    _track(os.fstat(fileobj.fileno()).st_size - _remove_stale_versions(directory, path, export_format))
+
+    max_size = cache_max_size()
+    if _usage['total'] > max_size or time.monotonic() - _usage['scanned_at'] > RESCAN_INTERVAL:
+        evict(max_size, keep={path})
+    return fileobj
+
+
+def _remove_stale_versions(directory, current_path, export_format):
+    """
+    Remove as versões anteriores da mesma exportação; retorna os bytes liberados
+    """
+    freed = 0
+    for name in os.listdir(directory):
+        candidate = os.path.join(directory, name)
+        if candidate != current_path and name.endswith(f".{export_format}"):
+            freed += _remove(candidate)
+    return freed
+
+
+def _track(delta):
+    if _usage['total'] is None:
+        # Primeira gravação do processo: evict() faz a contagem inicial
+        _usage['total'] = float('inf')
+    else:
+        _usage['total'] += delta
+
+
+def evict(max_size=None, keep=()):
+    """
+    Remove os arquivos menos usados até o cache caber no limite. Retorna quantos foram removidos.
+    Arquivos em keep e gravações em andamento (.part) nunca são removidos, mas contam no total.
+    """
+    max_size = cache_max_size() if max_size is None else max_size
+    entries = []
+    total = 0
+    for directory, _, names in os.walk(cache_root()):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            total += stat.st_size
+            if path not in keep and not name.endswith('.part'):
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+    removed = 0
+    if total > max_size:
+        target = max_size * EVICTION_TARGET_RATIO
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            if _remove(path):
+                total -= size
+                removed += 1
+
+    _usage['total'], _usage['scanned_at'] = total, time.monotonic()
+    return removed
+
+
+def _remove(path):
+    """
+    Remove o arquivo; retorna o tamanho liberado (0 se não foi removido)
+    """
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+    except FileNotFoundError:
+        return 0
+    except OSError:
+        logger.warning("Não foi possível remover %s do cache de exportações", path, exc_info=True)
+        return 0
+    return size
@@ -0,0 +1,188 @@
+#apps/core/exports.py
+"""
+Geração dos arquivos de exportação das avaliações.
+
+As linhas de perguntas e respostas são lidas do banco em blocos (iterator) e
+gravadas à medida que chegam, sem montar o payload completo em memória.
+"""
+import tempfile
+import textwrap
+from openpyxl import Workbook
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from .models import ANSWER_CHOICES, ActionPlan, Answer
+from .question_sets import get_form_question_set
+
+ANSWER_LABELS = dict(ANSWER_CHOICES)
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+PDF_CONTENT_TYPE = 'application/pdf'
+
+# Arquivos menores que isso ficam em memória; acima, vão para disco
+SPOOL_MAX_SIZE = 5 * 1024 * 1024
+ITERATOR_CHUNK_SIZE = 500
+
+ANSWER_EXPORT_FIELDS = (
+    'question_id',
+    'answer_respondent',
+    'attachment_respondent',
+    'answer_evaluator',
+    'attachment_evaluator',
+    'note',
+)
+
+
+def choice_label(value):
+    if not value:
+        return 'Sem resposta'
+    return ANSWER_LABELS.get(value, value)
+
+
+def attachment_label(value):
+    return "Sim" if value else "Não"
+
+
+def evaluation_summary_rows(evaluation):
+    return [
+        ("Empresa", evaluation.company.name),
+        ("Formulário", evaluation.form.name),
+        ("Período", evaluation.period.strftime('%m/%Y') if evaluation.period else '-'),
+        ("Status", evaluation.status),
+        ("Nota", f"{evaluation.score:.2f}" if evaluation.score is not None else '-'),
+        ("Validade", evaluation.valid_until.strftime('%d/%m/%Y') if evaluation.valid_until else '-'),
+    ]
+
+
+def iter_question_rows(evaluation):
+    """
+    Percorre as perguntas do formulário (em ordem de id) junto com a resposta de cada uma.
+    As respostas vêm do banco em blocos, ordenadas pela pergunta, e são casadas em
+    sequência com o conjunto compilado de perguntas.
+    """
+    answers = (
+        Answer.objects.filter(evaluation=evaluation)
+        .order_by('question_id')
+        .values(*ANSWER_EXPORT_FIELDS)
+        .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+    pending = next(answers, None)
+
+    for question in get_form_question_set(evaluation.form)['questions']:
+        while pending is not None and pending['question_id'] < question['id']:
+            pending = next(answers, None)
+        if pending is not None and pending['question_id'] == question['id']:
+            yield question, pending
+            pending = next(answers, None)
+        else:
+            yield question, {}
+
+
+def first_action_plan(evaluation):
+    return ActionPlan.objects.filter(evaluation=evaluation).order_by('pk').first()
+
+
+def write_evaluation_xlsx(evaluation, fileobj):
+    """
+    Grava a planilha da avaliação em fileobj usando o modo write-only do openpyxl.
+    """
+    workbook = Workbook(write_only=True)
+
+    summary_sheet = workbook.create_sheet("Resumo")
+    for row in evaluation_summary_rows(evaluation):
+        summary_sheet.append(row)
+
+    questions_sheet = workbook.create_sheet("Perguntas")
+    questions_sheet.append(["Categoria", "Pergunta", "Empresa", "Avaliador", "Observação", "Anexo da Empresa", "Anexo do Avaliador"])
+    for question, answer in iter_question_rows(evaluation):
+        questions_sheet.append([
+            question['category_name'],
+            question['question'],
+            choice_label(answer.get('answer_respondent')),
+            choice_label(answer.get('answer_evaluator')),
+            answer.get('note') or '',
+            attachment_label(answer.get('attachment_respondent')),
+            attachment_label(answer.get('attachment_evaluator')),
+        ])
+
+    plan = first_action_plan(evaluation)
+    if plan:
+        plan_sheet = workbook.create_sheet("Plano de Ação")
+        plan_rows = [
+            ("Descrição", plan.description),
+            ("Status", plan.status),
+            ("Data de término", plan.end_date.isoformat() if plan.end_date else '-'),
+            ("Resposta da empresa", plan.response_company or '-'),
+            ("Classificação respondente", plan.get_response_choice_display() or '-'),
+        ]
+        for row in plan_rows:
+            plan_sheet.append(row)
+
+    workbook.save(fileobj)
+
+
+def write_evaluation_pdf(evaluation, fileobj):
+    """
+    Grava o PDF da avaliação em fileobj, pergunta a pergunta, sem montar o payload completo.
+    """
+    pdf = canvas.Canvas(fileobj, pagesize=A4)
+    width, height = A4
+    y_position = height - 40
+
+    def write_line(text, font="Helvetica", size=10, leading=14):
+        nonlocal y_position
+        wrapped_lines = textwrap.wrap(text, width=100) or ['']
+        for line in wrapped_lines:
+            if y_position <= 60:
+                pdf.showPage()
+                y_position = height - 40
+                pdf.setFont(font, size)
+            pdf.setFont(font, size)
+            pdf.drawString(40, y_position, line)
+            y_position -= leading
+
+    write_line("Resumo da Avaliação", font="Helvetica-Bold", size=12, leading=18)
+    for label, value in evaluation_summary_rows(evaluation):
+        write_line(f"{label}: {value}")
+
+    write_line("-" * 80)
+    write_line("Perguntas e respostas", font="Helvetica-Bold", size=12, leading=18)
+
+    for index, (question, answer) in enumerate(iter_question_rows(evaluation), start=1):
+        write_line(f"Pergunta {index}: {question['question']}", font="Helvetica-Bold", size=10, leading=16)
+        if question.get('recommendation'):
+            write_line(f"Recomendação: {question['recommendation']}")
+        write_line(f"Empresa: {choice_label(answer.get('answer_respondent'))}")
+        write_line(f"Anexo da Empresa: {attachment_label(answer.get('attachment_respondent'))}")
+        write_line(f"Avaliador: {choice_label(answer.get('answer_evaluator'))}")
+        write_line(f"Anexo do avaliador: {attachment_label(answer.get('attachment_evaluator'))}")
+        if answer.get('note'):
+            write_line(f"Observação: {answer['note']}")
+        write_line("-" * 60)
+
+    plan = first_action_plan(evaluation)
+    if plan:
+        write_line("Plano de Ação", font="Helvetica-Bold", size=12, leading=18)
+        write_line(f"Descrição: {plan.description}")
+        write_line(f"Status: {plan.status}")
+        write_line(f"Data de término: {plan.end_date.isoformat() if plan.end_date else '-'}")
+        if plan.response_company:
+            write_line(f"Resposta: {plan.response_company}")
+
+    pdf.save()
+
+
+EXPORT_WRITERS = {
+    'pdf': (write_evaluation_pdf, PDF_CONTENT_TYPE),
+    'xlsx': (write_evaluation_xlsx, XLSX_CONTENT_TYPE),
+}
+
+
+def render_to_spooled_file(writer, evaluation):
+    """
+    Executa o writer em um arquivo temporário que só vai para disco quando passa de
+    SPOOL_MAX_SIZE, e devolve o arquivo posicionado no início com o tamanho final.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    writer(evaluation, output)
+    size = output.tell()
+    output.seek(0)
+    return output, size
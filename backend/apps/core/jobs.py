@@ -0,0 +1,46 @@
+#apps/core/jobs.py
+"""
+Handlers das tarefas em segundo plano do app core (ver apps.jobs.queue).
+"""
+from django.urls import reverse
+from apps.jobs.queue import register
+from .batch_exports import run_export_batch
+from .models import Evaluation
+from .question_sets import forms_for_categories
+from .summaries import refresh_pending
+
+RESCORE_CHUNK_SIZE = 500
+
+
+@register('core.export_batch')
+def export_batch(job):
+    batch_id = job.payload['batch_id']
+    run_export_batch(batch_id)
+    return {
+        'export_batch_id': batch_id,
+        'download_path': reverse('evaluation-export-batch-download', kwargs={'batch_id': batch_id}),
+    }
+
+
+@register('core.rescore_category')
+def rescore_category(job):
+    """
+    Recalcula as notas das avaliações dos formulários que contêm a categoria
+    """
+    form_ids = forms_for_categories([job.payload['category_id']])
+    evaluations = Evaluation.objects.filter(form_id__in=form_ids)
+    moved = evaluations.rescore_changed(chunk_size=RESCORE_CHUNK_SIZE)
+    return {
+        'category_id': job.payload['category_id'],
+        'forms': sorted(form_ids),
+        'scored_evaluations': evaluations.filter(score__isnull=False).count(),
+        'scores_changed': moved,
+    }
+
+
+@register('core.refresh_summaries')
+def refresh_summaries(job):
+    """
+    Recalcula os resumos dos polos marcados como pendentes (ver apps.core.summaries)
+    """
+    return {'summaries': refresh_pending()}
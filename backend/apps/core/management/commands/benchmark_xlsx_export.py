@@ -0,0 +1,76 @@
+import time
+import tracemalloc
+from io import BytesIO
+from django.core.management.base import BaseCommand, CommandError
+from openpyxl import Workbook
+from apps.core.exports import attachment_label, choice_label, render_to_spooled_file, write_evaluation_xlsx
+from apps.core.models import Evaluation
+from apps.core.serializers import ActionPlanSerializer, EvaluationDetailSerializer
+
+
+def legacy_xlsx_export(evaluation):
+    """
+    Caminho anterior: payload completo do EvaluationDetailSerializer + Workbook comum em BytesIO
+    """
+    data = EvaluationDetailSerializer(evaluation).data
+    action_plan = evaluation.action_plans.first()
+    data['action_plan'] = ActionPlanSerializer(action_plan).data if action_plan else None
+
+    workbook = Workbook()
+    summary_sheet = workbook.active
+    summary_sheet.title = "Resumo"
+    summary_sheet.append(("Empresa", data.get('company_name')))
+    summary_sheet.append(("Formulário", data.get('form_name')))
+
+    questions_sheet = workbook.create_sheet("Perguntas")
+    questions_sheet.append(["Categoria", "Pergunta", "Empresa", "Avaliador", "Observação", "Anexo da Empresa", "Anexo do Avaliador"])
+    for question in data.get('questions', []):
+        answer = question.get('answer') or {}
+        questions_sheet.append([
+            question.get('category_name'),
+            question.get('question'),
+            choice_label(answer.get('answer_respondent')),
+            choice_label(answer.get('answer_evaluator')),
+            answer.get('note') or '',
+            attachment_label(answer.get('attachment_respondent')),
+            attachment_label(answer.get('attachment_evaluator')),
+        ])
+
+    output = BytesIO()
+    workbook.save(output)
+    return output.getbuffer().nbytes
+
+
+def streaming_xlsx_export(evaluation):
+    output, size = render_to_spooled_file(write_evaluation_xlsx, evaluation)
+    output.close()
+    return size
+
+
+class Command(BaseCommand):
+    help = 'Compara memória e tempo da exportação XLSX em memória com a exportação write-only'
+
+    def add_arguments(self, parser):
+        parser.add_argument('evaluation_id', type=int, help='ID da avaliação')
+        parser.add_argument('--repeat', type=int, default=3, help='Número de execuções por método')
+
+    def handle(self, *args, **kwargs):
+        try:
+            evaluation = Evaluation.objects.select_related('company', 'form', 'evaluator').get(pk=kwargs['evaluation_id'])
+        except Evaluation.DoesNotExist:
+            raise CommandError(f"Avaliação com ID {kwargs['evaluation_id']} não encontrada.")
+
+        for name, export in (('em memória', legacy_xlsx_export), ('write-only', streaming_xlsx_export)):
+            timings, peaks = [], []
+            for _ in range(kwargs['repeat']):
+                tracemalloc.start()
+                started = time.perf_counter()
+                size = export(evaluation)
+                timings.append(time.perf_counter() - started)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+
+            self.stdout.write(
+                f"{name:>12}: {min(timings) * 1000:.1f} ms (melhor de {len(timings)}), "
+                f"pico de memória {max(peaks) / 1024 / 1024:.2f} MB, arquivo {size / 1024:.1f} KB"
+            )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.models import Evaluation
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói e verifica os contadores de progresso desnormalizados das avaliações'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help='Apenas verifica, sem gravar alterações')
+        parser.add_argument('--form', type=int, help='Restringe às avaliações de um formulário')
+
+    def handle(self, *args, **kwargs):
+        evaluations = Evaluation.objects.all()
+        if kwargs.get('form'):
+            evaluations = evaluations.filter(form_id=kwargs['form'])
+
+        mismatches = list(
+            evaluations.progress_mismatches().values_list(
+                'id',
+                'total_questions', 'computed_total_questions',
+                'respondent_answered', 'computed_respondent_answered',
+                'evaluator_answered', 'computed_evaluator_answered',
+            )
+        )
+        for evaluation_id, total, computed_total, respondent, computed_respondent, evaluator, computed_evaluator in mismatches:
+            self.stdout.write(self.style.WARNING(
+                f"Avaliação {evaluation_id}: perguntas {total}->{computed_total}, "
+                f"respondidas {respondent}->{computed_respondent}, avaliadas {evaluator}->{computed_evaluator}"
+            ))
+
+        if kwargs.get('verify'):
+            if mismatches:
+                # Código de saída diferente de zero para uso em CI e cron
+                raise CommandError(f'{len(mismatches)} avaliações com contadores divergentes.')
+            self.stdout.write(self.style.SUCCESS('Todos os contadores estão consistentes.'))
+            return
+
+        updated = evaluations.rebuild_progress()
+        # Contadores corrigidos podem mudar o status (ex.: todas as perguntas respondidas)
+        statuses = evaluations.refresh_status()
+        self.stdout.write(self.style.SUCCESS(
+            f'Contadores reconstruídos para {updated} avaliações ({len(mismatches)} corrigidas, '
+            f'{statuses} com status atualizado).'
+        ))
@@ -0,0 +1,16 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.core.summaries import refresh_summaries
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói a tabela de resumo dos polos por período (PoloPeriodSummary)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, action='append', help='Restringe a uma empresa (pode repetir)')
+
+    def handle(self, *args, **kwargs):
+        started = time.perf_counter()
+        created = refresh_summaries(company_ids=kwargs.get('company'))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'{created} linhas de resumo gravadas em {elapsed:.2f}s.'))
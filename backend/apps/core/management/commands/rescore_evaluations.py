@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.core.models import Evaluation
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a nota das avaliações (100 - soma dos pesos das respostas NC) em um único UPDATE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--polo', type=int, help='Restringe às empresas de um polo')
+        parser.add_argument('--year', type=int, help='Ano do período')
+        parser.add_argument('--month', type=int, help='Mês do período')
+        parser.add_argument('--status', help='Status das avaliações (ex.: COMPLETED)')
+        parser.add_argument('--form', type=int, help='Restringe às avaliações de um formulário')
+
+    def handle(self, *args, **kwargs):
+        evaluations = Evaluation.objects.all()
+        if kwargs.get('polo'):
+            evaluations = evaluations.filter(company__poles__id=kwargs['polo'])
+        if kwargs.get('year'):
+            evaluations = evaluations.filter(period__year=kwargs['year'])
+        if kwargs.get('month'):
+            evaluations = evaluations.filter(period__month=kwargs['month'])
+        if kwargs.get('status'):
+            evaluations = evaluations.filter(status=kwargs['status'])
+        if kwargs.get('form'):
+            evaluations = evaluations.filter(form_id=kwargs['form'])
+
+        started = time.perf_counter()
+        updated = evaluations.rescore()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Notas recalculadas para {updated} avaliações em {elapsed:.2f}s.'))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from apps.core.search import FTS_TABLE
+
+SQLITE_STATEMENTS = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(search_key, content='core_company', content_rowid='id')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON core_company BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, search_key) VALUES (new.id, new.search_key);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON core_company BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_key) VALUES ('delete', old.id, old.search_key);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_key ON core_company BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_key) VALUES ('delete', old.id, old.search_key);
+        INSERT INTO {FTS_TABLE}(rowid, search_key) VALUES (new.id, new.search_key);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+# O índice de texto completo exige o nome do índice da chave primária da tabela
+SQLSERVER_STATEMENTS = [
+    "IF NOT EXISTS (SELECT 1 FROM sys.fulltext_catalogs WHERE name = 'core_search') "
+    "CREATE FULLTEXT CATALOG core_search",
+    """IF NOT EXISTS (SELECT 1 FROM sys.fulltext_indexes WHERE object_id = OBJECT_ID('core_company'))
+    BEGIN
+        DECLARE @pk sysname = (SELECT name FROM sys.indexes WHERE object_id = OBJECT_ID('core_company') AND is_primary_key = 1);
+        EXEC('CREATE FULLTEXT INDEX ON core_company(search_key LANGUAGE 1046) KEY INDEX ' + @pk +
+             ' ON core_search WITH CHANGE_TRACKING AUTO');
+    END""",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria o índice de texto completo da busca de empresas (COMPANY_SEARCH_BACKEND = fulltext). '
+        'No SQLite, execute novamente após migrações que recriem a tabela core_company.'
+    )
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor == 'sqlite':
+            statements = SQLITE_STATEMENTS
+        elif connection.vendor == 'microsoft':
+            statements = SQLSERVER_STATEMENTS
+        else:
+            # As buscas continuam pelo prefixo (ver apps.core.search)
+            raise CommandError(f'Busca de texto completo não suportada no banco {connection.vendor}')
+
+        # Sem transação: CREATE FULLTEXT não pode rodar dentro de uma no SQL Server
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+        self.stdout.write(self.style.SUCCESS('Índice de busca de empresas criado.'))
@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.core.models import Evaluation
+
+
+class Command(BaseCommand):
+    help = 'Atualiza em lote o status das avaliações conforme o prazo (valid_until)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Executa continuamente, como agendador')
+        parser.add_argument('--interval', type=int, default=3600, help='Intervalo em segundos entre varreduras (com --loop)')
+
+    def handle(self, *args, **kwargs):
+        while True:
+            changes = Evaluation.objects.sweep_status()
+            total = sum(changes.values())
+            details = ', '.join(f'{name}={count}' for name, count in changes.items())
+            self.stdout.write(self.style.SUCCESS(f'{total} avaliações atualizadas ({details})'))
+
+            if not kwargs.get('loop'):
+                return
+            time.sleep(kwargs['interval'])
@@ -0,0 +1,62 @@
+# Generated by Django 5.0.13 on 2026-10-18 19:42
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_progress_counters(apps, schema_editor):
+    Evaluation = apps.get_model('core', 'Evaluation')
+    Question = apps.get_model('core', 'Question')
+    Answer = apps.get_model('core', 'Answer')
+
+    def count_subquery(queryset, group_field):
+        return Coalesce(Subquery(
+            queryset.order_by().values(group_field).annotate(total=Count('id')).values('total')
+        ), 0)
+
+    def answered(field_name):
+        return Q(**{f'{field_name}__isnull': False}) & ~Q(**{field_name: ''})
+
+    Evaluation.objects.update(
+        total_questions=count_subquery(
+            Question.objects.filter(category__forms=OuterRef('form_id')), 'category__forms'
+        ),
+        respondent_answered=count_subquery(
+            Answer.objects.filter(answered('answer_respondent'), evaluation=OuterRef('pk')), 'evaluation'
+        ),
+        evaluator_answered=count_subquery(
+            Answer.objects.filter(answered('answer_evaluator'), evaluation=OuterRef('pk')), 'evaluation'
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_actionplan_response_choice_actionplan_response_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evaluation',
+            name='evaluator_answered',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='evaluation',
+            name='respondent_answered',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='evaluation',
+            name='total_questions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='evaluation',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pendente'), ('IN_PROGRESS', 'Em Progresso'), ('EXPIRED', 'Expirada'), ('COMPLETED', 'Concluída'), ('CANCELLED', 'Cancelada')], default='PENDING', max_length=20),
+        ),
+        migrations.RunPython(populate_progress_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.13 on 2026-10-18 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_evaluation_progress_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='question_set_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.0.13 on 2026-10-18 20:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+
+STATUS_FIELDS = {
+    'PENDING': 'pending',
+    'IN_PROGRESS': 'in_progress',
+    'COMPLETED': 'completed',
+    'EXPIRED': 'expired',
+    'CANCELLED': 'cancelled',
+}
+
+
+def populate_summaries(apps, schema_editor):
+    Evaluation = apps.get_model('core', 'Evaluation')
+    ActionPlan = apps.get_model('core', 'ActionPlan')
+    Polo = apps.get_model('core', 'Polo')
+    PoloPeriodSummary = apps.get_model('core', 'PoloPeriodSummary')
+
+    rows = {
+        (row.pop('company_id'), row.pop('month')): row
+        for row in Evaluation.objects.annotate(month=TruncMonth('period')).order_by()
+        .values('company_id', 'month').annotate(
+            evaluations=Count('id'),
+            **{field: Count('id', filter=Q(status=status)) for status, field in STATUS_FIELDS.items()},
+            scored=Count('score'),
+            average_score=Avg('score'),
+            total_questions=Sum('total_questions'),
+            respondent_answered=Sum('respondent_answered'),
+        )
+    }
+    open_plans = (
+        ActionPlan.objects.exclude(status='COMPLETED').annotate(month=TruncMonth('evaluation__period')).order_by()
+        .values('evaluation__company_id', 'month').annotate(total=Count('id'))
+    )
+    for row in open_plans:
+        key = (row['evaluation__company_id'], row['month'])
+        if key in rows:
+            rows[key]['open_action_plans'] = row['total']
+
+    poles_by_company = {}
+    for company_id, polo_id in Polo.companies.through.objects.values_list('company_id', 'polo_id'):
+        poles_by_company.setdefault(company_id, []).append(polo_id)
+
+    PoloPeriodSummary.objects.bulk_create([
+        PoloPeriodSummary(polo_id=polo_id, company_id=company_id, period=month, **values)
+        for (company_id, month), values in rows.items()
+        for polo_id in poles_by_company.get(company_id, [])
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_exportbatch_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PoloPeriodSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(blank=True, null=True)),
+                ('evaluations', models.PositiveIntegerField(default=0)),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('in_progress', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('expired', models.PositiveIntegerField(default=0)),
+                ('cancelled', models.PositiveIntegerField(default=0)),
+                ('scored', models.PositiveIntegerField(default=0)),
+                ('average_score', models.FloatField(blank=True, null=True)),
+                ('total_questions', models.PositiveIntegerField(default=0)),
+                ('respondent_answered', models.PositiveIntegerField(default=0)),
+                ('open_action_plans', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_summaries', to='core.company')),
+                ('polo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_summaries', to='core.polo')),
+            ],
+            options={
+                'verbose_name': 'Resumo do Polo por Período',
+                'verbose_name_plural': 'Resumos dos Polos por Período',
+                'indexes': [models.Index(fields=['polo', 'period'], name='polo_summary_period_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='poloperiodsummary',
+            constraint=models.UniqueConstraint(fields=('polo', 'company', 'period'), name='unique_polo_company_period_summary'),
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.13 on 2026-10-18 20:14
+
+from django.db import migrations, models
+from apps.core.utils import company_search_key
+
+
+def populate_search_key(apps, schema_editor):
+    Company = apps.get_model('core', 'Company')
+    companies = list(Company.objects.only('id', 'name', 'cnpj', 'dominio'))
+    for company in companies:
+        company.search_key = company_search_key(company.name, company.cnpj, company.dominio)
+    Company.objects.bulk_update(companies, ['search_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_polo_period_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='search_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=600),
+        ),
+        migrations.AlterField(
+            model_name='company',
+            name='cnpj',
+            field=models.CharField(db_index=True, max_length=18),
+        ),
+        migrations.RunPython(populate_search_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.13 on 2026-10-18 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_company_search_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='company',
+            name='dominio',
+            field=models.CharField(blank=True, db_index=True, max_length=255),
+        ),
+    ]
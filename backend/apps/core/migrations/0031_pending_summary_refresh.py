@@ -0,0 +1,28 @@
+# Generated by Django 5.0.13 on 2026-10-18 20:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_company_dominio_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingSummaryRefresh',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(blank=True, null=True)),
+                ('all_periods', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Atualização Pendente de Resumo',
+                'verbose_name_plural': 'Atualizações Pendentes de Resumos',
+            },
+        ),
+    ]
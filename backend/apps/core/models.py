@@ -1,11 +1,17 @@
 #apps/core/models.py
 
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, Exists, ExpressionWrapper, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Round
 from django.utils import timezone
+import hashlib
+import logging
 import os, re
 import uuid
-from .utils import format_cnpj
+from .utils import company_search_key, format_cnpj
+
+logger = logging.getLogger(__name__)
 
 ANSWER_CHOICES = [
     ('NA', 'Não Aplicável'),
@@ -29,7 +35,7 @@ def rename_attachment_respondent(instance, filename):
     company_name = sanitize_filename(instance.company.name)
 
     # ID da pergunta
-    question_id = instance.question.id if instance.question_id else "no-question"
+    question_id = instance.question_id or "no-question"
 
     new_filename = f"{period_str}_{company_name}_Q{question_id}.{ext}"
 
@@ -46,7 +52,7 @@ def rename_attachment_evaluator(instance, filename):
     company_name = sanitize_filename(instance.company.name)
 
     # ID da pergunta
-    question_id = instance.question.id if instance.question_id else "no-question"
+    question_id = instance.question_id or "no-question"
 
     new_filename = f"{period_str}_{company_name}_Q{question_id}.{ext}"
 
@@ -55,10 +61,12 @@ def rename_attachment_evaluator(instance, filename):
 
 class Company(models.Model):
     name = models.CharField(max_length=255)
-    cnpj = models.CharField(max_length=18, unique=False)
+    cnpj = models.CharField(max_length=18, unique=False, db_index=True)
     is_active = models.BooleanField(default=True)
     users = models.ManyToManyField(User, related_name='companies', blank=True)  # Changed from ForeignKey to ManyToMany
-    dominio = models.CharField(max_length=255, blank=True)
+    dominio = models.CharField(max_length=255, blank=True, db_index=True)
+    # Nome sem acentos e em minúsculas + CNPJ + domínio, indexado para busca por prefixo (ver search.py)
+    search_key = models.CharField(max_length=600, blank=True, editable=False, db_index=True)
 
     class Meta:
         verbose_name = "Empresa"
@@ -68,6 +76,11 @@ class Company(models.Model):
         # Limpar o CNPJ antes de salvar (manter apenas números)
         if self.cnpj:
             self.cnpj = format_cnpj(self.cnpj)
+        self.search_key = company_search_key(self.name, self.cnpj, self.dominio)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'search_key'}
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -78,7 +91,9 @@ class Company(models.Model):
         """
         Busca uma empresa ativa pelo domínio
         """
-        return cls.objects.filter(dominio=domain, is_active=True).first()
+        from .domains import company_id_for_domain
+        company_id = company_id_for_domain(domain)
+        return cls.objects.filter(pk=company_id).first() if company_id else None
 
 class CategoryQuestion(models.Model):
     name = models.CharField(max_length=255)
@@ -89,6 +104,12 @@ class CategoryQuestion(models.Model):
         verbose_name = "Categoria de Pergunta"
         verbose_name_plural = "Categorias de Perguntas"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_weight = instance.__dict__.get('weight')
+        return instance
+
     def __str__(self):
         return self.name
     
@@ -112,6 +133,12 @@ class Question(models.Model):
     recommendation = models.TextField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        return instance
+
     def __str__(self):
         return self.question
 
@@ -119,10 +146,242 @@ class Form(models.Model):
     name = models.CharField(max_length=255)
     categories = models.ManyToManyField(CategoryQuestion, related_name='forms')
     is_active = models.BooleanField(default=True)
+    # Incrementada sempre que o conjunto de perguntas do formulário muda (ver question_sets.py)
+    question_set_version = models.PositiveIntegerField(default=1, editable=False)
 
     def __str__(self):
         return self.name
     
+def _answered_filter(field_name):
+    """
+    Condição para respostas efetivamente preenchidas (nem nulas, nem vazias)
+    """
+    return Q(**{f'{field_name}__isnull': False}) & ~Q(**{field_name: ''})
+
+
+def _count_subquery(queryset, group_field):
+    """
+    Subconsulta escalar com o COUNT agrupado, para uso em annotate()/update()
+    """
+    return Coalesce(Subquery(
+        queryset.order_by().values(group_field).annotate(total=Count('id')).values('total')
+    ), 0)
+
+
+# Nota: parte de 100 e desconta o peso da categoria de cada resposta Não Conforme do avaliador
+BASE_SCORE = 100.0
+NON_CONFORMING = 'NC'
+
+
+def _non_conforming_answers():
+    return Answer.objects.filter(answer_evaluator=NON_CONFORMING)
+
+
+def _penalty_subquery():
+    """
+    Subconsulta escalar com a soma dos pesos das respostas NC de cada avaliação
+    """
+    return Coalesce(Subquery(
+        _non_conforming_answers().filter(evaluation=OuterRef('pk'))
+        .order_by().values('evaluation')
+        .annotate(total=Sum('question__category__weight')).values('total'),
+        output_field=FloatField(),
+    ), Value(0.0))
+
+
+class EvaluationQuerySet(models.QuerySet):
+
+    def versioned_update(self, summary_keys=None, **kwargs):
+        """
+        UPDATE em lote que também muda a versão usada no ETag das avaliações e
+        atualiza o resumo dos polos (empresa, mês) das avaliações afetadas; update()
+        continua simples. Quem já conhece as chaves (empresa, período) as informa em
+        summary_keys e evita a consulta prévia.
+        """
+        kwargs.setdefault('version', F('version') + 1)
+        kwargs.setdefault('updated_at', timezone.now())
+
+        from .summaries import schedule_refresh
+        if summary_keys is None:
+            summary_keys = set(self.order_by().values_list('company_id', 'period').distinct())
+        updated = super().update(**kwargs)
+        schedule_refresh(summary_keys)
+        return updated
+
+    def computed_progress(self):
+        """
+        Recalcula os contadores a partir das respostas (usado na reconstrução e verificação).
+        """
+        return self.annotate(
+            computed_total_questions=_count_subquery(
+                Question.objects.filter(category__forms=OuterRef('form_id')), 'category__forms'
+            ),
+            computed_respondent_answered=_count_subquery(
+                Answer.objects.filter(_answered_filter('answer_respondent'), evaluation=OuterRef('pk')), 'evaluation'
+            ),
+            computed_evaluator_answered=_count_subquery(
+                Answer.objects.filter(_answered_filter('answer_evaluator'), evaluation=OuterRef('pk')), 'evaluation'
+            ),
+        )
+
+    def refresh_total_questions(self):
+        """
+        Atualiza apenas o total de perguntas, após mudanças no formulário. Sem mudar a
+        versão: o ETag já inclui a versão do conjunto de perguntas do formulário.
+        """
+        return self.update(
+            total_questions=_count_subquery(
+                Question.objects.filter(category__forms=OuterRef('form_id')), 'category__forms'
+            ),
+        )
+
+    def rebuild_progress(self):
+        """
+        Reconstrói os contadores desnormalizados com um único UPDATE.
+        """
+        return self.versioned_update(
+            total_questions=_count_subquery(
+                Question.objects.filter(category__forms=OuterRef('form_id')), 'category__forms'
+            ),
+            respondent_answered=_count_subquery(
+                Answer.objects.filter(_answered_filter('answer_respondent'), evaluation=OuterRef('pk')), 'evaluation'
+            ),
+            evaluator_answered=_count_subquery(
+                Answer.objects.filter(_answered_filter('answer_evaluator'), evaluation=OuterRef('pk')), 'evaluation'
+            ),
+        )
+
+    def rescore(self):
+        """
+        Recalcula a nota de todas as avaliações com respostas em um único UPDATE.
+        Avaliações sem respostas mantêm a nota atual, como em calculate-score.
+        """
+        return self.filter(Exists(Answer.objects.filter(evaluation=OuterRef('pk')))).versioned_update(
+            score=ExpressionWrapper(Value(BASE_SCORE) - _penalty_subquery(), output_field=FloatField())
+        )
+
+    def score_mismatches(self):
+        """
+        Avaliações já pontuadas cuja nota armazenada diverge das respostas e pesos atuais.
+        """
+        return self.filter(score__isnull=False).annotate(
+            computed_score=ExpressionWrapper(Value(BASE_SCORE) - _penalty_subquery(), output_field=FloatField())
+        ).exclude(score=F('computed_score'))
+
+    def rescore_changed(self, chunk_size=500):
+        """
+        Recalcula, em blocos de chunk_size avaliações, só as notas que mudaram.
+        Retorna quantas notas foram alteradas.
+        """
+        ids = list(self.filter(score__isnull=False).order_by('pk').values_list('pk', flat=True))
+        moved = 0
+        for start in range(0, len(ids), chunk_size):
+            chunk = Evaluation.objects.filter(pk__in=ids[start:start + chunk_size])
+            changed = list(chunk.score_mismatches().values_list('pk', flat=True))
+            if changed:
+                moved += Evaluation.objects.filter(pk__in=changed).rescore()
+        return moved
+
+    def progress_mismatches(self):
+        """
+        Avaliações cujos contadores armazenados divergem das respostas.
+        """
+        return self.computed_progress().exclude(
+            total_questions=F('computed_total_questions'),
+            respondent_answered=F('computed_respondent_answered'),
+            evaluator_answered=F('computed_evaluator_answered'),
+        )
+
+    def sweep_status(self, today=None):
+        """
+        Aplica as transições de prazo de refresh_status() com UPDATEs em lote.
+        Retorna a quantidade de avaliações alteradas por transição.
+        """
+        today = today or timezone.localdate()
+        fully_evaluated = Q(total_questions__gt=0, evaluator_answered__gte=F('total_questions'))
+        fully_answered = Q(total_questions__gt=0, respondent_answered__gte=F('total_questions'))
+        started = Q(respondent_answered__gt=0) | Q(evaluator_answered__gt=0)
+
+        overdue = self.filter(valid_until__lt=today).exclude(fully_evaluated)
+        reopened = self.filter(status='EXPIRED', valid_until__gte=today)
+
+        changes = {
+            'expired': overdue.filter(status__in=['PENDING', 'IN_PROGRESS']).versioned_update(status='EXPIRED'),
+            # Respondidas, mas não avaliadas dentro do prazo, voltam a expirar (mesma regra de refresh_status)
+            'expired_completed': overdue.filter(status='COMPLETED').versioned_update(
+                status='EXPIRED', completed_at=None
+            ),
+            # Prazo prorrogado: reabre conforme o progresso atual
+            'reopened_completed': reopened.filter(fully_evaluated | fully_answered).versioned_update(
+                status='COMPLETED', completed_at=timezone.now()
+            ),
+            'reopened_in_progress': reopened.filter(started).versioned_update(status='IN_PROGRESS'),
+            'reopened_pending': reopened.versioned_update(status='PENDING'),
+        }
+        logger.info("Varredura de status das avaliações: %s", changes)
+        return changes
+
+    def refresh_status(self, today=None):
+        """
+        Aplica as regras de Evaluation.refresh_status() em um único UPDATE, só nas
+        avaliações cujo status muda (ex.: após alterar o total de perguntas).
+        """
+        today = today or timezone.localdate()
+        expired = Q(valid_until__lt=today)
+        completed = (
+            Q(total_questions__gt=0, evaluator_answered__gte=F('total_questions'))
+            | (Q(total_questions__gt=0, respondent_answered__gte=F('total_questions')) & ~expired)
+        )
+        status = Case(
+            When(completed, then=Value('COMPLETED')),
+            When(expired, then=Value('EXPIRED')),
+            When(Q(respondent_answered__gt=0) | Q(evaluator_answered__gt=0), then=Value('IN_PROGRESS')),
+            default=Value('PENDING'),
+        )
+        return self.exclude(status='CANCELLED').exclude(status=status).versioned_update(
+            status=status,
+            completed_at=Case(
+                When(completed, then=Coalesce('completed_at', Value(timezone.now()))),
+                default=Value(None),
+            ),
+        )
+
+    def with_action_plan(self):
+        """
+        Anota o ID do plano de ação da avaliação (só existe um) na mesma consulta.
+        """
+        return self.annotate(
+            action_plan_id=Subquery(
+                ActionPlan.objects.filter(evaluation=OuterRef('pk')).order_by('pk').values('pk')[:1]
+            )
+        )
+
+    def with_progress(self):
+        """
+        Anota os indicadores derivados dos contadores para filtros e ordenação na listagem.
+        """
+        return self.annotate(
+            progress_answered_percentage=Case(
+                When(total_questions=0, then=Value(0.0)),
+                default=Round(ExpressionWrapper(
+                    F('respondent_answered') * 100.0 / F('total_questions'),
+                    output_field=FloatField(),
+                )),
+                output_field=FloatField(),
+            ),
+            progress_fully_answered=Case(
+                When(total_questions__gt=0, respondent_answered__gte=F('total_questions'), then=Value(True)),
+                default=Value(False),
+                output_field=models.BooleanField(),
+            ),
+            progress_fully_evaluated=Case(
+                When(total_questions__gt=0, evaluator_answered__gte=F('total_questions'), then=Value(True)),
+                default=Value(False),
+                output_field=models.BooleanField(),
+            ),
+        )
+
+
 class Evaluation(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pendente'),
@@ -143,37 +402,109 @@ class Evaluation(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     period = models.DateField(null=True, blank=True)
 
+    # Contadores desnormalizados, mantidos por Answer.save()/exclusão de respostas
+    total_questions = models.PositiveIntegerField(default=0)
+    respondent_answered = models.PositiveIntegerField(default=0)
+    evaluator_answered = models.PositiveIntegerField(default=0)
+
+    # Versão da linha: incrementada a cada alteração da avaliação ou de suas respostas
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = EvaluationQuerySet.as_manager()
+
+    PROGRESS_FIELDS = ['total_questions', 'respondent_answered', 'evaluator_answered']
+
     def __str__(self):
         return f"Evaluation {self.id} - {self.company.name}"
 
-    def _cache_value(self, attr_name, value):
-        setattr(self, attr_name, value)
-        return value
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_form_id = instance.__dict__.get('form_id')
+        instance._loaded_summary_key = (instance.__dict__.get('company_id'), instance.__dict__.get('period'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        changed_fields = {'version', 'updated_at'}
+        if not adding:
+            # F(): gravações concorrentes nunca repetem a mesma versão (ETag/cache)
+            self.version = F('version') + 1
+
+        # O total de perguntas só muda junto com o formulário
+        if adding or self.form_id != getattr(self, '_loaded_form_id', self.form_id):
+            from .question_sets import get_form_question_set
+            self.total_questions = get_form_question_set(self.form)['count']
+            changed_fields.add('total_questions')
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not adding:
+            # Os contadores são mantidos com F() por apply_progress_delta; uma instância
+            # carregada antes das últimas respostas não pode sobrescrevê-los
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.PROGRESS_FIELDS
+            ]
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *changed_fields}
+        super().save(*args, **kwargs)
+        self._loaded_form_id = self.form_id
+        if not adding:
+            self.refresh_from_db(fields=['version', 'updated_at', 'respondent_answered', 'evaluator_answered'])
+
+    def fingerprint(self):
+        """
+        Identifica o conteúdo atual da avaliação (respostas, status, nota e formulário),
+        usado como ETag e como chave de cache.
+        """
+        return f"{self.pk}-{self.version}-{self.form.question_set_version}"
+
+    def content_fingerprint(self):
+        """
+        fingerprint() mais os nomes da empresa, do formulário e do avaliador, exibidos nos
+        detalhes e nas exportações mas que não mudam a versão da avaliação
+        """
+        names = f"{self.company.name}\x00{self.form.name}\x00{self.evaluator.username}"
+        return f"{self.fingerprint()}-{hashlib.sha1(names.encode()).hexdigest()[:12]}"
+
+    def compute_score(self):
+        """
+        Nota da avaliação em uma única consulta agregada
+        """
+        penalty = _non_conforming_answers().filter(evaluation=self).aggregate(
+            total=Sum('question__category__weight')
+        )['total']
+        return BASE_SCORE - (penalty or 0)
+
+    def apply_progress_delta(self, respondent=0, evaluator=0):
+        """
+        Aplica a variação dos contadores com expressões F() e recarrega os valores atuais.
+        Também é chamado com variação zero para registrar a nova versão da avaliação.
+        """
+        Evaluation.objects.filter(pk=self.pk).versioned_update(
+            summary_keys={(self.company_id, self.period)},
+            respondent_answered=F('respondent_answered') + respondent,
+            evaluator_answered=F('evaluator_answered') + evaluator,
+        )
+        self.refresh_from_db(fields=[*self.PROGRESS_FIELDS, 'status', 'completed_at', 'version', 'updated_at'])
 
     @property
     def total_questions_count(self):
-        if hasattr(self, '_total_questions_cache'):
-            return self._total_questions_cache
-        total = Question.objects.filter(
-            category__in=self.form.categories.all()
-        ).count()
-        return self._cache_value('_total_questions_cache', total)
+        return self.total_questions
 
     @property
     def respondent_answers_count(self):
-        if hasattr(self, '_respondent_answers_cache'):
-            return self._respondent_answers_cache
-        count = self.answers.exclude(answer_respondent__in=[None, '']).count()
-        return self._cache_value('_respondent_answers_cache', count)
+        return self.respondent_answered
 
     @property
     def evaluator_answers_count(self):
-        if hasattr(self, '_evaluator_answers_cache'):
-            return self._evaluator_answers_cache
-        count = self.answers.exclude(answer_evaluator__in=[None, '']).count()
-        return self._cache_value('_evaluator_answers_cache', count)
+        return self.evaluator_answered
 
     def answered_percentage(self):
+        annotated_value = getattr(self, 'progress_answered_percentage', None)
+        if annotated_value is not None:
+            return int(annotated_value)
         total = self.total_questions_count
         if total == 0:
             return 0
@@ -241,8 +572,44 @@ class Answer(models.Model):
             models.UniqueConstraint(fields=['evaluation', 'question'] , name='unique_answer_per_question_in_evaluation')
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_progress = instance.progress_state()
+        return instance
+
+    def progress_state(self):
+        """
+        Avaliação e indicadores (respondida, avaliada) que esta resposta soma aos contadores
+        """
+        return (
+            self.__dict__.get('evaluation_id'),
+            int(bool(self.__dict__.get('answer_respondent'))),
+            int(bool(self.__dict__.get('answer_evaluator'))),
+        )
+
     def save(self, *args, **kwargs):
+        # Resposta, contadores e status na mesma transação: o resumo do polo é marcado uma vez
+        with transaction.atomic():
+            self._save_with_progress(*args, **kwargs)
+
+    def _save_with_progress(self, *args, **kwargs):
+        previous_evaluation_id, previous_respondent, previous_evaluator = getattr(
+            self, '_loaded_progress', (self.evaluation_id, 0, 0)
+        )
         super().save(*args, **kwargs)
+
+        current_evaluation_id, respondent, evaluator = self.progress_state()
+        self._loaded_progress = (current_evaluation_id, respondent, evaluator)
+
+        if previous_evaluation_id != current_evaluation_id:
+            previous_evaluation = Evaluation.objects.filter(pk=previous_evaluation_id).first()
+            if previous_evaluation:
+                previous_evaluation.apply_progress_delta(-previous_respondent, -previous_evaluator)
+                previous_evaluation.refresh_status()
+            previous_respondent = previous_evaluator = 0
+
+        self.evaluation.apply_progress_delta(respondent - previous_respondent, evaluator - previous_evaluator)
         self.evaluation.refresh_status()
 
     def __str__(self):
@@ -300,3 +667,109 @@ class Polo(models.Model):
     def add_user(self, user):
         self.users.add(user)
 
+
+
+
+class PoloPeriodSummary(models.Model):
+    """
+    Resumo materializado por polo, empresa e mês do período, lido pelo painel do polo.
+    Mantido por apps.core.summaries a cada alteração de avaliações, respostas e planos
+    de ação; o comando rebuild_polo_summaries reconstrói a tabela inteira.
+    """
+    polo = models.ForeignKey(Polo, on_delete=models.CASCADE, related_name='period_summaries')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='period_summaries')
+    period = models.DateField(null=True, blank=True)  # Primeiro dia do mês
+
+    evaluations = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    in_progress = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    expired = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    scored = models.PositiveIntegerField(default=0)
+    average_score = models.FloatField(null=True, blank=True)
+    total_questions = models.PositiveIntegerField(default=0)
+    respondent_answered = models.PositiveIntegerField(default=0)
+    open_action_plans = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Resumo do Polo por Período"
+        verbose_name_plural = "Resumos dos Polos por Período"
+        constraints = [
+            models.UniqueConstraint(fields=['polo', 'company', 'period'], name='unique_polo_company_period_summary'),
+        ]
+        indexes = [
+            models.Index(fields=['polo', 'period'], name='polo_summary_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.polo} - {self.company} - {self.period}"
+
+    @property
+    def completion_rate(self):
+        return round(self.completed / self.evaluations * 100, 2) if self.evaluations else 0.0
+
+    @property
+    def answered_percentage(self):
+        return round(self.respondent_answered / self.total_questions * 100, 2) if self.total_questions else 0.0
+
+class PendingSummaryRefresh(models.Model):
+    """
+    Chave (empresa, mês) cujo resumo está desatualizado. Gravada junto com a alteração
+    e consumida pela tarefa core.refresh_summaries (ver apps.core.summaries).
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='+')
+    period = models.DateField(null=True, blank=True)  # Primeiro dia do mês
+    all_periods = models.BooleanField(default=False)  # Todos os meses da empresa (mudança de polos)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Atualização Pendente de Resumo"
+        verbose_name_plural = "Atualizações Pendentes de Resumos"
+
+    def __str__(self):
+        return f"{self.company_id} - {'todos' if self.all_periods else self.period}"
+
+
+class ExportBatch(models.Model):
+    """
+    Exportação em lote de avaliações (PDF ou XLSX) compactada em um único ZIP,
+    gerada por uma tarefa da fila (apps.jobs) e gravada em MEDIA_ROOT/exports.
+    """
+    FORMAT_CHOICES = [
+        ('pdf', 'PDF'),
+        ('xlsx', 'XLSX'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendente'),
+        ('RUNNING', 'Em Execução'),
+        ('COMPLETED', 'Concluída'),
+        ('FAILED', 'Falhou'),
+    ]
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='export_batches')
+    format = models.CharField(max_length=4, choices=FORMAT_CHOICES, default='pdf')
+    filters = models.JSONField(default=dict, blank=True)
+    evaluation_ids = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='exports/', blank=True, null=True)
+    error = models.TextField(blank=True)
+    job = models.ForeignKey('jobs.Job', on_delete=models.SET_NULL, null=True, blank=True, related_name='export_batches')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return f"Exportação {self.id} ({self.format}) - {self.get_status_display()}"
+
+    @property
+    def progress(self):
+        if not self.total:
+            return 100.0 if self.status == 'COMPLETED' else 0.0
+        return round(self.processed / self.total * 100, 2)
@@ -0,0 +1,166 @@
+#apps/core/pagination.py
+import base64
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CursorOrPageNumberPagination(StandardResultsSetPagination):
+    """
+    Paginação por página (padrão) ou por cursor quando ?cursor= é informado.
+
+    No modo cursor a página seguinte é buscada a partir dos valores da última linha
+    (keyset), na ordenação definida pela view em get_cursor_ordering() ou
+    cursor_ordering, cujo último campo deve ser único (ex.: ('-period', '-id')).
+    O custo de qualquer página é o mesmo da primeira. ?count=false omite o total.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    page_fallback = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            if not self.page_fallback:
+                return None
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.ordering = self._get_cursor_ordering(view)
+        page_size = self.get_page_size(request)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() not in ['false', '0', 'no', 'off']:
+            self.count = queryset.count()
+
+        queryset = queryset.order_by(*[self._order_expression(term) for term in self.ordering])
+        position = self._decode_cursor(request.query_params.get(self.cursor_query_param), queryset)
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(position))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page_rows = rows[:page_size]
+        return self.page_rows
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+
+        payload = {}
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['next'] = self.get_next_link()
+        payload['previous'] = None
+        payload['results'] = data
+        return Response(payload)
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        last_row = self.page_rows[-1]
+        values = [self._row_value(last_row, term.lstrip('-')) for term in self.ordering]
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self._encode_cursor(values))
+
+    def _get_cursor_ordering(self, view):
+        if hasattr(view, 'get_cursor_ordering'):
+            return list(view.get_cursor_ordering())
+        return list(getattr(view, 'cursor_ordering', ('-id',)))
+
+    def _order_expression(self, term):
+        # Nulos sempre ao final, igual em SQLite e SQL Server, para o filtro de busca ser previsível
+        if term.startswith('-'):
+            return F(term[1:]).desc(nulls_last=True)
+        return F(term).asc(nulls_last=True)
+
+    def _seek_filter(self, position):
+        """
+        (a > x) OR (a = x AND b > y) OR ..., respeitando a direção e os nulos ao final
+        """
+        condition = Q(pk__in=[])
+        equal_so_far = Q()
+        for term, value in zip(self.ordering, position):
+            field = term.lstrip('-')
+            if value is None:
+                # Nulos vêm por último: nada depois deles neste campo
+                equal_so_far &= Q(**{f'{field}__isnull': True})
+                continue
+            lookup = 'lt' if term.startswith('-') else 'gt'
+            after = Q(**{f'{field}__{lookup}': value}) | Q(**{f'{field}__isnull': True})
+            condition |= equal_so_far & after
+            equal_so_far &= Q(**{field: value})
+        return condition
+
+    def _row_value(self, row, path):
+        value = row
+        for part in path.split('__'):
+            value = getattr(value, part, None)
+            if value is None:
+                return None
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def _encode_cursor(self, values):
+        raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def _decode_cursor(self, encoded, queryset):
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError):
+            raise NotFound("Cursor inválido.")
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound("Cursor inválido.")
+
+        position = []
+        for term, value in zip(self.ordering, values):
+            field = self._ordering_field(queryset, term.lstrip('-'))
+            if field is not None and value is not None:
+                try:
+                    value = field.to_python(value)
+                except (TypeError, ValidationError):
+                    # JSON válido, mas com valor de tipo errado para o campo
+                    raise NotFound("Cursor inválido.")
+            position.append(value)
+        return position
+
+    def _ordering_field(self, queryset, path):
+        """
+        Campo que converte o valor do cursor: o output_field da anotação ou o campo do modelo
+        """
+        annotation = queryset.query.annotations.get(path)
+        if annotation is not None:
+            return annotation.output_field
+
+        model = queryset.model
+        field = None
+        for part in path.split('__'):
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                raise NotFound("Cursor inválido.")
+            model = field.related_model or model
+        return field
+
+
+class OptionalCursorPagination(CursorOrPageNumberPagination):
+    """
+    Mantém a listagem completa por padrão e só pagina quando ?cursor= é informado.
+    """
+    page_fallback = False
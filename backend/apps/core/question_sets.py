@@ -0,0 +1,99 @@
+#apps/core/question_sets.py
+"""
+Conjunto de perguntas compilado por formulário.
+
+Centenas de avaliações compartilham poucos formulários, então as perguntas de cada
+formulário são compiladas uma vez e guardadas em memória e no cache do Django,
+indexadas pela versão do formulário (Form.question_set_version). Os sinais em
+signals.py incrementam a versão quando perguntas, categorias, subcategorias ou as
+categorias do formulário mudam.
+"""
+from django.core.cache import cache
+from django.db.models import F
+from .models import Evaluation, Form, Question
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# form_id -> conjunto compilado da última versão vista neste processo
+_local_cache = {}
+
+
+def _cache_key(form_id, version):
+    return f"core:form_question_set:{form_id}:{version}"
+
+
+def compile_form_question_set(form_id, version):
+    questions = (
+        Question.objects.filter(category__forms=form_id)
+        .select_related('category', 'subcategory')
+        .order_by('id')
+    )
+    entries = [
+        {
+            'id': question.id,
+            'question': question.question,
+            'recommendation': question.recommendation,
+            'category_id': question.category_id,
+            'category_name': question.category.name,
+            'category_weight': question.category.weight,
+            'subcategory_id': question.subcategory_id,
+            'subcategory_name': question.subcategory.name if question.subcategory else None,
+        }
+        for question in questions
+    ]
+    return {
+        'form_id': form_id,
+        'version': version,
+        'question_ids': [entry['id'] for entry in entries],
+        'questions': entries,
+        'count': len(entries),
+    }
+
+
+def get_form_question_set(form):
+    """
+    Retorna o conjunto compilado de perguntas do formulário (instância ou id).
+    """
+    if not isinstance(form, Form):
+        form = Form.objects.only('id', 'question_set_version').get(pk=form)
+
+    form_id, version = form.pk, form.question_set_version
+    compiled = _local_cache.get(form_id)
+    if compiled is not None and compiled['version'] == version:
+        return compiled
+
+    key = _cache_key(form_id, version)
+    compiled = cache.get(key)
+    if compiled is None:
+        compiled = compile_form_question_set(form_id, version)
+        cache.set(key, compiled, CACHE_TIMEOUT)
+
+    _local_cache[form_id] = compiled
+    return compiled
+
+
+def invalidate_forms(form_ids):
+    """
+    Incrementa a versão dos formulários afetados e atualiza o total de perguntas
+    e o status das avaliações que os utilizam.
+    """
+    form_ids = {form_id for form_id in form_ids if form_id is not None}
+    if not form_ids:
+        return
+
+    Form.objects.filter(pk__in=form_ids).update(question_set_version=F('question_set_version') + 1)
+    for form_id in form_ids:
+        _local_cache.pop(form_id, None)
+    evaluations = Evaluation.objects.filter(form_id__in=form_ids)
+    evaluations.refresh_total_questions()
+    evaluations.refresh_status()
+
+
+def forms_for_categories(category_ids):
+    category_ids = [category_id for category_id in category_ids if category_id is not None]
+    if not category_ids:
+        return set()
+    return set(
+        Form.categories.through.objects.filter(categoryquestion_id__in=category_ids)
+        .values_list('form_id', flat=True)
+    )
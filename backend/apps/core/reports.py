@@ -0,0 +1,92 @@
+#apps/core/reports.py
+"""
+Relatórios agregados das avaliações, calculados no banco.
+"""
+from django.db.models import Count, Q, Sum
+from .models import Answer, NON_CONFORMING
+
+BREAKDOWN_COUNTS = {
+    'conforming': 'C',
+    'non_conforming': NON_CONFORMING,
+    'not_applicable': 'NA',
+    'in_analysis': 'A',
+}
+NO_SUBCATEGORY = 'Sem subcategoria'
+
+
+def _empty_totals():
+    return {'answered': 0, **{name: 0 for name in BREAKDOWN_COUNTS}, 'weight_lost': 0.0}
+
+
+def _add_totals(target, source):
+    for key, value in source.items():
+        target[key] += value
+
+
+def _with_rate(totals):
+    """
+    Taxa de conformidade: Conforme / (Conforme + Não Conforme); NA e Em Análise não entram
+    """
+    judged = totals['conforming'] + totals['non_conforming']
+    totals['conformity_rate'] = round(totals['conforming'] / judged * 100, 2) if judged else None
+    totals['weight_lost'] = round(totals['weight_lost'], 2)
+    return totals
+
+
+def score_breakdown(answers):
+    """
+    Agrupa as respostas do avaliador por categoria e subcategoria em um único GROUP BY.
+    Retorna (categorias com suas subcategorias, totais gerais).
+    """
+    rows = (
+        answers.filter(answer_evaluator__isnull=False).exclude(answer_evaluator='')
+        .order_by()
+        .values(
+            'question__category_id', 'question__category__name', 'question__category__weight',
+            'question__subcategory_id', 'question__subcategory__name',
+        )
+        .annotate(
+            answered=Count('id'),
+            **{
+                name: Count('id', filter=Q(answer_evaluator=value))
+                for name, value in BREAKDOWN_COUNTS.items()
+            },
+            weight_lost=Sum('question__category__weight', filter=Q(answer_evaluator=NON_CONFORMING)),
+        )
+    )
+
+    categories = {}
+    overall = _empty_totals()
+    for row in rows:
+        totals = {key: row[key] or 0 for key in _empty_totals()}
+        category = categories.setdefault(row['question__category_id'], {
+            'category_id': row['question__category_id'],
+            'category_name': row['question__category__name'],
+            'weight': row['question__category__weight'],
+            **_empty_totals(),
+            'subcategories': [],
+        })
+        _add_totals(category, totals)
+        _add_totals(overall, totals)
+        category['subcategories'].append({
+            'subcategory_id': row['question__subcategory_id'],
+            'subcategory_name': row['question__subcategory__name'] or NO_SUBCATEGORY,
+            **totals,
+        })
+
+    result = []
+    for category in sorted(categories.values(), key=lambda item: (item['category_name'], item['category_id'])):
+        category['subcategories'] = [
+            _with_rate(subcategory)
+            for subcategory in sorted(category['subcategories'], key=lambda item: (item['subcategory_name'], item['subcategory_id'] or 0))
+        ]
+        result.append(_with_rate(category))
+    return result, _with_rate(overall)
+
+
+def evaluation_score_breakdown(evaluation):
+    return score_breakdown(Answer.objects.filter(evaluation=evaluation))
+
+
+def evaluations_score_breakdown(evaluations):
+    return score_breakdown(Answer.objects.filter(evaluation__in=evaluations.order_by().values('pk')))
@@ -0,0 +1,54 @@
+#apps/core/search.py
+"""
+Busca de empresas pela chave normalizada (Company.search_key).
+
+O backend padrão ('prefix') procura o início do nome, sem acentos e sem diferenciar
+maiúsculas, ou o início do CNPJ, usando os índices das duas colunas. Com
+COMPANY_SEARCH_BACKEND = 'fulltext' a busca usa o índice de texto completo do banco
+(FTS5 no SQLite, Full-Text Search no SQL Server) e encontra qualquer palavra do nome,
+CNPJ ou domínio que comece com os termos. O índice é criado por setup_company_search.
+Em outros bancos a configuração 'fulltext' é ignorada e vale a busca por prefixo.
+"""
+import logging
+import re
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .utils import clean_cnpj, fold_search_text
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'core_company_fts'
+FULLTEXT_VENDORS = ('sqlite', 'microsoft')
+
+
+def _fulltext_ids(terms):
+    if connection.vendor == 'sqlite':
+        query = ' AND '.join(f'"{term}"*' for term in terms)
+        return RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [query])
+    query = ' AND '.join(f'"{term}*"' for term in terms)
+    return RawSQL('SELECT id FROM core_company WHERE CONTAINS(search_key, %s)', [query])
+
+
+def company_search_condition(search, prefix=''):
+    """
+    Condição de busca de empresas; prefix permite filtrar por relação (ex.: 'company__')
+    """
+    folded = fold_search_text(search)
+    fulltext = settings.COMPANY_SEARCH_BACKEND == 'fulltext'
+    if fulltext and connection.vendor not in FULLTEXT_VENDORS:
+        logger.warning("Busca de texto completo não suportada no banco %s; usando a busca por prefixo",
+                       connection.vendor)
+        fulltext = False
+    if fulltext:
+        terms = re.findall(r'\w+', folded)
+        if not terms:
+            return Q()
+        return Q(**{f'{prefix}id__in': _fulltext_ids(terms)})
+
+    condition = Q(**{f'{prefix}search_key__startswith': folded})
+    # CNPJ digitado com ou sem máscara
+    if re.fullmatch(r'[\d./\-\s]+', search):
+        condition |= Q(**{f'{prefix}cnpj__startswith': clean_cnpj(search)})
+    return condition
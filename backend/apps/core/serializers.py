@@ -1,9 +1,13 @@
 #apps/core/serializers.py
 import os
+from django.urls import reverse
 from django.utils import timezone
+from django.db.models import Exists, OuterRef
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
-from .models import Company, CategoryQuestion, Question, Form, Answer, Subcategory, Evaluation, ActionPlan, Polo
+from rest_framework.permissions import SAFE_METHODS
+from .models import Company, CategoryQuestion, Question, Form, Answer, Subcategory, Evaluation, ActionPlan, Polo, PoloPeriodSummary, ExportBatch, ANSWER_CHOICES
+from .question_sets import get_form_question_set
 from .utils import format_cnpj_display
 
 
@@ -14,7 +18,59 @@ class ScoreResponseSerializer(serializers.Serializer):
     message = serializers.CharField()
 
 
-class CompanySerializer(serializers.ModelSerializer):
+def _split_param(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Seleção de campos pela query string nas leituras (GET):
+
+    - ?fields=id,name devolve apenas os campos pedidos;
+    - ?expand=campo inclui campos caros (Meta.expandable_fields), que ficam de fora
+      sempre que fields= ou expand= é informado;
+    - sem os dois parâmetros, todos os campos são devolvidos.
+
+    Meta.field_querysets associa cada campo à otimização de consulta que ele usa
+    (select_related, prefetch_related, anotações); optimize_queryset aplica apenas
+    as dos campos selecionados.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.selected_fields(self.context.get('request'))
+        if selected is not None:
+            for name in set(self.fields) - selected:
+                self.fields.pop(name)
+
+    @classmethod
+    def selected_fields(cls, request):
+        """
+        Conjunto de campos pedidos na requisição, ou None para todos os campos
+        """
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = request.query_params
+        if 'fields' not in params and 'expand' not in params:
+            return None
+
+        expandable = set(getattr(cls.Meta, 'expandable_fields', ()))
+        if params.get('fields'):
+            selected = _split_param(params['fields'])
+        else:
+            selected = set(cls.Meta.fields) - expandable
+        return selected | (_split_param(params.get('expand')) & expandable)
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request=None):
+        selected = cls.selected_fields(request)
+        for name, optimize in getattr(cls.Meta, 'field_querysets', {}).items():
+            if selected is None or name in selected:
+                queryset = optimize(queryset)
+        return queryset
+
+
+class CompanySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     cnpj_display = serializers.SerializerMethodField()
     users_list = serializers.SerializerMethodField()
     has_evaluations = serializers.SerializerMethodField()
@@ -22,6 +78,14 @@ class CompanySerializer(serializers.ModelSerializer):
     class Meta:
         model = Company
         fields = ['id', 'name', 'cnpj', 'cnpj_display', 'is_active', 'users', 'users_list', 'dominio', 'has_evaluations']
+        expandable_fields = ['users_list']
+        field_querysets = {
+            'users': lambda queryset: queryset.prefetch_related('users'),
+            'users_list': lambda queryset: queryset.prefetch_related('users'),
+            'has_evaluations': lambda queryset: queryset.annotate(
+                has_evaluations=Exists(Evaluation.objects.filter(company=OuterRef('pk'), is_active=True))
+            ),
+        }
     
     def get_cnpj_display(self, obj):
         """
@@ -46,7 +110,8 @@ class CompanySerializer(serializers.ModelSerializer):
         Customiza a representação para mostrar o CNPJ formatado
         """
         data = super().to_representation(instance)
-        data['cnpj'] = format_cnpj_display(instance.cnpj)
+        if 'cnpj' in data:
+            data['cnpj'] = format_cnpj_display(instance.cnpj)
         return data
 
 class CategoryQuestionSerializer(serializers.ModelSerializer):
@@ -81,7 +146,7 @@ class FormSerializer(serializers.ModelSerializer):
         return [category.name for category in obj.categories.all()]
     
 
-class EvaluationSerializer(serializers.ModelSerializer):
+class EvaluationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     company_name = serializers.CharField(source="company.name", read_only=True)
     form_name = serializers.CharField(source="form.name", read_only=True)
     action_plan = serializers.SerializerMethodField()
@@ -120,6 +185,12 @@ class EvaluationSerializer(serializers.ModelSerializer):
             'fully_evaluated',
             'action_plan'
         ]
+        expandable_fields = ['action_plan']
+        field_querysets = {
+            'company_name': lambda queryset: queryset.select_related('company'),
+            'form_name': lambda queryset: queryset.select_related('form'),
+            'action_plan': lambda queryset: queryset.with_action_plan(),
+        }
     
     # Métodos para os campos adicionados
     @extend_schema_field(serializers.IntegerField())
@@ -150,25 +221,28 @@ class EvaluationSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.BooleanField())
     def get_fully_answered(self, obj) -> bool:
+        annotated_value = getattr(obj, 'progress_fully_answered', None)
+        if annotated_value is not None:
+            return annotated_value
         total = obj.total_questions_count
         return total > 0 and obj.respondent_answers_count >= total
 
     @extend_schema_field(serializers.BooleanField())
     def get_fully_evaluated(self, obj) -> bool:
+        annotated_value = getattr(obj, 'progress_fully_evaluated', None)
+        if annotated_value is not None:
+            return annotated_value
         total = obj.total_questions_count
         return total > 0 and obj.evaluator_answers_count >= total
     
     @extend_schema_field(serializers.IntegerField(allow_null=True))
     def get_action_plan(self, obj):
         # Retorna o ID do plano de ação associado à avaliação ou None se não existir
+        if hasattr(obj, 'action_plan_id'):
+            return obj.action_plan_id
         action_plan = obj.action_plans.first()  # Como só existe um plano de ação, pegamos o primeiro
         return action_plan.id if action_plan else None
 
-    def to_representation(self, instance):
-        instance.refresh_status()
-        return super().to_representation(instance)
-
-
     def validate(self, data):
         # Verifica se a requisição é um POST
         request = self.context.get('request')
@@ -214,6 +288,24 @@ class EvaluationSerializer(serializers.ModelSerializer):
 
 
 
+ANSWER_ATTACHMENT_EXTENSIONS = ['.pdf', '.zip', '.jpg', '.jpeg', '.png', '.doc', '.docx', '.xlsx', '.xls']
+
+
+def validate_answer_attachment(value):
+    if value:
+        # Validar tamanho (25MB)
+        if value.size > 1024 * 1024 * 25:
+            raise serializers.ValidationError("O arquivo não pode exceder 25MB.")
+
+        # Validar tipo de arquivo
+        ext = os.path.splitext(value.name)[1].lower()
+        if ext not in ANSWER_ATTACHMENT_EXTENSIONS:
+            raise serializers.ValidationError(
+                f"Tipo de arquivo não permitido. Extensões aceitas: {', '.join(ANSWER_ATTACHMENT_EXTENSIONS)}"
+            )
+    return value
+
+
 class AnswerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Answer
@@ -235,53 +327,66 @@ class AnswerSerializer(serializers.ModelSerializer):
 
 
     def validate_attachment_respondent(self, value):
-        if value:
-            # Validar tamanho (25MB)
-            if value.size > 1024 * 1024 * 25:
-                raise serializers.ValidationError("O arquivo não pode exceder 25MB.")
-            
-            # Validar tipo de arquivo
-            allowed_extensions = ['.pdf', '.zip', '.jpg', '.jpeg', '.png', '.doc', '.docx', '.xlsx', '.xls']
-            ext = os.path.splitext(value.name)[1].lower()
-            if ext not in allowed_extensions:
-                raise serializers.ValidationError(
-                    f"Tipo de arquivo não permitido. Extensões aceitas: {', '.join(allowed_extensions)}"
-                )
-        return value
+        return validate_answer_attachment(value)
 
     def validate_attachment_evaluator(self, value):
-        if value:
-            # Validar tamanho (25MB)
-            if value.size > 1024 * 1024 * 25:
-                raise serializers.ValidationError("O arquivo não pode exceder 25MB.")
-            
-            # Validar tipo de arquivo
-            allowed_extensions = ['.pdf', '.zip', '.jpg', '.jpeg', '.png', '.doc', '.docx', '.xlsx', '.xls']
-            ext = os.path.splitext(value.name)[1].lower()
-            if ext not in allowed_extensions:
-                raise serializers.ValidationError(
-                    f"Tipo de arquivo não permitido. Extensões aceitas: {', '.join(allowed_extensions)}"
-                )
+        return validate_answer_attachment(value)
+
+
+class BulkAnswerItemSerializer(serializers.Serializer):
+    """
+    Item do envio em lote de respostas; a avaliação e a empresa vêm da URL.
+    """
+    question = serializers.IntegerField()
+    answer_respondent = serializers.ChoiceField(choices=ANSWER_CHOICES, required=False)
+    date_respondent = serializers.DateField(required=False, allow_null=True)
+    answer_evaluator = serializers.ChoiceField(choices=ANSWER_CHOICES, required=False, allow_null=True, allow_blank=True)
+    date_evaluator = serializers.DateField(required=False, allow_null=True)
+    note = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    attachment_respondent = serializers.FileField(required=False, allow_null=True)
+    attachment_evaluator = serializers.FileField(required=False, allow_null=True)
+
+    def validate_question(self, value):
+        if value not in self.context.get('question_ids', ()):
+            raise serializers.ValidationError("Pergunta não pertence ao formulário desta avaliação.")
         return value
 
+    def validate_attachment_respondent(self, value):
+        return validate_answer_attachment(value)
+
+    def validate_attachment_evaluator(self, value):
+        return validate_answer_attachment(value)
+
+    def validate(self, data):
+        if data['question'] not in self.context.get('existing_question_ids', ()) and not data.get('answer_respondent'):
+            raise serializers.ValidationError({'answer_respondent': "Este campo é obrigatório para novas respostas."})
+        return data
+
 
 #-----------------------Detalhes da avaliação------------------------------
 
-class QuestionWithAnswerSerializer(serializers.ModelSerializer):
+class QuestionWithAnswerSerializer(serializers.Serializer):
+    """
+    Serializa as entradas do conjunto compilado de perguntas (ver question_sets.py)
+    """
+    id = serializers.IntegerField(read_only=True)
+    question = serializers.CharField(read_only=True)
+    recommendation = serializers.CharField(read_only=True, allow_null=True)
+    category_name = serializers.CharField(read_only=True)
+    subcategory_name = serializers.CharField(read_only=True, allow_null=True)
     answer = serializers.SerializerMethodField()
-    category_name = serializers.CharField(source='category.name', read_only=True)
-    subcategory_name = serializers.CharField(source='subcategory.name', read_only=True)
-
-    class Meta:
-        model = Question
-        fields = ['id', 'question', 'recommendation', 'category_name', 'subcategory_name', 'answer']
 
     def get_answer(self, obj):
-        evaluation = self.context.get('evaluation')
-        try:
-            answer = Answer.objects.get(question=obj, evaluation=evaluation)
+        answers_by_question = self.context.get('answers_by_question')
+        if answers_by_question is not None:
+            answer = answers_by_question.get(obj['id'])
+        else:
+            evaluation = self.context.get('evaluation')
+            answer = Answer.objects.filter(question_id=obj['id'], evaluation=evaluation).select_related('question').first()
+
+        if answer is not None:
             return AnswerDetailSerializer(answer).data
-        except Answer.DoesNotExist:
+        else:
             return {
                 'answer_respondent': None,
                 'attachment_respondent': None,
@@ -337,8 +442,18 @@ class EvaluationDetailSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.ListField(child=serializers.DictField()))
     def get_questions(self, obj):
-        questions = Question.objects.filter(category__in=obj.form.categories.all())
-        return QuestionWithAnswerSerializer(questions, many=True, context={'evaluation': obj, 'request': self.context.get('request')}).data
+        questions = get_form_question_set(obj.form)['questions']
+        # Todas as respostas da avaliação em uma consulta, indexadas pela pergunta
+        answers_by_question = {
+            answer.question_id: answer
+            for answer in obj.answers.select_related('question')
+        }
+        context = {
+            'evaluation': obj,
+            'answers_by_question': answers_by_question,
+            'request': self.context.get('request'),
+        }
+        return QuestionWithAnswerSerializer(questions, many=True, context=context).data
 
 
 class EvaluationProgressSerializer(serializers.ModelSerializer):
@@ -351,18 +466,49 @@ class EvaluationProgressSerializer(serializers.ModelSerializer):
         fields = ['id', 'total_questions', 'answered_questions', 'unanswered_questions']
 
     def get_total_questions(self, obj):
-        # Pega todas as perguntas relacionadas ao formulário da avaliação
-        return Question.objects.filter(category__in=obj.form.categories.all()).count()
+        return obj.total_questions_count
 
     def get_answered_questions(self, obj):
-        # Conta as respostas que foram respondidas pelo respondente
-        return Answer.objects.filter(evaluation=obj).exclude(answer_respondent__isnull=True).exclude(answer_respondent='').count()
+        return obj.respondent_answers_count
 
     def get_unanswered_questions(self, obj):
-        # Total de perguntas menos o total de perguntas respondidas
-        total_questions = self.get_total_questions(obj)
-        answered_questions = self.get_answered_questions(obj)
-        return total_questions - answered_questions
+        return obj.total_questions_count - obj.respondent_answers_count
+
+
+class EvaluationFilterSerializer(serializers.Serializer):
+    """
+    Filtros das operações em lote sobre avaliações (exportação, recálculo de notas)
+    """
+    polo = serializers.IntegerField(required=False)
+    period_year = serializers.IntegerField(required=False, min_value=1900)
+    period_month = serializers.IntegerField(required=False, min_value=1, max_value=12)
+    status = serializers.ChoiceField(choices=Evaluation.STATUS_CHOICES, required=False)
+    # default=None: em query string a ausência do campo não deve virar False
+    is_active = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+
+class ExportBatchRequestSerializer(EvaluationFilterSerializer):
+    format = serializers.ChoiceField(choices=ExportBatch.FORMAT_CHOICES, default='pdf')
+
+
+class ExportBatchSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportBatch
+        fields = [
+            'id', 'job', 'format', 'filters', 'status', 'status_display', 'total', 'processed',
+            'progress', 'error', 'created_at', 'started_at', 'finished_at', 'download_url',
+        ]
+
+    def get_download_url(self, obj):
+        if obj.status != 'COMPLETED' or not obj.file:
+            return None
+        path = reverse('evaluation-export-batch-download', kwargs={'batch_id': obj.id})
+        request = self.context.get('request')
+        return request.build_absolute_uri(path) if request else path
 
 
 class ActionPlanSerializer(serializers.ModelSerializer):
@@ -447,3 +593,17 @@ class PoloSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
         read_only_fields = ("created_at", "updated_at")
+
+
+class PoloPeriodSummarySerializer(serializers.ModelSerializer):
+    company_name = serializers.CharField(source='company.name', read_only=True)
+    completion_rate = serializers.FloatField(read_only=True)
+    answered_percentage = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = PoloPeriodSummary
+        fields = [
+            'company', 'company_name', 'period', 'evaluations', 'pending', 'in_progress', 'completed',
+            'expired', 'cancelled', 'scored', 'average_score', 'completion_rate', 'total_questions',
+            'respondent_answered', 'answered_percentage', 'open_action_plans', 'updated_at',
+        ]
@@ -0,0 +1,124 @@
+#apps/core/signals.py
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from .domains import invalidate_domains
+from .models import ActionPlan, Answer, CategoryQuestion, Company, Evaluation, Form, Polo, PoloPeriodSummary, Question, Subcategory
+from apps.jobs.queue import enqueue
+from .question_sets import forms_for_categories, invalidate_forms
+from .summaries import schedule_refresh
+
+
+@receiver(post_delete, sender=Answer)
+def update_progress_on_answer_delete(sender, instance, **kwargs):
+    """
+    Desconta a resposta excluída dos contadores da avaliação
+    """
+    evaluation_id, respondent, evaluator = getattr(instance, '_loaded_progress', instance.progress_state())
+    evaluation = Evaluation.objects.filter(pk=evaluation_id).first()
+    if evaluation is None:
+        return
+    evaluation.apply_progress_delta(-respondent, -evaluator)
+    evaluation.refresh_status()
+
+
+@receiver(post_save, sender=ActionPlan)
+@receiver(post_delete, sender=ActionPlan)
+def bump_evaluation_version_on_action_plan_change(sender, instance, **kwargs):
+    """
+    O plano de ação faz parte das exportações: muda a versão (ETag/cache) da avaliação
+    """
+    Evaluation.objects.filter(pk=instance.evaluation_id).versioned_update()
+
+
+#-----------------------Invalidação do conjunto de perguntas------------------------------
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_set_on_question_change(sender, instance, **kwargs):
+    category_ids = {instance.category_id, getattr(instance, '_loaded_category_id', None)}
+    invalidate_forms(forms_for_categories(category_ids))
+    instance._loaded_category_id = instance.category_id
+
+
+@receiver(post_save, sender=CategoryQuestion)
+@receiver(post_delete, sender=CategoryQuestion)
+def invalidate_question_set_on_category_change(sender, instance, **kwargs):
+    invalidate_forms(forms_for_categories([instance.pk]))
+
+
+@receiver(post_save, sender=CategoryQuestion)
+def rescore_on_category_weight_change(sender, instance, created, **kwargs):
+    """
+    Peso alterado: agenda o recálculo das notas das avaliações cujo formulário usa a categoria
+    """
+    loaded_weight = getattr(instance, '_loaded_weight', None)
+    instance._loaded_weight = instance.weight
+    if created or loaded_weight is None or loaded_weight == instance.weight:
+        return
+    transaction.on_commit(lambda: enqueue('core.rescore_category', {
+        'category_id': instance.pk,
+        'previous_weight': loaded_weight,
+        'weight': instance.weight,
+    }))
+
+
+@receiver(post_save, sender=Subcategory)
+@receiver(post_delete, sender=Subcategory)
+def invalidate_question_set_on_subcategory_change(sender, instance, **kwargs):
+    invalidate_forms(forms_for_categories([instance.category_id]))
+
+
+@receiver(m2m_changed, sender=Form.categories.through)
+def invalidate_question_set_on_form_categories_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+
+    if not reverse:
+        # instance é o formulário
+        if action != 'pre_clear':
+            invalidate_forms([instance.pk])
+        return
+
+    # instance é a categoria; pk_set contém formulários (ou None ao limpar)
+    if action == 'pre_clear':
+        instance._cleared_form_ids = forms_for_categories([instance.pk])
+    elif action == 'post_clear':
+        invalidate_forms(getattr(instance, '_cleared_form_ids', set()))
+    else:
+        invalidate_forms(pk_set or [])
+
+
+#-----------------------Resumo dos polos por período------------------------------
+
+@receiver(post_save, sender=Evaluation)
+@receiver(post_delete, sender=Evaluation)
+def refresh_summary_on_evaluation_change(sender, instance, **kwargs):
+    keys = {(instance.company_id, instance.period)}
+    loaded_key = getattr(instance, '_loaded_summary_key', None)
+    if loaded_key:
+        keys.add(loaded_key)
+    schedule_refresh(keys)
+    instance._loaded_summary_key = (instance.company_id, instance.period)
+
+
+@receiver(m2m_changed, sender=Polo.companies.through)
+def refresh_summary_on_polo_companies_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        # company.poles.add/remove/clear(): instance é a empresa
+        schedule_refresh(company_ids={instance.pk})
+    elif action == 'post_clear':
+        PoloPeriodSummary.objects.filter(polo=instance).delete()
+    else:
+        schedule_refresh(company_ids=set(pk_set))
+
+
+#-----------------------Empresas por domínio------------------------------
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_domains_on_company_change(sender, instance, **kwargs):
+    invalidate_domains()
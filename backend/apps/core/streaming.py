@@ -0,0 +1,36 @@
+#apps/core/streaming.py
+"""
+Respostas JSON em streaming para listagens sem paginação.
+"""
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def wants_stream(request):
+    return request.query_params.get('stream', '').lower() in ['true', '1', 't', 'yes', 'on']
+
+
+def stream_json_array(queryset, serializer, chunk_size=None):
+    """
+    Envia o queryset como um array JSON gerado aos poucos: as linhas são lidas em lotes
+    (iterator com chunk_size, que mantém os prefetch_related por lote) e cada lote é
+    serializado e escrito antes de buscar o próximo.
+    """
+    chunk_size = chunk_size or settings.STREAM_CHUNK_SIZE
+    encoder = JSONEncoder(ensure_ascii=False)
+
+    def chunks():
+        yield '['
+        batch = []
+        separator = ''
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            batch.append(encoder.encode(serializer.to_representation(instance)))
+            if len(batch) >= chunk_size:
+                yield separator + ','.join(batch)
+                separator, batch = ',', []
+        if batch:
+            yield separator + ','.join(batch)
+        yield ']'
+
+    return StreamingHttpResponse(chunks(), content_type='application/json')
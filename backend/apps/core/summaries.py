@@ -0,0 +1,270 @@
+#apps/core/summaries.py
+"""
+Manutenção da tabela PoloPeriodSummary.
+
+Cada linha resume as avaliações de uma empresa em um mês (status, nota média,
+progresso das respostas, planos de ação em aberto) e é replicada para cada polo
+da empresa. As alterações juntam as chaves (empresa, mês) afetadas durante a
+transação e, no commit, gravam-nas em PendingSummaryRefresh com um único INSERT.
+A tarefa core.refresh_summaries, agendada no máximo uma vez por intervalo
+(POLO_SUMMARY_REFRESH_DELAY) em cada processo, recalcula todas as chaves pendentes
+com duas consultas agrupadas, fora da requisição; ela só roda com o comando
+run_workers ativo. Sem worker, POLO_SUMMARY_REFRESH_ASYNC = False recalcula as
+chaves no próprio commit.
+"""
+import threading
+from datetime import timedelta
+from functools import partial
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from apps.jobs.queue import enqueue
+from .models import ActionPlan, Company, Evaluation, PendingSummaryRefresh, Polo, PoloPeriodSummary
+
+STATUS_FIELDS = {
+    'PENDING': 'pending',
+    'IN_PROGRESS': 'in_progress',
+    'COMPLETED': 'completed',
+    'EXPIRED': 'expired',
+    'CANCELLED': 'cancelled',
+}
+SUMMED_FIELDS = [
+    'evaluations', *STATUS_FIELDS.values(), 'scored', 'total_questions', 'respondent_answered', 'open_action_plans',
+]
+REFRESH_JOB = 'core.refresh_summaries'
+REFRESH_JOB_GUARD_KEY = 'core:summaries:refresh_scheduled'
+# Pendências lidas por vez (e limite de parâmetros do IN no SQL Server)
+PENDING_BATCH_SIZE = 1000
+
+
+def month_start(value):
+    return value.replace(day=1) if value else None
+
+
+def next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def summary_key(company_id, period):
+    return (company_id, month_start(period))
+
+
+def _scope(queryset, company_field, period_field, company_ids, months):
+    """
+    Filtra as empresas e os meses; cada mês vira um intervalo period >= início e
+    < início do mês seguinte, que usa o índice da data (TruncMonth(...)__in não usa)
+    """
+    if company_ids is not None:
+        queryset = queryset.filter(**{f'{company_field}__in': company_ids})
+    if months is not None:
+        condition = Q(pk__in=[])
+        for month in months:
+            if month is None:
+                condition |= Q(**{f'{period_field}__isnull': True})
+            else:
+                condition |= Q(**{f'{period_field}__gte': month, f'{period_field}__lt': next_month(month)})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def _build_rows(company_ids, months):
+    evaluations = _scope(
+        Evaluation.objects.annotate(month=TruncMonth('period')), 'company_id', 'period', company_ids, months
+    )
+    rows = {
+        (row.pop('company_id'), row.pop('month')): row
+        for row in evaluations.order_by().values('company_id', 'month').annotate(
+            evaluations=Count('id'),
+            **{field: Count('id', filter=Q(status=status)) for status, field in STATUS_FIELDS.items()},
+            scored=Count('score'),
+            average_score=Avg('score'),
+            total_questions=Sum('total_questions'),
+            respondent_answered=Sum('respondent_answered'),
+        )
+    }
+
+    open_plans = _scope(
+        ActionPlan.objects.exclude(status='COMPLETED').annotate(month=TruncMonth('evaluation__period')),
+        'evaluation__company_id', 'evaluation__period', company_ids, months,
+    )
+    for row in open_plans.order_by().values('evaluation__company_id', 'month').annotate(total=Count('id')):
+        key = (row['evaluation__company_id'], row['month'])
+        if key in rows:
+            rows[key]['open_action_plans'] = row['total']
+
+    poles_by_company = {}
+    memberships = Polo.companies.through.objects.filter(company_id__in={company_id for company_id, _ in rows})
+    for company_id, polo_id in memberships.values_list('company_id', 'polo_id'):
+        poles_by_company.setdefault(company_id, []).append(polo_id)
+
+    return [
+        PoloPeriodSummary(polo_id=polo_id, company_id=company_id, period=month, **values)
+        for (company_id, month), values in rows.items()
+        for polo_id in poles_by_company.get(company_id, [])
+    ]
+
+
+def refresh_summaries(keys=None, company_ids=None):
+    """
+    Recalcula os resumos das chaves (empresa, mês) informadas, de todos os meses das
+    empresas em company_ids ou, sem argumentos, da tabela inteira.
+    """
+    months = None
+    if keys is not None:
+        keys = {summary_key(company_id, period) for company_id, period in keys}
+        if not keys:
+            return 0
+        company_ids = {company_id for company_id, _ in keys}
+        months = {month for _, month in keys}
+
+    # Duas atualizações simultâneas da mesma chave podem colidir na constraint única;
+    # a segunda tentativa recalcula a partir do estado já gravado
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                # Apaga e recria exatamente o mesmo escopo (empresas x meses) que foi recalculado
+                summaries = _build_rows(company_ids, months)
+                _scope(PoloPeriodSummary.objects.all(), 'company_id', 'period', company_ids, months).delete()
+                PoloPeriodSummary.objects.bulk_create(summaries)
+            return len(summaries)
+        except IntegrityError:
+            if attempt:
+                raise
+
+
+# Chaves marcadas e ainda não gravadas, por conexão (alias) de cada thread
+_local = threading.local()
+
+
+def _pending(alias):
+    if not hasattr(_local, 'pending'):
+        _local.pending = {}
+    return _local.pending.setdefault(alias, {'keys': set(), 'company_ids': set()})
+
+
+def _flush_pending(alias):
+    """
+    Callback de commit: o primeiro a rodar grava tudo o que foi marcado na conexão,
+    os demais da mesma transação não encontram mais nada
+    """
+    pending = getattr(_local, 'pending', {}).pop(alias, None)
+    if not pending:
+        return
+    if settings.POLO_SUMMARY_REFRESH_ASYNC:
+        mark_pending(pending['keys'], pending['company_ids'])
+    else:
+        refresh_now(pending['keys'], pending['company_ids'])
+
+
+def discard_pending():
+    """
+    Descarta as chaves marcadas e não gravadas nesta thread (ex.: após um rollback)
+    """
+    getattr(_local, 'pending', {}).clear()
+
+
+def schedule_refresh(keys=None, company_ids=None):
+    """
+    Marca as chaves (empresa, mês) ou todos os meses das empresas em company_ids para
+    atualização após o commit da transação atual. Várias chamadas na mesma transação
+    (ex.: versioned_update e save da avaliação) resultam em uma única gravação.
+    Falhas são registradas sem afetar a requisição (rebuild_polo_summaries corrige).
+    """
+    keys = {summary_key(*key) for key in keys or () if key[0] is not None}
+    company_ids = {company_id for company_id in company_ids or () if company_id is not None}
+    if not keys and not company_ids:
+        return
+
+    connection = transaction.get_connection()
+    pending = _pending(connection.alias)
+    pending['keys'] |= keys
+    pending['company_ids'] |= company_ids
+    # Fora de uma transação o callback roda na hora, por isso é registrado depois de preenchido
+    transaction.on_commit(partial(_flush_pending, connection.alias), using=connection.alias, robust=True)
+
+
+def refresh_now(keys=(), company_ids=()):
+    """
+    Recalcula as chaves no próprio processo, sem a fila (POLO_SUMMARY_REFRESH_ASYNC = False)
+    """
+    keys = {key for key in keys if key[0] not in company_ids}
+    written = refresh_summaries(company_ids=company_ids) if company_ids else 0
+    return written + (refresh_summaries(keys=keys) if keys else 0)
+
+
+def _pending_rows(keys, company_ids):
+    return [
+        *(PendingSummaryRefresh(company_id=company_id, period=month) for company_id, month in keys),
+        *(PendingSummaryRefresh(company_id=company_id, all_periods=True) for company_id in company_ids),
+    ]
+
+
+def mark_pending(keys=(), company_ids=()):
+    """
+    Grava as chaves pendentes e agenda a tarefa de atualização, no máximo uma por
+    intervalo neste processo; ela roda ao fim do intervalo e processa tudo o que
+    foi marcado até lá.
+    """
+    try:
+        with transaction.atomic():
+            PendingSummaryRefresh.objects.bulk_create(_pending_rows(keys, company_ids))
+    except IntegrityError:
+        # Chaves que sobraram de uma transação desfeita podem citar empresas que não existem
+        existing = set(Company.objects.filter(
+            pk__in={company_id for company_id, _ in keys} | set(company_ids)
+        ).values_list('pk', flat=True))
+        PendingSummaryRefresh.objects.bulk_create(_pending_rows(
+            {key for key in keys if key[0] in existing}, set(company_ids) & existing
+        ))
+    delay = settings.POLO_SUMMARY_REFRESH_DELAY
+    if delay <= 0 or cache.add(REFRESH_JOB_GUARD_KEY, True, timeout=delay):
+        enqueue(REFRESH_JOB, run_at=timezone.now() + timedelta(seconds=delay))
+
+
+def refresh_pending():
+    """
+    Recalcula os resumos de todas as chaves pendentes, em lotes. Retorna quantas
+    linhas de resumo foram gravadas.
+    """
+    written = 0
+    while True:
+        pending = list(
+            PendingSummaryRefresh.objects.order_by('pk')
+            .values_list('pk', 'company_id', 'period', 'all_periods')[:PENDING_BATCH_SIZE]
+        )
+        if not pending:
+            return written
+
+        company_ids = {company_id for _, company_id, _, all_periods in pending if all_periods}
+        keys = {
+            (company_id, period) for _, company_id, period, all_periods in pending
+            if not all_periods and company_id not in company_ids
+        }
+        if company_ids:
+            written += refresh_summaries(company_ids=company_ids)
+        if keys:
+            written += refresh_summaries(keys=keys)
+        PendingSummaryRefresh.objects.filter(pk__in=[row[0] for row in pending]).delete()
+
+
+def summary_totals(summaries):
+    """
+    Soma as linhas do resumo; a nota média é ponderada pela quantidade de avaliações pontuadas.
+    """
+    totals = {field: 0 for field in SUMMED_FIELDS}
+    score_sum = 0.0
+    for summary in summaries:
+        for field in SUMMED_FIELDS:
+            totals[field] += getattr(summary, field)
+        if summary.average_score is not None:
+            score_sum += summary.average_score * summary.scored
+
+    totals['average_score'] = round(score_sum / totals['scored'], 2) if totals['scored'] else None
+    totals['completion_rate'] = round(totals['completed'] / totals['evaluations'] * 100, 2) if totals['evaluations'] else 0.0
+    totals['answered_percentage'] = (
+        round(totals['respondent_answered'] / totals['total_questions'] * 100, 2) if totals['total_questions'] else 0.0
+    )
+    return totals
@@ -0,0 +1,76 @@
+#apps/core/tenancy.py
+"""
+Escopo das listagens pelas empresas visíveis ao usuário.
+
+O conjunto de IDs é resolvido uma vez por requisição e guardado nela: superusuário vê
+tudo, ou só as empresas do polo do cabeçalho X-Polo-Id; os demais usuários veem as
+empresas associadas a eles. As views filtram com company_id__in (coluna indexada) em vez
+dos joins por company__poles e company__users, e user_has_access_to_company responde a
+partir das mesmas empresas memorizadas no usuário. Com o retrato de autorizações do
+token ainda válido (apps.users.authorization) as empresas vêm dele, sem consulta.
+"""
+from .models import Polo
+from apps.users.utils.permissions import get_user_company_ids
+
+_ATTRIBUTE = '_tenant_company_ids'
+
+
+def _memo(request):
+    memo = getattr(request, _ATTRIBUTE, None)
+    if memo is None:
+        memo = {}
+        setattr(request, _ATTRIBUTE, memo)
+    return memo
+
+
+def polo_company_ids(request, pole_id):
+    """
+    IDs das empresas do polo
+    """
+    memo = _memo(request)
+    key = ('polo', str(pole_id))
+    if key not in memo:
+        memo[key] = frozenset(
+            Polo.companies.through.objects.filter(polo_id=pole_id).values_list('company_id', flat=True)
+        )
+    return memo[key]
+
+
+def user_company_ids(request):
+    """
+    IDs das empresas associadas ao usuário; None para superusuário (sem restrição)
+    """
+    if request.user.is_superuser:
+        return None
+    return frozenset(get_user_company_ids(request.user))
+
+
+def visible_company_ids(request, pole_id=None):
+    """
+    Empresas que o usuário enxerga na requisição; None quando não há filtro.
+    O polo (argumento ou X-Polo-Id) só restringe a visão do superusuário.
+    """
+    if not request.user.is_superuser:
+        return user_company_ids(request)
+    pole_id = pole_id or request.headers.get('X-Polo-Id')
+    return polo_company_ids(request, pole_id) if pole_id else None
+
+
+def scope_queryset(queryset, company_ids, field='company_id'):
+    if company_ids is None:
+        return queryset
+    return queryset.filter(**{f'{field}__in': company_ids})
+
+
+class TenantScopedMixin:
+    """
+    Restringe o queryset das views às empresas visíveis ao usuário da requisição.
+    tenant_field é o campo com o ID da empresa no modelo listado.
+    """
+    tenant_field = 'company_id'
+
+    def visible_company_ids(self, pole_id=None):
+        return visible_company_ids(self.request, pole_id)
+
+    def scope_queryset(self, queryset, field=None):
+        return scope_queryset(queryset, self.visible_company_ids(), field or self.tenant_field)
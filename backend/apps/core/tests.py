@@ -1,15 +1,103 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date
+
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import IntegrityError, connection, transaction
 from django.contrib.auth.models import User
-from .models import Company, CategoryQuestion, Subcategory, Question, Form, Evaluation, Answer
+from rest_framework.test import APIClient
+from .models import (
+    Company, CategoryQuestion, Subcategory, Question, Form, Evaluation, Answer, ActionPlan, ExportBatch, Polo,
+    PoloPeriodSummary, PendingSummaryRefresh, EvaluationQuerySet,
+)
+from . import export_cache, question_sets, summaries
+from .question_sets import get_form_question_set
+from .tenancy import visible_company_ids
+from apps.jobs.models import Job
+from apps.jobs.queue import run_pending
+from apps.users.utils.permissions import user_has_access_to_company
+
+def _clear_question_sets():
+    # Só as chaves deste módulo: todas as versões dos formulários existentes
+    question_sets._local_cache.clear()
+    cache.delete_many([
+        question_sets._cache_key(form_id, version)
+        for form_id, last_version in Form.objects.values_list('pk', 'question_set_version')
+        for version in range(last_version + 1)
+    ])
+
+
+def reset_question_sets(test):
+    """
+    Os IDs se repetem entre testes (rollback), então os conjuntos compilados de um
+    teste não podem sobrar no cache para o próximo
+    """
+    _clear_question_sets()
+    test.addCleanup(_clear_question_sets)
+
+
+class CoreTestCase(TestCase):
+    """
+    Base dos testes do app: admin autenticado no cliente, uma empresa e um formulário
+    com a categoria Safety e QUESTIONS perguntas. O setUp roda num commit simulado, para
+    que os callbacks on_commit dos dados iniciais não fiquem pendentes nos testes;
+    set_up_data cria os dados próprios de cada classe dentro do mesmo commit.
+    """
+    QUESTIONS = 1
+    CATEGORY_WEIGHT = 1.0
+
+    def setUp(self):
+        reset_question_sets(self)
+        # Chaves de resumo marcadas em testes anteriores (desfeitos) não chegam a este
+        summaries.discard_pending()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin = User.objects.create_superuser(username='admin', password='12345')
+            self.company = Company.objects.create(name='Test Company', cnpj='00000000000191')
+            self.category = CategoryQuestion.objects.create(name='Safety', weight=self.CATEGORY_WEIGHT)
+            self.questions = [
+                Question.objects.create(category=self.category, question=f'Question {index}')
+                for index in range(self.QUESTIONS)
+            ]
+            self.form = Form.objects.create(name='Safety Form')
+            self.form.categories.add(self.category)
+            self.set_up_data()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def set_up_data(self):
+        pass
+
+    def create_evaluation(self, **kwargs):
+        kwargs.setdefault('company', self.company)
+        kwargs.setdefault('evaluator', self.admin)
+        kwargs.setdefault('form', self.form)
+        kwargs.setdefault('valid_until', date(2099, 12, 31))
+        return Evaluation.objects.create(**kwargs)
+
 
 class EvaluationTestCase(TestCase):
     
     def setUp(self):
+        reset_question_sets(self)
         # Criando um usuário
         self.user = User.objects.create_user(username='test user', password='12345')
         
         # Criando uma empresa
-        self.company = Company.objects.create(name='Test Company', cnpj='00.000.000/0001-91', user=self.user)
+        self.company = Company.objects.create(name='Test Company', cnpj='00.000.000/0001-91')
+        self.company.users.add(self.user)
         
         # Criando uma categoria de perguntas
         self.category = CategoryQuestion.objects.create(name='Safety', weight=1.0)
@@ -30,7 +118,7 @@ class EvaluationTestCase(TestCase):
             company=self.company,
             evaluator=self.user,
             form=self.form,
-            valid_until='2024-12-31'
+            valid_until=date(2024, 12, 31)
         )
     
     def test_add_fake_answers_to_evaluation(self):
@@ -64,3 +152,1227 @@ class EvaluationTestCase(TestCase):
         # Verificando os detalhes das respostas
         self.assertEqual(answers[0].note, 'Everything is in order.')
         self.assertEqual(answers[1].note, 'Fire exits are not clearly marked.')
+
+
+
+class EvaluationListProgressTestCase(CoreTestCase):
+    QUESTIONS = 4
+
+    def _create_evaluation(self, name, answered=0, evaluated=0):
+        company = Company.objects.create(name=name, cnpj='00000000000191')
+        evaluation = self.create_evaluation(company=company, period=date(2025, 1, 1))
+        for index, question in enumerate(self.questions[:answered]):
+            Answer.objects.create(
+                question=question,
+                evaluation=evaluation,
+                company=company,
+                answer_respondent='C',
+                answer_evaluator='C' if index < evaluated else None,
+            )
+        return evaluation
+
+    def test_list_uses_annotated_counters(self):
+        self._create_evaluation('Half', answered=2)
+        with CaptureQueriesContext(connection) as few_rows:
+            self.client.get('/api/evaluation/')
+
+        for index in range(5):
+            self._create_evaluation(f'Company {index}', answered=index % 4)
+        with CaptureQueriesContext(connection) as many_rows:
+            response = self.client.get('/api/evaluation/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(many_rows), len(few_rows))
+        half = next(row for row in response.data['results'] if row['company_name'] == 'Half')
+        self.assertEqual(half['total_questions'], 4)
+        self.assertEqual(half['answered_questions'], 2)
+        self.assertEqual(half['unanswered_questions'], 2)
+        self.assertEqual(half['answered_percentage'], 50)
+        self.assertFalse(half['fully_evaluated'])
+
+    def test_progress_filters_and_ordering(self):
+        self._create_evaluation('Empty')
+        self._create_evaluation('Half', answered=2)
+        self._create_evaluation('Done', answered=4, evaluated=4)
+        self._create_evaluation('Answered', answered=4, evaluated=1)
+
+        response = self.client.get('/api/evaluation/', {'answered_percentage__lt': 50})
+        self.assertEqual([row['company_name'] for row in response.data['results']], ['Empty'])
+
+        response = self.client.get('/api/evaluation/', {'fully_evaluated': 'true'})
+        self.assertEqual([row['company_name'] for row in response.data['results']], ['Done'])
+
+        response = self.client.get('/api/evaluation/', {'ordering': 'answered_percentage,company_name'})
+        self.assertEqual(
+            [row['company_name'] for row in response.data['results']],
+            ['Empty', 'Half', 'Answered', 'Done'],
+        )
+
+
+class EvaluationProgressCountersTestCase(CoreTestCase):
+    QUESTIONS = 3
+
+    def set_up_data(self):
+        self.evaluation = self.create_evaluation()
+
+    def _answer(self, question, **kwargs):
+        return Answer.objects.create(
+            question=question, evaluation=self.evaluation, company=self.company, **kwargs
+        )
+
+    def test_counters_follow_answer_changes(self):
+        self.assertEqual(self.evaluation.total_questions, 3)
+
+        first = self._answer(self.questions[0], answer_respondent='C')
+        self._answer(self.questions[1], answer_respondent='NC', answer_evaluator='NC')
+        self.evaluation.refresh_from_db()
+        self.assertEqual((self.evaluation.respondent_answered, self.evaluation.evaluator_answered), (2, 1))
+        self.assertEqual(self.evaluation.status, 'IN_PROGRESS')
+
+        first = Answer.objects.get(pk=first.pk)
+        first.answer_evaluator = 'C'
+        first.save()
+        first.note = 'Sem alteração de contadores'
+        first.save()
+        self.evaluation.refresh_from_db()
+        self.assertEqual(self.evaluation.evaluator_answered, 2)
+
+        first.delete()
+        self.evaluation.refresh_from_db()
+        self.assertEqual((self.evaluation.respondent_answered, self.evaluation.evaluator_answered), (1, 1))
+        self.assertFalse(Evaluation.objects.progress_mismatches().exists())
+
+    def test_answer_save_cost_does_not_grow_with_answers(self):
+        PendingSummaryRefresh.objects.all().delete()
+        Job.objects.all().delete()
+        cache.delete(summaries.REFRESH_JOB_GUARD_KEY)
+        evaluation = Evaluation.objects.get(pk=self.evaluation.pk)
+        captured = []
+        # A primeira resposta também grava a transição PENDING -> IN_PROGRESS e agenda a tarefa do resumo
+        for question in self.questions[:3]:
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+                Answer.objects.create(
+                    question=question, evaluation=evaluation, company=self.company, answer_respondent='C'
+                )
+            # SAVEPOINT/RELEASE só existem dentro da transação do TestCase
+            captured.append(len([query for query in queries if 'SAVEPOINT' not in query['sql']]))
+        # INSERT da resposta, UPDATE dos contadores, SELECT dos contadores e INSERT da pendência do resumo
+        self.assertEqual(captured[1], 4)
+        self.assertLessEqual(captured[2], captured[0])
+        self.assertEqual(PendingSummaryRefresh.objects.count(), 3)
+        self.assertEqual(Job.objects.filter(name=summaries.REFRESH_JOB).count(), 1)
+
+    def test_stale_instance_save_keeps_counters_and_version(self):
+        stale = Evaluation.objects.get(pk=self.evaluation.pk)
+        other = Evaluation.objects.get(pk=self.evaluation.pk)
+        self._answer(self.questions[0], answer_respondent='C')
+
+        stale.valid_until = date(2099, 6, 30)
+        stale.save()
+        self.assertEqual(Evaluation.objects.get(pk=self.evaluation.pk).valid_until, date(2099, 6, 30))
+        other.save()
+
+        self.evaluation.refresh_from_db()
+        self.assertEqual(self.evaluation.respondent_answered, 1)
+        # Cada gravação recebe uma versão distinta, mesmo partindo da mesma cópia
+        self.assertEqual(other.version, self.evaluation.version)
+        self.assertEqual(stale.version + 1, other.version)
+        self.assertEqual(stale.respondent_answered, 1)
+
+    def test_plain_update_does_not_bump_version(self):
+        version = Evaluation.objects.get(pk=self.evaluation.pk).version
+        Evaluation.objects.filter(pk=self.evaluation.pk).update(score=50.0)
+        self.assertEqual(Evaluation.objects.get(pk=self.evaluation.pk).version, version)
+
+        Evaluation.objects.filter(pk=self.evaluation.pk).versioned_update(score=60.0)
+        self.assertEqual(Evaluation.objects.get(pk=self.evaluation.pk).version, version + 1)
+
+    def test_rebuild_command_fixes_drift(self):
+        self._answer(self.questions[0], answer_respondent='C')
+        Evaluation.objects.update(respondent_answered=0, total_questions=0, status='PENDING')
+
+        with self.assertRaisesMessage(CommandError, '1 avaliações com contadores divergentes'):
+            call_command('rebuild_evaluation_progress', '--verify', stdout=StringIO())
+
+        call_command('rebuild_evaluation_progress', stdout=StringIO())
+        self.evaluation.refresh_from_db()
+        self.assertEqual((self.evaluation.total_questions, self.evaluation.respondent_answered), (3, 1))
+        self.assertEqual(self.evaluation.status, 'IN_PROGRESS')
+        call_command('rebuild_evaluation_progress', '--verify', stdout=StringIO())
+
+
+class EvaluationStatusSweepTestCase(CoreTestCase):
+
+    def _evaluation(self, valid_until, status='PENDING'):
+        return self.create_evaluation(valid_until=valid_until, status=status)
+
+    def test_list_does_not_write(self):
+        self._evaluation(date(2020, 1, 1))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/evaluation/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+
+    def test_sweep_expires_and_reopens(self):
+        overdue = self._evaluation(date(2020, 1, 1))
+        in_progress = self._evaluation(date(2020, 1, 1), status='IN_PROGRESS')
+        cancelled = self._evaluation(date(2020, 1, 1), status='CANCELLED')
+        extended = self._evaluation(date(2099, 1, 1), status='EXPIRED')
+
+        output = StringIO()
+        call_command('sweep_evaluation_status', stdout=output)
+
+        statuses = dict(Evaluation.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[overdue.id], 'EXPIRED')
+        self.assertEqual(statuses[in_progress.id], 'EXPIRED')
+        self.assertEqual(statuses[cancelled.id], 'CANCELLED')
+        self.assertEqual(statuses[extended.id], 'PENDING')
+        self.assertIn('3 avaliações atualizadas', output.getvalue())
+
+
+class FormQuestionSetCacheTestCase(CoreTestCase):
+    QUESTIONS = 0
+
+    def set_up_data(self):
+        self.subcategory = Subcategory.objects.create(name='Fire', category=self.category)
+        self.question = Question.objects.create(
+            category=self.category, subcategory=self.subcategory, question='Question'
+        )
+        self.evaluation = self.create_evaluation()
+
+    def _question_set(self):
+        return get_form_question_set(Form.objects.get(pk=self.form.pk))
+
+    def test_cached_question_set_skips_question_query(self):
+        compiled = self._question_set()
+        self.assertEqual(compiled['question_ids'], [self.question.id])
+        self.assertEqual(compiled['questions'][0]['subcategory_name'], 'Fire')
+
+        form = Form.objects.get(pk=self.form.pk)
+        with self.assertNumQueries(0):
+            get_form_question_set(form)
+
+    def test_changes_bump_version_and_totals(self):
+        version = self._question_set()['version']
+
+        Question.objects.create(category=self.category, question='Another question')
+        compiled = self._question_set()
+        self.assertGreater(compiled['version'], version)
+        self.assertEqual(compiled['count'], 2)
+        self.evaluation.refresh_from_db()
+        self.assertEqual(self.evaluation.total_questions, 2)
+
+        self.subcategory.name = 'Fire safety'
+        self.subcategory.save()
+        self.assertEqual(self._question_set()['questions'][0]['subcategory_name'], 'Fire safety')
+
+        other_category = CategoryQuestion.objects.create(name='Health', weight=2.0)
+        Question.objects.create(category=other_category, question='Health question')
+        other_category.forms.add(self.form)
+        self.assertEqual(self._question_set()['count'], 3)
+
+        self.form.categories.remove(self.category)
+        self.assertEqual(self._question_set()['count'], 1)
+        self.evaluation.refresh_from_db()
+        self.assertEqual(self.evaluation.total_questions, 1)
+
+    def test_total_change_refreshes_status(self):
+        Answer.objects.create(
+            evaluation=self.evaluation, company=self.company, question=self.question, answer_respondent='C'
+        )
+        self.evaluation.refresh_from_db()
+        self.assertEqual(self.evaluation.status, 'COMPLETED')
+
+        Question.objects.create(category=self.category, question='Another question')
+        self.evaluation.refresh_from_db()
+        self.assertEqual((self.evaluation.total_questions, self.evaluation.status), (2, 'IN_PROGRESS'))
+        self.assertIsNone(self.evaluation.completed_at)
+
+        Question.objects.filter(category=self.category).exclude(pk=self.question.pk).delete()
+        self.evaluation.refresh_from_db()
+        self.assertEqual(self.evaluation.status, 'COMPLETED')
+        self.assertIsNotNone(self.evaluation.completed_at)
+
+
+class CursorPaginationTestCase(CoreTestCase):
+
+    def set_up_data(self):
+        periods = [date(2025, 1, 1), date(2025, 2, 1), None, date(2025, 2, 1), date(2024, 12, 1), None, date(2025, 1, 1)]
+        for index, period in enumerate(periods):
+            company = Company.objects.create(name=f'Company {index}', cnpj='00000000000191')
+            evaluation = self.create_evaluation(company=company, period=period)
+            ActionPlan.objects.create(company=company, evaluation=evaluation, description=f'Plan {index}')
+
+    def _walk(self, url, params):
+        ids, response = [], self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                return ids, response
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_pages_match_offset_ordering(self):
+        expected = [row['id'] for row in self.client.get('/api/evaluation/', {'page_size': 100}).data['results']]
+
+        ids, last_response = self._walk('/api/evaluation/', {'cursor': '', 'page_size': 2})
+        self.assertEqual(ids, expected)
+        self.assertEqual(last_response.data['count'], 7)
+
+        ids, last_response = self._walk(
+            '/api/evaluation/', {'cursor': '', 'page_size': 3, 'count': 'false', 'ordering': 'company_name'}
+        )
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(len(set(ids)), 7)
+        self.assertNotIn('count', last_response.data)
+
+        ids, _ = self._walk('/api/evaluation/', {'cursor': '', 'page_size': 2, 'ordering': '-answered_percentage'})
+        self.assertEqual(sorted(ids), sorted(expected))
+
+    def test_action_plans_paginate_only_with_cursor(self):
+        response = self.client.get('/api/action-plans/')
+        self.assertEqual(len(response.data), 7)
+
+        ids, _ = self._walk('/api/action-plans/', {'cursor': '', 'page_size': 4})
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(ids), 7)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/evaluation/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+        # Bem formado, mas 'abc' não é uma data válida para period
+        cursor = base64.urlsafe_b64encode(json.dumps(['abc', 1]).encode()).decode()
+        response = self.client.get('/api/evaluation/', {'cursor': cursor, 'ordering': 'period'})
+        self.assertEqual(response.status_code, 404)
+
+        # Campos anotados também são convertidos pelo output_field da anotação
+        for ordering in ('answered_percentage', 'fully_answered'):
+            response = self.client.get('/api/evaluation/', {'cursor': cursor, 'ordering': ordering})
+            self.assertEqual(response.status_code, 404)
+
+
+class BulkAnswerSubmissionTestCase(CoreTestCase):
+    QUESTIONS = 3
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def set_up_data(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.user = User.objects.create_user(username='user@empresa.com', password='12345')
+        self.company.users.add(self.user)
+        self.evaluation = self.create_evaluation(evaluator=self.user)
+        self.url = f'/api/evaluation/{self.evaluation.id}/answers/bulk/'
+
+    def test_bulk_upsert_recomputes_once(self):
+        Answer.objects.create(
+            question=self.questions[0], evaluation=self.evaluation, company=self.company, answer_respondent='NC'
+        )
+        payload = {'answers': [
+            {'question': self.questions[0].id, 'answer_respondent': 'C', 'note': 'Corrigido'},
+            {'question': self.questions[1].id, 'answer_respondent': 'NC'},
+            {'question': self.questions[2].id},
+            {'question': 999999, 'answer_respondent': 'C'},
+        ]}
+
+        response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        statuses = {result['question']: result['status'] for result in response.data['results']}
+        self.assertEqual(statuses[self.questions[0].id], 'updated')
+        self.assertEqual(statuses[self.questions[1].id], 'created')
+        self.assertEqual(statuses[self.questions[2].id], 'error')
+        self.assertEqual(statuses[999999], 'error')
+        self.assertEqual(Answer.objects.get(question=self.questions[0]).answer_respondent, 'C')
+
+        self.evaluation.refresh_from_db()
+        self.assertEqual(self.evaluation.respondent_answered, 2)
+        self.assertEqual(self.evaluation.status, 'IN_PROGRESS')
+
+    def test_bulk_multipart_with_attachments(self):
+        upload = SimpleUploadedFile('evidencia.pdf', b'%PDF-1.4 test', content_type='application/pdf')
+        answers = [{'question': question.id, 'answer_respondent': 'C'} for question in self.questions]
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            response = self.client.post(self.url, {
+                'answers': json.dumps(answers),
+                f'attachment_respondent_{self.questions[0].id}': upload,
+            }, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 3)
+        answer = Answer.objects.get(question=self.questions[0])
+        self.assertTrue(answer.attachment_respondent.name.endswith(f'_Q{self.questions[0].id}.pdf'))
+        self.evaluation.refresh_from_db()
+        self.assertEqual(self.evaluation.status, 'COMPLETED')
+
+    def test_rolled_back_submission_removes_stored_attachments(self):
+        def post():
+            upload = SimpleUploadedFile('evidencia.pdf', b'%PDF-1.4 test', content_type='application/pdf')
+            return self.client.post(self.url, {
+                'answers': json.dumps([{'question': self.questions[0].id, 'answer_respondent': 'C'}]),
+                f'attachment_respondent_{self.questions[0].id}': upload,
+            }, format='multipart')
+
+        def stored_files():
+            return [name for _, _, names in os.walk(self.media_root) for name in names]
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            with patch.object(Answer.objects, 'bulk_create', side_effect=IntegrityError):
+                self.assertEqual(post().status_code, 409)
+            self.assertEqual(stored_files(), [])
+
+            with patch.object(EvaluationQuerySet, 'rebuild_progress', side_effect=RuntimeError('falha')), \
+                    self.assertRaises(RuntimeError):
+                post()
+            self.assertEqual(stored_files(), [])
+        self.assertFalse(Answer.objects.exists())
+
+
+@override_settings(EXPORT_CACHE_MAX_SIZE=0)
+class EvaluationDetailQueryCountTestCase(CoreTestCase):
+    ENDPOINTS = ['details', 'questions-with-answers', 'export/xlsx', 'export/pdf']
+
+    def _evaluation_with_questions(self, total):
+        category = CategoryQuestion.objects.create(name=f'Category {total}', weight=1.0)
+        subcategory = Subcategory.objects.create(name=f'Subcategory {total}', category=category)
+        questions = Question.objects.bulk_create([
+            Question(category=category, subcategory=subcategory, question=f'Question {index}')
+            for index in range(total)
+        ])
+        form = Form.objects.create(name=f'Form {total}')
+        form.categories.add(category)
+        evaluation = self.create_evaluation(form=form)
+        Answer.objects.bulk_create([
+            Answer(question=question, evaluation=evaluation, company=self.company,
+                   answer_respondent='C', answer_evaluator='NC', note='Observação')
+            for question in questions[::2]
+        ])
+        ActionPlan.objects.create(
+            company=self.company, evaluation=evaluation, description='Plano', responsible=self.admin
+        )
+        return evaluation
+
+    def _count_queries(self, evaluation, endpoint):
+        reset_question_sets(self)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/evaluation/{evaluation.id}/{endpoint}/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_detail_endpoints_run_constant_queries(self):
+        small = self._evaluation_with_questions(5)
+        large = self._evaluation_with_questions(500)
+
+        for endpoint in self.ENDPOINTS:
+            small_count, _ = self._count_queries(small, endpoint)
+            large_count, response = self._count_queries(large, endpoint)
+            self.assertEqual(small_count, large_count, endpoint)
+            self.assertLessEqual(large_count, 8, endpoint)
+
+        _, response = self._count_queries(large, 'details')
+        self.assertEqual(len(response.data['questions']), 500)
+        self.assertEqual(response.data['questions'][0]['answer']['answer_evaluator'], 'NC')
+        self.assertIsNone(response.data['questions'][1]['answer']['answer_respondent'])
+        self.assertEqual(response.data['questions'][0]['subcategory_name'], 'Subcategory 500')
+
+
+class EvaluationConditionalGetTestCase(CoreTestCase):
+    QUESTIONS = 2
+
+    def set_up_data(self):
+        self.evaluation = self.create_evaluation()
+
+    def test_details_and_progress_honour_etag(self):
+        for endpoint in ['details', 'progress']:
+            url = f'/api/evaluation/{self.evaluation.id}/{endpoint}/'
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(len(queries), 1, endpoint)
+
+            # Sem Last-Modified: duas alterações no mesmo segundo seriam indistinguíveis
+            self.assertNotIn('Last-Modified', response)
+
+            answer = Answer.objects.create(
+                question=self.questions[0], evaluation=self.evaluation,
+                company=self.company, answer_respondent='C',
+            )
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+            etag = response['ETag']
+            answer.note = 'Somente a observação mudou'
+            answer.save()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+            answer.delete()
+
+    def test_renames_change_the_etag(self):
+        url = f'/api/evaluation/{self.evaluation.id}/details/'
+        for renamed in (self.company, self.form, self.admin):
+            etag = self.client.get(url)['ETag']
+            if renamed is self.admin:
+                renamed.username = 'avaliador'
+            else:
+                renamed.name = f'{renamed.name} (novo)'
+            renamed.save()
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['company_name'], 'Test Company (novo)')
+        self.assertEqual(response.data['evaluator_name'], 'avaliador')
+
+
+@override_settings(EXPORT_CACHE_MAX_SIZE=0)
+class StreamingXlsxExportTestCase(CoreTestCase):
+    QUESTIONS = 3
+
+    def set_up_data(self):
+        self.evaluation = self.create_evaluation(period=date(2025, 3, 1))
+        Answer.objects.create(
+            question=self.questions[1], evaluation=self.evaluation, company=self.company,
+            answer_respondent='NC', answer_evaluator='C', note='Observação',
+        )
+        ActionPlan.objects.create(company=self.company, evaluation=self.evaluation, description='Plano')
+
+    def test_export_matches_questions_and_answers(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get(f'/api/evaluation/{self.evaluation.id}/export/xlsx/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('avaliacao_', response['Content-Disposition'])
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(workbook.sheetnames, ['Resumo', 'Perguntas', 'Plano de Ação'])
+        rows = list(workbook['Perguntas'].iter_rows(min_row=2, values_only=True))
+        self.assertEqual([row[1] for row in rows], ['Question 0', 'Question 1', 'Question 2'])
+        self.assertEqual(rows[0][2], 'Sem resposta')
+        self.assertEqual(rows[1][2:5], ('Não Conforme', 'Conforme', 'Observação'))
+        self.assertEqual(workbook['Resumo']['B3'].value, '03/2025')
+
+    def test_benchmark_command(self):
+        output = StringIO()
+        call_command('benchmark_xlsx_export', self.evaluation.id, '--repeat', '1', stdout=output)
+        self.assertIn('write-only', output.getvalue())
+
+
+class ExportBatchTestCase(CoreTestCase):
+
+    def set_up_data(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, EXPORT_BATCH_WORKERS=1)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.polo = Polo.objects.create(name='Polo Norte')
+        self.evaluations = []
+        for index in range(3):
+            company = Company.objects.create(name=f'Empresa {index}', cnpj=f'0000000000{index:04d}')
+            if index < 2:
+                self.polo.companies.add(company)
+            self.evaluations.append(self.create_evaluation(company=company, period=date(2025, 3, 1)))
+
+    def test_batch_exports_polo_into_zip(self):
+        response = self.client.post(
+            '/api/evaluation/export/batch/',
+            {'format': 'xlsx', 'polo': self.polo.id, 'period_year': 2025, 'period_month': 3},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(response.data['status'], 'PENDING')
+
+        call_command('run_workers', '--once', stdout=StringIO())
+
+        status_response = self.client.get(f"/api/evaluation/export/batch/{response.data['id']}/")
+        self.assertEqual(status_response.data['status'], 'COMPLETED')
+        self.assertEqual(status_response.data['processed'], 2)
+        self.assertEqual(status_response.data['progress'], 100.0)
+        job_response = self.client.get(f"/api/jobs/{response.data['job']}/")
+        self.assertEqual(job_response.data['status'], 'SUCCEEDED')
+        self.assertEqual(job_response.data['download_url'], status_response.data['download_url'])
+
+        download = self.client.get(status_response.data['download_url'])
+        self.assertEqual(download.status_code, 200)
+        archive = zipfile.ZipFile(BytesIO(b''.join(download.streaming_content)))
+        self.assertEqual(
+            sorted(archive.namelist()),
+            [f'202503_Empresa_{index}_avaliacao_{self.evaluations[index].id}.xlsx' for index in range(2)],
+        )
+
+    def test_pending_batch_is_not_downloadable(self):
+        batch = ExportBatch.objects.create(created_by=self.admin, evaluation_ids=[self.evaluations[0].id], total=1)
+
+        response = self.client.get(f'/api/evaluation/export/batch/{batch.id}/download/')
+
+        self.assertEqual(response.status_code, 409)
+
+    def test_empty_filter_is_rejected(self):
+        response = self.client.post('/api/evaluation/export/batch/', {'period_year': 1999}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ExportBatch.objects.exists())
+
+
+class ExportRenderCacheTestCase(CoreTestCase):
+
+    def set_up_data(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, EXPORT_CACHE_MAX_SIZE=10 * 1024 * 1024)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        usage = patch.dict(export_cache._usage, {'total': None, 'scanned_at': float('-inf')})
+        usage.start()
+        self.addCleanup(usage.stop)
+        self.evaluation = self.create_evaluation()
+
+    def _download(self, export_format='pdf'):
+        response = self.client.get(f'/api/evaluation/{self.evaluation.id}/export/{export_format}/')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_repeat_download_is_served_from_cache(self):
+        first = self._download()
+        with patch('apps.core.export_cache.EXPORT_WRITERS', {}):
+            # Sem writers disponíveis: só funciona se vier do disco
+            self.assertEqual(self._download(), first)
+
+    def test_answer_and_action_plan_changes_render_again(self):
+        self._download('xlsx')
+        cached = os.listdir(os.path.join(self.media_root, 'export_cache', str(self.evaluation.id)))
+
+        Answer.objects.create(
+            question=self.questions[0], evaluation=self.evaluation, company=self.company, answer_respondent='NC'
+        )
+        self._download('xlsx')
+        after_answer = os.listdir(os.path.join(self.media_root, 'export_cache', str(self.evaluation.id)))
+        self.assertEqual(len(after_answer), 1)
+        self.assertNotEqual(cached, after_answer)
+
+        ActionPlan.objects.create(company=self.company, evaluation=self.evaluation, description='Plano')
+        self._download('xlsx')
+        after_plan = os.listdir(os.path.join(self.media_root, 'export_cache', str(self.evaluation.id)))
+        self.assertNotEqual(after_answer, after_plan)
+
+    def _cached_files(self):
+        return os.listdir(os.path.join(self.media_root, 'export_cache', str(self.evaluation.id)))
+
+    def test_renames_render_again(self):
+        self._download('xlsx')
+        cached = self._cached_files()
+
+        self.company.name = 'Renamed Company'
+        self.company.save()
+        self._download('xlsx')
+        self.assertEqual(len(self._cached_files()), 1)
+        self.assertNotEqual(self._cached_files(), cached)
+
+    def test_write_over_the_limit_is_still_served(self):
+        with override_settings(EXPORT_CACHE_MAX_SIZE=1):
+            self.assertTrue(self._download('pdf'))
+            self.assertEqual(len(self._cached_files()), 1)
+
+    def test_evict_keeps_in_progress_writes(self):
+        self._download('pdf')
+        partial_path = os.path.join(self.media_root, 'export_cache', str(self.evaluation.id), 'other.part')
+        with open(partial_path, 'wb') as partial:
+            partial.write(b'x' * 10)
+        os.utime(partial_path, (1, 1))
+
+        self.assertEqual(export_cache.evict(max_size=0), 1)
+        self.assertEqual(self._cached_files(), ['other.part'])
+
+    def test_evict_removes_least_recently_used(self):
+        from apps.core.export_cache import cache_path, evict
+
+        self._download('pdf')
+        self._download('xlsx')
+        self.evaluation.refresh_from_db()
+        pdf_path = cache_path(self.evaluation, 'pdf')
+        xlsx_path = cache_path(self.evaluation, 'xlsx')
+        os.utime(pdf_path, (1, 1))
+
+        # Cabe só o XLSX, já descontada a folga deixada após a limpeza
+        removed = evict(max_size=int(os.path.getsize(xlsx_path) / 0.9) + 1)
+
+        self.assertEqual(removed, 1)
+        self.assertFalse(os.path.exists(pdf_path))
+        self.assertTrue(os.path.exists(xlsx_path))
+
+
+class ScoreComputationTestCase(CoreTestCase):
+    # Duas perguntas na categoria de peso 7.5 e duas na de peso 2.0
+    QUESTIONS = 2
+    CATEGORY_WEIGHT = 7.5
+
+    def set_up_data(self):
+        light = CategoryQuestion.objects.create(name='Light', weight=2.0)
+        self.questions += [Question.objects.create(category=light, question=f'Light {index}') for index in range(2)]
+        self.form.categories.add(light)
+        self.polo = Polo.objects.create(name='Polo Norte')
+        self.polo.companies.add(self.company)
+
+    def _evaluation(self, evaluator_answers, period=date(2025, 3, 1)):
+        evaluation = self.create_evaluation(period=period)
+        Answer.objects.bulk_create([
+            Answer(question=question, evaluation=evaluation, company=self.company, answer_evaluator=value)
+            for question, value in zip(self.questions, evaluator_answers)
+        ])
+        return evaluation
+
+    def test_calculate_score_uses_single_aggregate(self):
+        evaluation = self._evaluation(['NC', 'C', 'NC', 'NA'])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(evaluation.compute_score(), 100 - 7.5 - 2.0)
+        self.assertEqual(len(queries), 1)
+
+        response = self.client.get(f'/api/evaluation/{evaluation.id}/calculate-score/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_score'], 90.5)
+        evaluation.refresh_from_db()
+        self.assertEqual(evaluation.score, 90.5)
+
+    def test_rescore_updates_period_in_one_statement(self):
+        march = [self._evaluation(['NC', 'NC', 'C', 'C']), self._evaluation(['C', 'C', 'C', 'NC'])]
+        april = self._evaluation(['NC', 'NC', 'NC', 'NC'], period=date(2025, 4, 1))
+        unanswered = self.create_evaluation(period=date(2025, 3, 1))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                '/api/evaluation/rescore/',
+                {'polo': self.polo.id, 'period_year': 2025, 'period_month': 3},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(sum('UPDATE' in query['sql'] for query in queries), 1)
+
+        scores = dict(Evaluation.objects.values_list('id', 'score'))
+        self.assertEqual(scores[march[0].id], 85.0)
+        self.assertEqual(scores[march[1].id], 98.0)
+        self.assertIsNone(scores[april.id])
+        self.assertIsNone(scores[unanswered.id])
+
+    def test_rescore_command(self):
+        evaluation = self._evaluation(['NC', 'C', 'C', 'C'])
+
+        output = StringIO()
+        call_command('rescore_evaluations', '--polo', str(self.polo.id), '--year', '2025', stdout=output)
+
+        self.assertIn('1 avaliações', output.getvalue())
+        evaluation.refresh_from_db()
+        self.assertEqual(evaluation.score, 92.5)
+
+
+class CategoryWeightRescoreTestCase(CoreTestCase):
+    CATEGORY_WEIGHT = 5.0
+
+    def set_up_data(self):
+        other_category = CategoryQuestion.objects.create(name='Other', weight=5.0)
+        other_question = Question.objects.create(category=other_category, question='Question 1')
+        other_form = Form.objects.create(name='Other Form')
+        other_form.categories.add(other_category)
+
+        self.evaluations = {}
+        for name, evaluation_form, evaluation_question in [
+            ('scored', self.form, self.questions[0]), ('unscored', self.form, self.questions[0]),
+            ('other', other_form, other_question),
+        ]:
+            evaluation = self.create_evaluation(form=evaluation_form)
+            Answer.objects.create(
+                question=evaluation_question, evaluation=evaluation, company=self.company, answer_evaluator='NC'
+            )
+            self.evaluations[name] = evaluation
+        Evaluation.objects.filter(pk__in=[self.evaluations['scored'].pk, self.evaluations['other'].pk]).rescore()
+
+    def test_weight_change_enqueues_scoped_rescore(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/categories/{self.category.id}/', {'weight': 8.0}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        job = Job.objects.get(name='core.rescore_category')
+        self.assertEqual(job.payload['previous_weight'], 5.0)
+        call_command('run_workers', '--once', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'SUCCEEDED')
+        self.assertEqual(job.result['scores_changed'], 1)
+        scores = {name: Evaluation.objects.get(pk=evaluation.pk).score for name, evaluation in self.evaluations.items()}
+        self.assertEqual(scores, {'scored': 92.0, 'unscored': None, 'other': 95.0})
+
+    def test_saving_without_weight_change_does_not_enqueue(self):
+        category = CategoryQuestion.objects.get(pk=self.category.pk)
+        category.name = 'Segurança'
+        with self.captureOnCommitCallbacks(execute=True):
+            category.save()
+
+        self.assertFalse(Job.objects.filter(name='core.rescore_category').exists())
+
+
+class ScoreBreakdownTestCase(CoreTestCase):
+    QUESTIONS = 0
+    CATEGORY_WEIGHT = 4.0
+
+    def set_up_data(self):
+        self.polo = Polo.objects.create(name='Polo Norte')
+        self.polo.companies.add(self.company)
+        health = CategoryQuestion.objects.create(name='Health', weight=1.5)
+        ppe = Subcategory.objects.create(name='EPI', category=self.category)
+        self.questions = [
+            Question.objects.create(category=self.category, subcategory=ppe, question='Q0'),
+            Question.objects.create(category=self.category, subcategory=ppe, question='Q1'),
+            Question.objects.create(category=self.category, question='Q2'),
+            Question.objects.create(category=health, question='Q3'),
+        ]
+        self.form.categories.add(health)
+
+    def _evaluation(self, evaluator_answers):
+        evaluation = self.create_evaluation(period=date(2025, 3, 1))
+        Answer.objects.bulk_create([
+            Answer(question=question, evaluation=evaluation, company=self.company, answer_evaluator=value)
+            for question, value in zip(self.questions, evaluator_answers)
+        ])
+        return evaluation
+
+    def test_breakdown_by_category_and_subcategory(self):
+        evaluation = self._evaluation(['NC', 'C', 'NA', 'NC'])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/evaluation/{evaluation.id}/score-breakdown/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum('GROUP BY' in query['sql'] for query in queries), 1)
+
+        health, safety = response.data['categories']
+        self.assertEqual((health['category_name'], health['non_conforming'], health['weight_lost']), ('Health', 1, 1.5))
+        self.assertEqual(health['conformity_rate'], 0.0)
+        self.assertEqual(safety['answered'], 3)
+        self.assertEqual(safety['conformity_rate'], 50.0)
+        self.assertEqual(safety['weight_lost'], 4.0)
+        self.assertEqual(
+            [(sub['subcategory_name'], sub['conforming'], sub['not_applicable']) for sub in safety['subcategories']],
+            [('EPI', 1, 0), ('Sem subcategoria', 0, 1)],
+        )
+        self.assertEqual(response.data['totals']['weight_lost'], 5.5)
+
+    def test_period_breakdown_sums_evaluations(self):
+        self._evaluation(['NC', 'C', 'C', 'C'])
+        self._evaluation(['NC', 'NC', 'C', None])
+
+        response = self.client.get('/api/evaluation/score-breakdown/', {
+            'polo': self.polo.id, 'period_year': 2025, 'period_month': 3,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['evaluations'], 2)
+        self.assertEqual(response.data['totals']['answered'], 7)
+        self.assertEqual(response.data['totals']['non_conforming'], 3)
+        self.assertEqual(response.data['totals']['weight_lost'], 12.0)
+
+
+class PoloPeriodSummaryTestCase(CoreTestCase):
+    QUESTIONS = 2
+    CATEGORY_WEIGHT = 10.0
+
+    def set_up_data(self):
+        self.polo = Polo.objects.create(name='Polo Norte')
+        self.companies = [
+            Company.objects.create(name=f'Empresa {index}', cnpj=f'0000000000{index:04d}') for index in range(2)
+        ]
+        self.polo.companies.add(*self.companies)
+
+    def _evaluation(self, company, period=date(2025, 3, 10)):
+        return self.create_evaluation(company=company, period=period)
+
+    def _build(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self._evaluation(self.companies[0])
+            for question in self.questions:
+                Answer.objects.create(question=question, evaluation=first, company=self.companies[0],
+                                      answer_respondent='C', answer_evaluator='NC')
+            Evaluation.objects.filter(pk=first.pk).rescore()
+            ActionPlan.objects.create(company=self.companies[0], evaluation=first, description='Plano')
+
+            second = self._evaluation(self.companies[0], period=date(2025, 3, 25))
+            Answer.objects.create(question=self.questions[0], evaluation=second, company=self.companies[0],
+                                  answer_respondent='C')
+            self._evaluation(self.companies[1], period=date(2025, 4, 1))
+        summaries.refresh_pending()
+        return first, second
+
+    def test_summary_is_maintained_incrementally(self):
+        self._build()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/poles/{self.polo.id}/summary/', {'period_year': 2025, 'period_month': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), 4)
+        self.assertFalse(any('core_answer' in query['sql'] for query in queries))
+
+        row, = response.data['results']
+        self.assertEqual(row['company'], self.companies[0].id)
+        self.assertEqual(str(row['period']), '2025-03-01')
+        self.assertEqual((row['evaluations'], row['completed'], row['in_progress']), (2, 1, 1))
+        self.assertEqual(row['average_score'], 80.0)
+        self.assertEqual(row['completion_rate'], 50.0)
+        self.assertEqual(row['answered_percentage'], 75.0)
+        self.assertEqual(row['open_action_plans'], 1)
+        self.assertEqual(response.data['totals']['evaluations'], 2)
+
+    def test_rebuild_matches_incremental_rows(self):
+        first, _ = self._build()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.period = date(2025, 5, 2)
+            first.save()
+        summaries.refresh_pending()
+
+        fields = ['polo_id', 'company_id', 'period', 'evaluations', 'completed', 'scored', 'average_score',
+                  'respondent_answered', 'open_action_plans']
+        incremental = sorted(PoloPeriodSummary.objects.values_list(*fields))
+        PoloPeriodSummary.objects.all().delete()
+        call_command('rebuild_polo_summaries', stdout=StringIO())
+
+        self.assertEqual(sorted(PoloPeriodSummary.objects.values_list(*fields)), incremental)
+        self.assertEqual(len(incremental), 3)
+
+    def test_changes_are_marked_once_and_refreshed_by_the_job(self):
+        PendingSummaryRefresh.objects.all().delete()
+        Job.objects.all().delete()
+        cache.delete(summaries.REFRESH_JOB_GUARD_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            evaluation = self._evaluation(self.companies[0])
+            Evaluation.objects.filter(pk=evaluation.pk).update(status='IN_PROGRESS')
+            evaluation.save()
+        # Uma pendência por chave e transação, sem recalcular o resumo na requisição
+        self.assertEqual(
+            list(PendingSummaryRefresh.objects.values_list('company_id', 'period')),
+            [(self.companies[0].id, date(2025, 3, 1))],
+        )
+        self.assertFalse(PoloPeriodSummary.objects.exists())
+
+        job = Job.objects.get(name=summaries.REFRESH_JOB)
+        Job.objects.filter(pk=job.pk).update(run_at=job.created_at)
+        run_pending('test-worker')
+
+        self.assertEqual(Job.objects.get(pk=job.pk).result, {'summaries': 1})
+        self.assertFalse(PendingSummaryRefresh.objects.exists())
+        self.assertEqual(PoloPeriodSummary.objects.get(company=self.companies[0]).evaluations, 1)
+
+    @override_settings(POLO_SUMMARY_REFRESH_ASYNC=False)
+    def test_without_workers_summaries_refresh_on_commit(self):
+        PendingSummaryRefresh.objects.all().delete()
+        Job.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self._evaluation(self.companies[0])
+
+        self.assertFalse(PendingSummaryRefresh.objects.exists())
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(PoloPeriodSummary.objects.get(company=self.companies[0]).evaluations, 1)
+
+    def test_keys_left_by_a_rolled_back_transaction_are_dropped(self):
+        PendingSummaryRefresh.objects.all().delete()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            summaries.schedule_refresh(company_ids={999999})
+            raise RuntimeError('desfeita')
+
+        bulk_create = PendingSummaryRefresh.objects.bulk_create
+
+        def reject_missing_company(rows):
+            # O SQLite só verifica a FK no commit; os outros bancos recusam o INSERT
+            if any(row.company_id == 999999 for row in rows):
+                raise IntegrityError('FOREIGN KEY constraint failed')
+            return bulk_create(rows)
+
+        with patch.object(PendingSummaryRefresh.objects, 'bulk_create', side_effect=reject_missing_company), \
+                self.captureOnCommitCallbacks(execute=True):
+            self._evaluation(self.companies[0])
+
+        self.assertEqual(
+            list(PendingSummaryRefresh.objects.values_list('company_id', flat=True)), [self.companies[0].id]
+        )
+
+    def test_removing_company_from_polo_drops_its_rows(self):
+        self._build()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.polo.companies.remove(self.companies[1])
+        summaries.refresh_pending()
+
+        self.assertEqual(
+            set(PoloPeriodSummary.objects.filter(polo=self.polo).values_list('company_id', flat=True)),
+            {self.companies[0].id},
+        )
+
+
+class BulkEvaluationCreationTestCase(CoreTestCase):
+    QUESTIONS = 3
+    CATEGORY_WEIGHT = 10.0
+
+    def set_up_data(self):
+        self.polo = Polo.objects.create(name='Polo Sul')
+        self.companies = [
+            Company.objects.create(name=f'Empresa {index:02d}', cnpj=f'000000000{index:05d}') for index in range(30)
+        ]
+        self.polo.companies.add(*self.companies)
+
+    def _post(self, companies, period='2025-03-15'):
+        return self.client.post('/api/evaluation/', {
+            'companies': [company.id for company in companies],
+            'evaluator': self.admin.id,
+            'form': self.form.id,
+            'period': period,
+            'valid_until': '2099-12-31',
+        }, format='json')
+
+    def test_query_count_does_not_grow_with_companies(self):
+        get_form_question_set(Form.objects.get(pk=self.form.pk))
+        with CaptureQueriesContext(connection) as few:
+            response = self._post(self.companies[:3], period='2025-01-10')
+        self.assertEqual(response.status_code, 201)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as many:
+                response = self._post(self.companies[3:], period='2025-02-10')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(few), len(many))
+
+        self.assertEqual(len(response.data['created']), 27)
+        self.assertTrue(all(result['status'] == 'created' for result in response.data['results']))
+        created = Evaluation.objects.filter(period=date(2025, 2, 10))
+        self.assertEqual(created.count(), 27)
+        self.assertTrue(all(evaluation.total_questions == 3 for evaluation in created))
+        summaries.refresh_pending()
+        summary = PoloPeriodSummary.objects.get(company=self.companies[3], period=date(2025, 2, 1))
+        self.assertEqual(summary.pending, 1)
+
+    def test_duplicate_in_month_rejects_whole_batch(self):
+        existing = self.create_evaluation(company=self.companies[1], period=date(2025, 3, 1))
+
+        response = self._post(self.companies[:3])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['duplicate_companies'], ['Empresa 01'])
+        statuses = {result['company']: result for result in response.data['results']}
+        self.assertEqual(statuses[self.companies[1].id]['status'], 'duplicate')
+        self.assertEqual(statuses[self.companies[1].id]['existing_evaluation'], existing.id)
+        self.assertEqual(statuses[self.companies[0].id]['status'], 'ready')
+        self.assertEqual(Evaluation.objects.count(), 1)
+
+        # Mês seguinte não conflita
+        self.assertEqual(self._post(self.companies[:3], period='2025-04-01').status_code, 201)
+
+    def test_unknown_company_is_reported(self):
+        response = self.client.post('/api/evaluation/', {
+            'companies': [self.companies[0].id, 999999],
+            'evaluator': self.admin.id, 'form': self.form.id, 'period': '2025-03-15', 'valid_until': '2099-12-31',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        statuses = {result['company']: result['status'] for result in response.data['results']}
+        self.assertEqual(statuses, {self.companies[0].id: 'ready', 999999: 'not_found'})
+        self.assertFalse(Evaluation.objects.exists())
+
+
+class SparseFieldsetTestCase(CoreTestCase):
+
+    def set_up_data(self):
+        self.companies = [self.company] + [
+            Company.objects.create(name=f'Empresa {index}', cnpj=f'0000000000{index:04d}') for index in range(5)
+        ]
+        for company in self.companies:
+            company.users.add(User.objects.create_user(username=f'user{company.id}', password='12345'))
+            evaluation = self.create_evaluation(company=company, period=date(2025, 3, 1))
+            ActionPlan.objects.create(company=company, evaluation=evaluation, description='Plano')
+
+    def test_company_fields_skip_unrequested_work(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/companies/all/', {'fields': 'id,name'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data[0]), {'id', 'name'})
+        self.assertEqual(len(queries), 1)
+        self.assertFalse(any('auth_user' in query['sql'] or 'core_evaluation' in query['sql'] for query in queries))
+
+    def test_company_default_keeps_all_fields_without_per_row_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/companies/all/')
+        self.assertEqual(len(response.data), 6)
+        self.assertIn('users_list', response.data[0])
+        self.assertTrue(response.data[0]['has_evaluations'])
+        self.assertLessEqual(len(queries), 3)
+
+    def test_expand_is_opt_in(self):
+        response = self.client.get('/api/companies/all/', {'expand': ''})
+        self.assertNotIn('users_list', response.data[0])
+        self.assertIn('cnpj_display', response.data[0])
+
+        response = self.client.get('/api/companies/all/', {'fields': 'id', 'expand': 'users_list'})
+        self.assertEqual(set(response.data[0]), {'id', 'users_list'})
+        self.assertEqual(len(response.data[0]['users_list']), 1)
+
+    def test_evaluation_list_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/evaluation/', {'fields': 'id,status', 'page_size': 50})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'status'})
+        self.assertFalse(any('core_actionplan' in query['sql'] or 'core_company' in query['sql'] for query in queries))
+
+        response = self.client.get('/api/evaluation/', {'fields': 'id,company_name', 'expand': 'action_plan'})
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {'id', 'company_name', 'action_plan'})
+        self.assertEqual(row['action_plan'], ActionPlan.objects.get(evaluation_id=row['id']).id)
+
+    def test_fields_do_not_restrict_writes(self):
+        company = self.companies[0]
+        response = self.client.patch(f'/api/companies/{company.id}/?fields=id', {'name': 'Nova'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Nova')
+
+
+class StreamingCompanyListTestCase(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='12345')
+        for index in range(7):
+            company = Company.objects.create(name=f'Empresa {index}', cnpj=f'0000000000{index:04d}')
+            company.users.add(User.objects.create_user(username=f'user{index}', password='12345'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    @override_settings(STREAM_CHUNK_SIZE=3)
+    def test_stream_matches_regular_response(self):
+        expected = self.client.get('/api/companies/all/').json()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/companies/all/', {'stream': 'true'})
+            chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(''.join(chunks)), expected)
+        # '[', três lotes e ']'
+        self.assertEqual(len(chunks), 5)
+        # Cada lote: uma consulta das empresas e uma do prefetch dos usuários
+        self.assertLessEqual(len(queries), 2 * 3 + 1)
+
+    def test_stream_honours_fields(self):
+        response = self.client.get('/api/companies/my-companies/', {'stream': 'true', 'fields': 'id,name'})
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), [])
+
+        response = self.client.get('/api/companies/all/', {'stream': '1', 'fields': 'id,name'})
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(set(rows[0]), {'id', 'name'})
+
+
+class CompanySearchTestCase(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='12345')
+        form = Form.objects.create(name='Safety Form')
+        self.petro = Company.objects.create(name='Petróleo Brasileiro S.A.', cnpj='33.000.167/0001-01', dominio='petrobras.com.br')
+        self.other = Company.objects.create(name='Água Limpa Serviços', cnpj='11.222.333/0001-81')
+        for company in (self.petro, self.other):
+            Evaluation.objects.create(
+                company=company, evaluator=self.admin, form=form, valid_until=date(2099, 12, 31), period=date(2025, 3, 1),
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _names(self, url, search):
+        response = self.client.get(url, {'search': search})
+        self.assertEqual(response.status_code, 200)
+        return [row.get('company_name', row.get('name')) for row in response.data['results']]
+
+    def test_search_key_is_maintained_on_save(self):
+        self.assertEqual(self.petro.search_key, 'petroleo brasileiro s.a. 33000167000101 petrobras.com.br')
+        self.other.name = 'Águas do Norte'
+        self.other.save(update_fields=['name'])
+        self.assertTrue(Company.objects.get(pk=self.other.pk).search_key.startswith('aguas do norte'))
+
+    def test_prefix_search_ignores_accents_and_case(self):
+        self.assertEqual(self._names('/api/companies/', 'PETROLEO'), ['Petróleo Brasileiro S.A.'])
+        self.assertEqual(self._names('/api/companies/', 'agua'), ['Água Limpa Serviços'])
+        self.assertEqual(self._names('/api/companies/', '11.222'), ['Água Limpa Serviços'])
+        self.assertEqual(self._names('/api/evaluation/', 'petró'), ['Petróleo Brasileiro S.A.'])
+
+    def test_prefix_backend_does_not_match_inside_the_key(self):
+        # Só o início do nome ou do CNPJ: diferente do icontains anterior, trechos do meio não casam
+        self.assertEqual(self._names('/api/companies/', 'petro'), ['Petróleo Brasileiro S.A.'])
+        self.assertEqual(self._names('/api/companies/', '33000'), ['Petróleo Brasileiro S.A.'])
+        self.assertEqual(self._names('/api/companies/', 'brasileiro'), [])
+        self.assertEqual(self._names('/api/companies/', 'limpa'), [])
+        self.assertEqual(self._names('/api/companies/', '0001-81'), [])
+        self.assertEqual(self._names('/api/companies/', 'petrobras'), [])
+        self.assertEqual(self._names('/api/evaluation/', 'servicos'), [])
+
+    @override_settings(COMPANY_SEARCH_BACKEND='fulltext')
+    def test_fulltext_backend_matches_any_word(self):
+        call_command('setup_company_search', stdout=StringIO())
+        Company.objects.create(name='Construtora Brasília', cnpj='44555666000177')
+
+        self.assertEqual(self._names('/api/companies/', 'brasil'), ['Construtora Brasília', 'Petróleo Brasileiro S.A.'])
+        self.assertEqual(self._names('/api/companies/', 'servicos limpa'), ['Água Limpa Serviços'])
+        self.assertEqual(self._names('/api/companies/', 'petrobras'), ['Petróleo Brasileiro S.A.'])
+        self.assertEqual(self._names('/api/evaluation/', 'brasileiro'), ['Petróleo Brasileiro S.A.'])
+
+    @override_settings(COMPANY_SEARCH_BACKEND='fulltext')
+    def test_fulltext_on_unsupported_database_uses_prefix(self):
+        with patch.object(connection, 'vendor', 'postgresql'), self.assertLogs('apps.core.search', 'WARNING'):
+            self.assertEqual(self._names('/api/companies/', 'petro'), ['Petróleo Brasileiro S.A.'])
+            self.assertEqual(self._names('/api/companies/', 'brasileiro'), [])
+
+
+class TenantScopingTestCase(CoreTestCase):
+
+    def set_up_data(self):
+        self.user = User.objects.create_user(username='user', password='12345')
+        self.inside = self.company
+        self.outside = Company.objects.create(name='Empresa Fora', cnpj='22222222000122')
+        self.polo = Polo.objects.create(name='Polo Norte')
+        self.polo.companies.add(self.inside)
+        self.inside.users.add(self.user)
+        for company in (self.inside, self.outside):
+            evaluation = self.create_evaluation(company=company, period=date(2025, 3, 1))
+            ActionPlan.objects.create(company=company, evaluation=evaluation, description='Plano')
+
+    def _company_ids(self, url, headers=None):
+        response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        return sorted(row.get('company', row.get('id')) for row in rows)
+
+    def test_superuser_sees_all_or_the_polo(self):
+        self.client.force_authenticate(self.admin)
+        both = sorted([self.inside.id, self.outside.id])
+        for url in ('/api/companies/', '/api/companies/all/', '/api/evaluation/', '/api/action-plans/'):
+            self.assertEqual(self._company_ids(url), both)
+            self.assertEqual(self._company_ids(url, {'X-Polo-Id': str(self.polo.id)}), [self.inside.id])
+
+    def test_user_sees_only_own_companies_without_joins(self):
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._company_ids('/api/action-plans/'), [self.inside.id])
+        scoped = [query['sql'] for query in queries if 'core_actionplan' in query['sql']]
+        self.assertFalse(any('core_company_users' in sql or 'core_polo_companies' in sql for sql in scoped))
+        self.assertEqual(self._company_ids('/api/evaluation/'), [self.inside.id])
+        self.assertEqual(self.client.get('/api/rems/').status_code, 200)
+
+    def test_access_checks_reuse_request_company_ids(self):
+        user = User.objects.get(pk=self.user.pk)
+        request = SimpleNamespace(user=user, headers={})
+        self.assertEqual(visible_company_ids(request), {self.inside.id})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIs(user_has_access_to_company(user, self.inside), True)
+            self.assertEqual(user_has_access_to_company(user, self.outside).status_code, 403)
+            self.assertEqual(visible_company_ids(request), {self.inside.id})
+        self.assertEqual(len(queries), 0)
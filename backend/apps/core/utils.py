@@ -1,4 +1,5 @@
 import re
+import unicodedata
 
 def format_cnpj(cnpj):
     """
@@ -54,3 +55,20 @@ def clean_cnpj(cnpj):
     if not cnpj:
         return cnpj
     return re.sub(r'[^0-9]', '', str(cnpj))
+
+def fold_search_text(text):
+    """
+    Normaliza texto para busca: remove acentos, converte para minúsculas e
+    reduz espaços repetidos ("Petróleo  S.A." -> "petroleo s.a.")
+    """
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    without_accents = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(without_accents.lower().split())
+
+def company_search_key(name, cnpj, dominio):
+    """
+    Chave de busca da empresa: nome normalizado seguido do CNPJ (só números) e do domínio
+    """
+    return ' '.join(part for part in (fold_search_text(name), clean_cnpj(cnpj), fold_search_text(dominio)) if part)
@@ -4,18 +4,21 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiTypes
+import json
 import os
-import textwrap
-from io import BytesIO
+from contextlib import contextmanager
+from datetime import timedelta
 from apps.users.utils.permissions import user_has_access_to_company
-from django.http import FileResponse, Http404, HttpResponse
+from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404
-from django.db.models import Exists, OuterRef, Q
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.db import IntegrityError, transaction
 from django.db.models.deletion import ProtectedError
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from openpyxl import Workbook
-from .models import Company, CategoryQuestion, Question, Form, Answer, Subcategory, Evaluation, ActionPlan, Polo, ANSWER_CHOICES
+from .models import Company, CategoryQuestion, Question, Form, Answer, Subcategory, Evaluation, ActionPlan, Polo, PoloPeriodSummary, ExportBatch
+from .batch_exports import start_export_batch
+from .export_cache import open_cached_export
+from .exports import EXPORT_WRITERS
 from .serializers import (
     CompanySerializer, 
     CategoryQuestionSerializer, 
@@ -27,22 +30,46 @@ from .serializers import (
     EvaluationDetailSerializer,
     EvaluationProgressSerializer,
     ActionPlanSerializer,
+    BulkAnswerItemSerializer,
+    EvaluationFilterSerializer,
+    ExportBatchRequestSerializer,
+    ExportBatchSerializer,
     ScoreResponseSerializer,
-    PoloSerializer
+    PoloSerializer,
+    PoloPeriodSummarySerializer
 )
-from rest_framework.pagination import PageNumberPagination
+from .question_sets import get_form_question_set
+from .reports import evaluation_score_breakdown, evaluations_score_breakdown
+from .search import company_search_condition
+from .streaming import stream_json_array, wants_stream
+from .summaries import schedule_refresh, summary_totals
+from .tenancy import TenantScopedMixin, polo_company_ids, user_company_ids
+from .pagination import StandardResultsSetPagination, CursorOrPageNumberPagination, OptionalCursorPagination
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+
+def _delete_stored_files(stored_files):
+    for storage, name in stored_files:
+        storage.delete(name)
+
+
+@contextmanager
+def _discard_files_on_error(stored_files):
+    """
+    Arquivos gravados no storage antes de uma transação desfeita por exceção são removidos
+    """
+    try:
+        yield
+    except BaseException:
+        _delete_stored_files(stored_files)
+        raise
 
 
 @extend_schema(tags=['Empresas'])
-class CompanyViewSet(viewsets.ModelViewSet):
+class CompanyViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     queryset = Company.objects.all()
     serializer_class = CompanySerializer
     pagination_class = StandardResultsSetPagination
+    tenant_field = 'pk'
 
     def create(self, request, *args, **kwargs):
         """
@@ -78,29 +105,14 @@ class CompanyViewSet(viewsets.ModelViewSet):
         """
         Override get_queryset to filter by user's companies if not superuser
         """
-        queryset = Company.objects.all().order_by('name')
-        pole_id = self.request.headers.get('X-Polo-Id')
+        # Superusuário: todas ou as do polo; demais usuários: só as associadas a eles
+        queryset = self.scope_queryset(Company.objects.all().order_by('name'))
         search = self.request.query_params.get('search', '').strip()
 
-        if self.request.user.is_superuser:
-            if pole_id:
-                queryset = queryset.filter(poles__id=pole_id)
-        else:
-            # For non-superusers, only show companies they're associated with
-            queryset = queryset.filter(users=self.request.user)
-
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search)
-                | Q(cnpj__icontains=search)
-                | Q(dominio__icontains=search)
-            )
+            queryset = queryset.filter(company_search_condition(search))
 
-        return queryset.annotate(
-            has_evaluations=Exists(
-                Evaluation.objects.filter(company=OuterRef('pk'), is_active=True)
-            )
-        )
+        return CompanySerializer.optimize_queryset(queryset, self.request)
 
     def destroy(self, request, *args, **kwargs):
         company = self.get_object()
@@ -133,6 +145,13 @@ class CompanyViewSet(viewsets.ModelViewSet):
                 type=OpenApiTypes.BOOL,
                 location=OpenApiParameter.QUERY,
             ),
+            OpenApiParameter(
+                name='stream',
+                description='true envia o array JSON em streaming, lido do banco em lotes',
+                required=False,
+                type=OpenApiTypes.BOOL,
+                location=OpenApiParameter.QUERY,
+            ),
         ], 
         responses={200: CompanySerializer(many=True)}
     )
@@ -141,17 +160,8 @@ class CompanyViewSet(viewsets.ModelViewSet):
         """
         Endpoint para retornar todas as empresas sem paginação
         """ 
-        pole_id = self.request.headers.get('X-Polo-Id')
         is_active_param = request.query_params.get('is_active')
-
-        
-        if self.request.user.is_superuser:
-            if pole_id:
-                companies = Company.objects.filter(poles__id=pole_id).order_by('name')
-            else:
-                companies = Company.objects.all().order_by('name')
-        else:
-            companies = Company.objects.filter(users=self.request.user).order_by('name')
+        companies = self.scope_queryset(Company.objects.all().order_by('name'))
 
         if is_active_param is not None:
             should_filter_active = is_active_param.lower() in ['true', '1', 't', 'yes', 'on', '', True]
@@ -160,11 +170,19 @@ class CompanyViewSet(viewsets.ModelViewSet):
             else:
                 companies = companies.filter(is_active=False)
             
-        serializer = CompanySerializer(companies, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self._company_list_response(request, companies)
 
     @extend_schema(
         description="Retorna as empresas associadas ao usuário autenticado",
+        parameters=[
+            OpenApiParameter(
+                name='stream',
+                description='true envia o array JSON em streaming, lido do banco em lotes',
+                required=False,
+                type=OpenApiTypes.BOOL,
+                location=OpenApiParameter.QUERY,
+            ),
+        ],
         responses={200: CompanySerializer(many=True)}
     )
     @action(detail=False, methods=['get'], url_path='my-companies')
@@ -173,7 +191,16 @@ class CompanyViewSet(viewsets.ModelViewSet):
         Endpoint para retornar as empresas do usuário logado
         """
         companies = request.user.companies.filter(is_active=True).order_by('name')
-        serializer = CompanySerializer(companies, many=True)
+        return self._company_list_response(request, companies)
+
+    def _company_list_response(self, request, companies):
+        """
+        Lista sem paginação; com ?stream=true o JSON é enviado em lotes, sem montar a lista inteira em memória
+        """
+        companies = CompanySerializer.optimize_queryset(companies, request)
+        if wants_stream(request):
+            return stream_json_array(companies, CompanySerializer(context={'request': request}))
+        serializer = CompanySerializer(companies, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -218,11 +245,36 @@ class FormViewSet(viewsets.ModelViewSet):
     serializer_class = FormSerializer
 
 @extend_schema(tags=['Avaliações'])
-class EvaluationViewSet(viewsets.ModelViewSet):
+class EvaluationViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     queryset = Evaluation.objects.all()
     serializer_class = EvaluationSerializer
-    pagination_class = StandardResultsSetPagination
-    ANSWER_LABELS = dict(ANSWER_CHOICES)
+    pagination_class = CursorOrPageNumberPagination
+
+    # Campos expostos para filtros de intervalo (?campo__lt=) e ordenação (?ordering=)
+    PROGRESS_FILTER_FIELDS = {
+        'total_questions': 'total_questions',
+        'answered_questions': 'respondent_answered',
+        'evaluated_questions': 'evaluator_answered',
+        'answered_percentage': 'progress_answered_percentage',
+        'score': 'score',
+    }
+    PROGRESS_BOOLEAN_FILTERS = {
+        'fully_answered': 'progress_fully_answered',
+        'fully_evaluated': 'progress_fully_evaluated',
+    }
+    RANGE_LOOKUPS = ('lt', 'lte', 'gt', 'gte')
+    DETAIL_ACTIONS = ('details', 'questions_with_answers', 'export_pdf', 'export_xlsx')
+    ORDERING_FIELDS = {
+        **PROGRESS_FILTER_FIELDS,
+        'fully_answered': 'progress_fully_answered',
+        'fully_evaluated': 'progress_fully_evaluated',
+        'period': 'period',
+        'valid_until': 'valid_until',
+        'created_at': 'created_at',
+        'status': 'status',
+        'company_name': 'company__name',
+        'id': 'id',
+    }
 
     @extend_schema(
         responses=ScoreResponseSerializer
@@ -239,27 +291,18 @@ class EvaluationViewSet(viewsets.ModelViewSet):
 
         evaluation = self.get_object()
 
-        # Pegamos todas as respostas associadas a essa avaliação
-        answers = evaluation.answers.all()
-        if not answers.exists():
+        if not evaluation.answers.exists():
             return Response({
                 "detail": "Nenhuma resposta encontrada para esta avaliação."
             }, status=status.HTTP_404_NOT_FOUND)
 
-        total_score = 100  # Pontuação acumulada
+        # Soma dos pesos das respostas NC em uma única consulta agregada
+        final_score = evaluation.compute_score()
 
-        for answer in answers:
-            category_weight = answer.question.category.weight  # Peso da categoria da pergunta
-            # Verifica se a resposta é "Certo" ou "Errado"
-            if answer.answer_evaluator in ['NC']:
-                # Se a resposta for considerada "Certo", somamos o peso da categoria à pontuação
-                total_score -= category_weight
-        # Verifica se o total_weight é maior que zero para evitar divisão por zero
-       
-        final_score = total_score
-
-        evaluation.score = final_score
-        evaluation.save()
+        Evaluation.objects.filter(pk=evaluation.pk).versioned_update(
+            summary_keys={(evaluation.company_id, evaluation.period)}, score=final_score,
+        )
+        evaluation.refresh_from_db(fields=['score', 'version', 'updated_at'])
         evaluation.refresh_status()
         
         # Retorna a pontuação calculada
@@ -278,69 +321,106 @@ class EvaluationViewSet(viewsets.ModelViewSet):
         if not companies:
             return super().create(request, *args, **kwargs)
 
-        created_evaluations = []
-
         try:
-            base_data = request.data.copy()
-            del base_data['companies']
-            form_id = base_data.get('form')
-            period = base_data.get('period')
-
-            # Verifica duplicatas antes de iniciar a transação
-            duplicate_companies = []
-            for company_id in companies:
-                existing = Evaluation.objects.filter(
-                    company_id=company_id,
-                    form_id=form_id,
-                    period__startswith=period[:7], # Compara apenas ano e mês
-                    is_active=True
-                ).exists()
-                
-                if existing:
-                    company = Company.objects.get(id=company_id)
-                    duplicate_companies.append(company.name)
-
-            if duplicate_companies:
-                return Response({
-                    'error': 'Avaliações duplicadas detectadas',
-                    'message': f'Já existem avaliações para as empresas: {", ".join(duplicate_companies)} no período selecionado com o mesmo formulário.',
-                    'duplicate_companies': duplicate_companies
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-            # Se não houver duplicatas, prossegue com a criação
-            from django.db import transaction
-            with transaction.atomic():
-                for company_id in companies:
-                    evaluation_data = base_data.copy()
-                    evaluation_data['company'] = company_id
-                    
-                    serializer = self.get_serializer(data=evaluation_data)
-                    serializer.is_valid(raise_exception=True)
-                    self.perform_create(serializer)
-                    created_evaluations.append(serializer.data)
-
+            company_ids = list(dict.fromkeys(int(company_id) for company_id in companies))
+        except (TypeError, ValueError):
             return Response({
-                'created': created_evaluations,
-                'message': f'Criadas {len(created_evaluations)} avaliações com sucesso'
-            }, status=status.HTTP_201_CREATED)
+                'error': 'Empresas inválidas',
+                'message': 'A lista de empresas deve conter apenas IDs numéricos.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        base_data = request.data.copy()
+        del base_data['companies']
+        base_data['company'] = company_ids[0]
 
-        except Exception as e:
+        # Valida os campos comuns uma única vez; a duplicidade é verificada abaixo para todas as empresas
+        serializer = EvaluationSerializer(data=base_data)
+        if not serializer.is_valid():
             return Response({
-                'error': str(e),
+                'error': serializer.errors,
                 'message': 'Erro ao criar avaliações'
             }, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        data.pop('company')
+
+        company_names = dict(Company.objects.filter(pk__in=company_ids).values_list('id', 'name'))
+        results = {
+            company_id: {'company': company_id, 'company_name': company_names.get(company_id), 'status': 'ready'}
+            for company_id in company_ids
+        }
+        for company_id in company_ids:
+            if company_id not in company_names:
+                results[company_id]['status'] = 'not_found'
+
+        duplicate_companies = []
+        period = data.get('period')
+        if period:
+            # Uma consulta para todas as empresas, por intervalo do mês (usa o índice de period)
+            month_start = period.replace(day=1)
+            next_month = (month_start + timedelta(days=32)).replace(day=1)
+            existing = Evaluation.objects.filter(
+                company_id__in=company_ids,
+                period__gte=month_start,
+                period__lt=next_month,
+                is_active=True,
+            ).values_list('company_id', 'id')
+            for company_id, evaluation_id in existing:
+                if results[company_id]['status'] == 'ready':
+                    results[company_id].update(status='duplicate', existing_evaluation=evaluation_id)
+                    duplicate_companies.append(company_names[company_id])
+
+        if any(result['status'] != 'ready' for result in results.values()):
+            response = {'results': list(results.values())}
+            if duplicate_companies:
+                response.update({
+                    'error': 'Avaliações duplicadas detectadas',
+                    'message': f'Já existem avaliações para as empresas: {", ".join(duplicate_companies)} no período selecionado.',
+                    'duplicate_companies': duplicate_companies,
+                })
+            else:
+                response.update({'error': 'Empresas não encontradas', 'message': 'Erro ao criar avaliações'})
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+
+        # bulk_create não chama save(): total de perguntas e versão são preenchidos aqui
+        total_questions = get_form_question_set(data['form'])['count']
+        evaluations = [
+            Evaluation(company_id=company_id, total_questions=total_questions, **data)
+            for company_id in company_ids
+        ]
+        with transaction.atomic():
+            Evaluation.objects.bulk_create(evaluations)
+            if any(evaluation.pk is None for evaluation in evaluations):
+                # Bancos sem RETURNING no INSERT em lote: busca os IDs recém-criados
+                created_ids = dict(Evaluation.objects.filter(
+                    company_id__in=company_ids, form=data['form'], period=period, is_active=data.get('is_active', True),
+                ).values_list('company_id', 'id'))
+                for evaluation in evaluations:
+                    evaluation.pk = created_ids[evaluation.company_id]
+            schedule_refresh({(company_id, period) for company_id in company_ids})
+
+        for evaluation in evaluations:
+            results[evaluation.company_id].update(status='created', evaluation_id=evaluation.pk)
+
+        created = self._with_list_annotations(
+            Evaluation.objects.filter(pk__in=[evaluation.pk for evaluation in evaluations])
+        ).order_by('company__name', 'id')
+        created_evaluations = EvaluationSerializer(created, many=True, context=self.get_serializer_context()).data
+
+        return Response({
+            'created': created_evaluations,
+            'results': list(results.values()),
+            'message': f'Criadas {len(created_evaluations)} avaliações com sucesso'
+        }, status=status.HTTP_201_CREATED)
+
+    def perform_update(self, serializer):
+        # Mudanças de prazo ou formulário refletem no status imediatamente
+        evaluation = serializer.save()
+        evaluation.refresh_status()
 
     def get_queryset(self):
-        queryset = Evaluation.objects.all()
+        queryset = self.scope_queryset(Evaluation.objects.all())
         is_active = self.request.query_params.get('is_active')
-        pole_id = self.request.headers.get('X-Polo-Id')
-        search = self.request.query_params.get('search', '')
-
-        if self.request.user.is_superuser:
-            if pole_id:
-                queryset = queryset.filter(company__poles__id=pole_id)
-        else:
-            queryset = queryset.filter(company__users=self.request.user)
+        search = self.request.query_params.get('search', '').strip()
 
         if is_active is not None:
             is_active_bool = is_active.lower() == 'true'
@@ -365,12 +445,191 @@ class EvaluationViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(period__year=year_int)
 
         if search:
-            queryset = queryset.filter(
-                company__name__icontains=search
+            queryset = queryset.filter(company_search_condition(search, prefix='company__'))
+
+        # ?fields=/?expand= só reduzem as consultas das ações serializadas com EvaluationSerializer
+        queryset = self._with_list_annotations(
+            queryset, self.request if self.action in ('list', 'retrieve') else None
+        )
+        if self.action in (*self.DETAIL_ACTIONS, 'progress'):
+            queryset = queryset.select_related('evaluator')
+        queryset = self._apply_progress_filters(queryset)
+        return queryset.order_by(*self._get_ordering())
+
+    def _with_list_annotations(self, queryset, request=None):
+        """
+        Anota contadores de progresso e o plano de ação na mesma consulta da listagem;
+        com request, apenas o que os campos pedidos em ?fields=/?expand= utilizam
+        """
+        return EvaluationSerializer.optimize_queryset(queryset.with_progress(), request)
+
+    def _apply_progress_filters(self, queryset):
+        params = self.request.query_params
+
+        for param, annotation in self.PROGRESS_FILTER_FIELDS.items():
+            for lookup in self.RANGE_LOOKUPS:
+                raw_value = params.get(f'{param}__{lookup}')
+                if raw_value in (None, ''):
+                    continue
+                try:
+                    value = float(raw_value)
+                except (TypeError, ValueError):
+                    continue
+                queryset = queryset.filter(**{f'{annotation}__{lookup}': value})
+
+        for param, annotation in self.PROGRESS_BOOLEAN_FILTERS.items():
+            raw_value = params.get(param)
+            if raw_value is not None:
+                queryset = queryset.filter(**{annotation: raw_value.lower() in ['true', '1', 't', 'yes', 'on']})
+
+        return queryset
+
+    def get_cursor_ordering(self):
+        return self._get_ordering()
+
+    def _get_ordering(self):
+        """
+        Interpreta ?ordering=campo,-campo mantendo -id como critério de desempate
+        """
+        ordering = []
+        raw_ordering = self.request.query_params.get('ordering', '')
+        for term in raw_ordering.split(','):
+            term = term.strip()
+            descending = term.startswith('-')
+            field = self.ORDERING_FIELDS.get(term.lstrip('-'))
+            if field:
+                ordering.append(f'-{field}' if descending else field)
+
+        if not ordering:
+            ordering = ['-period']
+        if 'id' not in ordering and '-id' not in ordering:
+            ordering.append('-id')
+        return ordering
+
+
+    @extend_schema(
+        tags=['Avaliações'],
+        description=(
+            "Grava várias respostas da avaliação em uma única transação. Aceita JSON "
+            "({\"answers\": [...]}) ou multipart, com 'answers' em JSON e anexos nos campos "
+            "attachment_respondent_<id da pergunta> / attachment_evaluator_<id da pergunta>."
+        ),
+        request=BulkAnswerItemSerializer(many=True),
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=True, methods=['post'], url_path='answers/bulk')
+    def bulk_answers(self, request, pk=None):
+        evaluation = self.get_object()
+
+        access_check = user_has_access_to_company(request.user, evaluation.company)
+        if access_check is not True:
+            return access_check
+
+        if not request.user.is_superuser and evaluation.is_expired():
+            return Response(
+                {"detail": "A data limite para responder esta avaliação já expirou."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        return queryset.order_by('-period', '-id')
+        items = request.data.get('answers')
+        if isinstance(items, str):
+            try:
+                items = json.loads(items)
+            except ValueError:
+                return Response({"detail": "Campo 'answers' não é um JSON válido."}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(items, list) or not items:
+            return Response({"detail": "Nenhuma resposta enviada."}, status=status.HTTP_400_BAD_REQUEST)
+
+        question_ids = set(get_form_question_set(evaluation.form)['question_ids'])
+
+        stored_files = []
+        with _discard_files_on_error(stored_files), transaction.atomic():
+            existing = {
+                answer.question_id: answer
+                for answer in Answer.objects.select_for_update().filter(evaluation=evaluation)
+            }
+            context = {
+                'request': request,
+                'question_ids': question_ids,
+                'existing_question_ids': existing.keys(),
+            }
+
+            results, to_create, to_update, update_fields, seen = [], [], [], set(), set()
+            for item in items:
+                item = dict(item) if isinstance(item, dict) else {}
+                question_id = item.get('question')
+                for field_name in ('attachment_respondent', 'attachment_evaluator'):
+                    uploaded = request.FILES.get(f'{field_name}_{question_id}')
+                    if uploaded is not None:
+                        item[field_name] = uploaded
+
+                serializer = BulkAnswerItemSerializer(data=item, context=context)
+                if not serializer.is_valid():
+                    results.append({'question': question_id, 'status': 'error', 'errors': serializer.errors})
+                    continue
+
+                data = serializer.validated_data
+                if data['question'] in seen:
+                    results.append({'question': question_id, 'status': 'error', 'errors': {'question': ["Pergunta repetida no envio."]}})
+                    continue
+                seen.add(data['question'])
+
+                answer = existing.get(data['question'])
+                if answer is None:
+                    answer = Answer(question_id=data['question'], evaluation=evaluation, company=evaluation.company)
+                    to_create.append(answer)
+                    result = {'question': data['question'], 'status': 'created'}
+                else:
+                    to_update.append(answer)
+                    result = {'question': data['question'], 'status': 'updated'}
+
+                for field_name, value in data.items():
+                    if field_name == 'question':
+                        continue
+                    if field_name.startswith('attachment_') and value:
+                        # bulk_update não grava arquivos; salva antes de montar o lote
+                        field_file = getattr(answer, field_name)
+                        field_file.save(value.name, value, save=False)
+                        stored_files.append((field_file.storage, field_file.name))
+                    else:
+                        setattr(answer, field_name, value)
+                    update_fields.add(field_name)
+                results.append(result)
 
+            try:
+                Answer.objects.bulk_create(to_create)
+                if to_update and update_fields:
+                    Answer.objects.bulk_update(to_update, sorted(update_fields))
+            except IntegrityError:
+                # Outra requisição criou as mesmas respostas (unique_answer_per_question_in_evaluation)
+                transaction.set_rollback(True)
+                _delete_stored_files(stored_files)
+                return Response(
+                    {"detail": "As respostas foram alteradas por outra requisição. Tente novamente."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+            # Contadores e status recalculados uma única vez para todo o lote
+            Evaluation.objects.filter(pk=evaluation.pk).rebuild_progress()
+            evaluation.refresh_from_db(fields=[*Evaluation.PROGRESS_FIELDS, 'status', 'completed_at', 'version', 'updated_at'])
+            evaluation.refresh_status()
+
+        answer_ids = {answer.question_id: answer.pk for answer in [*to_create, *to_update]}
+        if None in answer_ids.values():
+            answer_ids = dict(Answer.objects.filter(evaluation=evaluation).values_list('question_id', 'id'))
+        for result in results:
+            if result['status'] != 'error':
+                result['id'] = answer_ids.get(result['question'])
+
+        saved = len(to_create) + len(to_update)
+        return Response({
+            'evaluation_id': evaluation.id,
+            'created': len(to_create),
+            'updated': len(to_update),
+            'errors': len(results) - saved,
+            'status': evaluation.status,
+            'results': results,
+        }, status=status.HTTP_200_OK if saved else status.HTTP_400_BAD_REQUEST)
 
     @extend_schema(
         tags=['Avaliações'],
@@ -380,14 +639,42 @@ class EvaluationViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'], url_path='details')
     def details(self, request, pk=None):
         evaluation = self.get_object()
+        not_modified = self._conditional_response(request, evaluation)
+        if not_modified is not None:
+            return not_modified
+
         serializer = EvaluationDetailSerializer(evaluation)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        response = Response(serializer.data, status=status.HTTP_200_OK)
+        return self._with_validators(response, evaluation)
     
     @action(detail=True, methods=['get'], url_path='progress')
     def progress(self, request, pk=None):
         evaluation = self.get_object()
+        not_modified = self._conditional_response(request, evaluation)
+        if not_modified is not None:
+            return not_modified
+
         serializer = EvaluationProgressSerializer(evaluation)
-        return Response(serializer.data)
+        return self._with_validators(Response(serializer.data), evaluation)
+
+    def _etag(self, evaluation):
+        # Só o ETag: Last-Modified tem resolução de segundos e não distingue duas
+        # alterações no mesmo segundo; os nomes exibidos também entram no ETag
+        return quote_etag(evaluation.content_fingerprint())
+
+    def _conditional_response(self, request, evaluation):
+        """
+        Responde 304 (If-None-Match) sem serializar a avaliação
+        """
+        response = get_conditional_response(request, etag=self._etag(evaluation))
+        if response is not None:
+            return self._with_validators(response, evaluation)
+        return None
+
+    def _with_validators(self, response, evaluation):
+        response['ETag'] = self._etag(evaluation)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
     
     
     @action(detail=False, methods=['get'], url_path='evaluations-by-company/(?P<company_id>[^/.]+)')
@@ -407,7 +694,9 @@ class EvaluationViewSet(viewsets.ModelViewSet):
 
         is_active = request.query_params.get('is_active', 'true').lower() == 'true'
         # Obter todas as avaliações da empresa
-        evaluations = Evaluation.objects.filter(company=company, is_active = is_active).order_by('-period')
+        evaluations = self._with_list_annotations(
+            Evaluation.objects.filter(company=company, is_active=is_active)
+        ).order_by('-period')
 
         # Serializar as avaliações e retornar a resposta
         serializer = EvaluationSerializer(evaluations, many=True)
@@ -445,26 +734,6 @@ class EvaluationViewSet(viewsets.ModelViewSet):
         serializer = EvaluationDetailSerializer(evaluation)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-    def _build_export_payload(self, evaluation):
-        serializer = EvaluationDetailSerializer(
-            evaluation, context={'request': self.request}
-        )
-        data = serializer.data
-        data['period_display'] = evaluation.period.strftime('%m/%Y') if evaluation.period else '-'
-        data['valid_until_display'] = evaluation.valid_until.strftime('%d/%m/%Y') if evaluation.valid_until else '-'
-        data['score_display'] = f"{evaluation.score:.2f}" if evaluation.score is not None else '-'
-        action_plan = evaluation.action_plans.first()
-        data['action_plan'] = ActionPlanSerializer(action_plan).data if action_plan else None
-        return data
-
-    def _attachment_label(self, value):
-        return "Sim" if value else "Não"
-
-    def _choice_label(self, value):
-        if not value:
-            return 'Sem resposta'
-        return self.ANSWER_LABELS.get(value, value)
-
     @extend_schema(
         tags=['Avaliações'],
         description="Exporta os detalhes da avaliação em PDF.",
@@ -472,70 +741,7 @@ class EvaluationViewSet(viewsets.ModelViewSet):
     )
     @action(detail=True, methods=['get'], url_path='export/pdf')
     def export_pdf(self, request, pk=None):
-        evaluation = self.get_object()
-        payload = self._build_export_payload(evaluation)
-
-        buffer = BytesIO()
-        pdf = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-        y_position = height - 40
-
-        def write_line(text, font="Helvetica", size=10, leading=14):
-            nonlocal y_position
-            wrapped_lines = textwrap.wrap(text, width=100) or ['']
-            for line in wrapped_lines:
-                if y_position <= 60:
-                    pdf.showPage()
-                    y_position = height - 40
-                    pdf.setFont(font, size)
-                pdf.setFont(font, size)
-                pdf.drawString(40, y_position, line)
-                y_position -= leading
-
-        write_line("Resumo da Avaliação", font="Helvetica-Bold", size=12, leading=18)
-        summary_lines = [
-            f"Empresa: {payload.get('company_name')}",
-            f"Formulário: {payload.get('form_name')}",
-            f"Período: {payload.get('period_display')}",
-            f"Status: {payload.get('status')}",
-            f"Nota: {payload.get('score_display')}",
-            f"Validade: {payload.get('valid_until_display')}",
-        ]
-        for line in summary_lines:
-            write_line(line)
-
-        write_line("-" * 80)
-        write_line("Perguntas e respostas", font="Helvetica-Bold", size=12, leading=18)
-
-        questions = payload.get('questions', [])
-        for index, question in enumerate(questions, start=1):
-            answer = question.get('answer') or {}
-            write_line(f"Pergunta {index}: {question.get('question')}", font="Helvetica-Bold", size=10, leading=16)
-            if question.get('recommendation'):
-                write_line(f"Recomendação: {question.get('recommendation')}")
-            write_line(f"Empresa: {self._choice_label(answer.get('answer_respondent'))}")
-            write_line(f"Anexo da Empresa: {self._attachment_label(answer.get('attachment_respondent'))}")
-            write_line(f"Avaliador: {self._choice_label(answer.get('answer_evaluator'))}")
-            write_line(f"Anexo do avaliador: {self._attachment_label(answer.get('attachment_evaluator'))}")
-            if answer.get('note'):
-                write_line(f"Observação: {answer.get('note')}")
-            write_line("-" * 60)
-
-        if payload.get('action_plan'):
-            plan = payload['action_plan']
-            write_line("Plano de Ação", font="Helvetica-Bold", size=12, leading=18)
-            write_line(f"Descrição: {plan.get('description')}")
-            write_line(f"Status: {plan.get('status')}")
-            write_line(f"Data de término: {plan.get('end_date') or '-'}")
-            if plan.get('response_company'):
-                write_line(f"Resposta: {plan.get('response_company')}")
-
-        pdf.save()
-        buffer.seek(0)
-        filename = f"avaliacao_{evaluation.id}.pdf"
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        return self._export_response(request, self.get_object(), 'pdf')
 
     @extend_schema(
         tags=['Avaliações'],
@@ -544,61 +750,175 @@ class EvaluationViewSet(viewsets.ModelViewSet):
     )
     @action(detail=True, methods=['get'], url_path='export/xlsx')
     def export_xlsx(self, request, pk=None):
+        return self._export_response(request, self.get_object(), 'xlsx')
+
+    def _export_response(self, request, evaluation, export_format):
+        """
+        Serve a exportação do cache em disco (renderiza só quando a versão mudou)
+        """
+        not_modified = self._conditional_response(request, evaluation)
+        if not_modified is not None:
+            return not_modified
+
+        output, size = open_cached_export(evaluation, export_format)
+        _, content_type = EXPORT_WRITERS[export_format]
+        filename = f"avaliacao_{evaluation.id}.{export_format}"
+        response = FileResponse(output, content_type=content_type, as_attachment=True, filename=filename)
+        response['Content-Length'] = size
+        return self._with_validators(response, evaluation)
+
+    def _filtered_evaluations(self, request, filters):
+        queryset = Evaluation.objects.all()
+        pole_id = filters.get('polo') or request.headers.get('X-Polo-Id')
+
+        # Aqui o polo restringe também os usuários comuns
+        company_ids = user_company_ids(request)
+        if pole_id:
+            pole_ids = polo_company_ids(request, pole_id)
+            company_ids = pole_ids if company_ids is None else company_ids & pole_ids
+        if company_ids is not None:
+            queryset = queryset.filter(company_id__in=company_ids)
+        if filters.get('period_year'):
+            queryset = queryset.filter(period__year=filters['period_year'])
+        if filters.get('period_month'):
+            queryset = queryset.filter(period__month=filters['period_month'])
+        if filters.get('status'):
+            queryset = queryset.filter(status=filters['status'])
+        if filters.get('is_active') is not None:
+            queryset = queryset.filter(is_active=filters['is_active'])
+        return queryset.order_by('company__name', 'id')
+
+    @extend_schema(
+        tags=['Avaliações'],
+        description=(
+            "Recalcula a nota de todas as avaliações do polo/período/status informados "
+            "em um único UPDATE. Avaliações sem respostas são ignoradas."
+        ),
+        request=EvaluationFilterSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=['post'], url_path='rescore')
+    def rescore(self, request):
+        params = EvaluationFilterSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+
+        evaluations = self._filtered_evaluations(request, params.validated_data)
+        updated = Evaluation.objects.filter(pk__in=evaluations.order_by().values('pk')).rescore()
+        return Response({
+            'updated': updated,
+            'message': f'Notas recalculadas para {updated} avaliações.'
+        }, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        tags=['Avaliações'],
+        description=(
+            "Detalha a nota por categoria e subcategoria: respostas NC, taxa de conformidade "
+            "(C / (C + NC)) e peso perdido, calculados em um único GROUP BY."
+        ),
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=True, methods=['get'], url_path='score-breakdown')
+    def score_breakdown(self, request, pk=None):
         evaluation = self.get_object()
-        payload = self._build_export_payload(evaluation)
-
-        workbook = Workbook()
-        summary_sheet = workbook.active
-        summary_sheet.title = "Resumo"
-        summary_rows = [
-            ("Empresa", payload.get('company_name')),
-            ("Formulário", payload.get('form_name')),
-            ("Período", payload.get('period_display')),
-            ("Status", payload.get('status')),
-            ("Nota", payload.get('score_display')),
-            ("Validade", payload.get('valid_until_display')),
-        ]
-        for row in summary_rows:
-            summary_sheet.append(row)
-
-        questions_sheet = workbook.create_sheet("Perguntas")
-        questions_sheet.append(["Categoria", "Pergunta", "Empresa", "Avaliador", "Observação", "Anexo da Empresa", "Anexo do Avaliador"])
-        for question in payload.get('questions', []):
-            answer = question.get('answer') or {}
-            questions_sheet.append([
-                question.get('category_name'),
-                question.get('question'),
-                self._choice_label(answer.get('answer_respondent')),
-                self._choice_label(answer.get('answer_evaluator')),
-                answer.get('note') or '',
-                self._attachment_label(answer.get('attachment_respondent')),
-                self._attachment_label(answer.get('attachment_evaluator')),
-            ])
-
-        if payload.get('action_plan'):
-            plan = payload['action_plan']
-            plan_sheet = workbook.create_sheet("Plano de Ação")
-            plan_rows = [
-                ("Descrição", plan.get('description')),
-                ("Status", plan.get('status')),
-                ("Data de término", plan.get('end_date') or '-'),
-                ("Resposta da empresa", plan.get('response_company') or '-'),
-                ("Classificação respondente", plan.get('response_choice_display') or '-'),
-            ]
-            for row in plan_rows:
-                plan_sheet.append(row)
-
-        output = BytesIO()
-        workbook.save(output)
-        output.seek(0)
-
-        filename = f"avaliacao_{evaluation.id}.xlsx"
-        response = HttpResponse(
-            output,
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        categories, totals = evaluation_score_breakdown(evaluation)
+        return Response({
+            'evaluation_id': evaluation.id,
+            'score': evaluation.score,
+            'totals': totals,
+            'categories': categories,
+        }, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        tags=['Avaliações'],
+        description="Detalhamento da nota por categoria somando todas as avaliações do polo/período/status.",
+        parameters=[EvaluationFilterSerializer],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=['get'], url_path='score-breakdown')
+    def period_score_breakdown(self, request):
+        params = EvaluationFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        evaluations = self._filtered_evaluations(request, params.validated_data)
+        categories, totals = evaluations_score_breakdown(evaluations)
+        return Response({
+            'evaluations': evaluations.count(),
+            'filters': params.validated_data,
+            'totals': totals,
+            'categories': categories,
+        }, status=status.HTTP_200_OK)
+
+    def _get_export_batch(self, request, batch_id):
+        batch = get_object_or_404(ExportBatch, pk=batch_id)
+        if not request.user.is_superuser and batch.created_by_id != request.user.id:
+            raise Http404("Exportação não encontrada.")
+        return batch
+
+    @extend_schema(
+        tags=['Avaliações'],
+        description=(
+            "Agenda a exportação (PDF ou XLSX) de todas as avaliações do polo/período/status "
+            "informados em um único ZIP. Retorna 202 com o lote e a tarefa (job); acompanhe pelo "
+            "endpoint de status do lote ou por /api/jobs/{id}/."
+        ),
+        request=ExportBatchRequestSerializer,
+        responses={202: ExportBatchSerializer},
+    )
+    @action(detail=False, methods=['post'], url_path='export/batch')
+    def export_batch(self, request):
+        params = ExportBatchRequestSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        filters = dict(params.validated_data)
+        export_format = filters.pop('format')
+
+        evaluation_ids = list(self._filtered_evaluations(request, filters).values_list('id', flat=True))
+        if not evaluation_ids:
+            return Response(
+                {"detail": "Nenhuma avaliação encontrada para os filtros informados."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            batch = ExportBatch.objects.create(
+                created_by=request.user,
+                format=export_format,
+                filters=filters,
+                evaluation_ids=evaluation_ids,
+                total=len(evaluation_ids),
+            )
+            start_export_batch(batch)
+
+        serializer = ExportBatchSerializer(batch, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @extend_schema(tags=['Avaliações'], responses={200: ExportBatchSerializer})
+    @action(detail=False, methods=['get'], url_path=r'export/batch/(?P<batch_id>\d+)', url_name='export-batch-status')
+    def export_batch_status(self, request, batch_id=None):
+        batch = self._get_export_batch(request, batch_id)
+        serializer = ExportBatchSerializer(batch, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        tags=['Avaliações'],
+        responses={200: OpenApiResponse(response=OpenApiTypes.BINARY, description="Arquivo ZIP")}
+    )
+    @action(detail=False, methods=['get'], url_path=r'export/batch/(?P<batch_id>\d+)/download', url_name='export-batch-download')
+    def export_batch_download(self, request, batch_id=None):
+        batch = self._get_export_batch(request, batch_id)
+        if batch.status != 'COMPLETED' or not batch.file:
+            return Response(
+                {"detail": "A exportação ainda não foi concluída.", "status": batch.status},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if not os.path.exists(batch.file.path):
+            raise Http404("Arquivo da exportação não encontrado.")
+
+        return FileResponse(
+            open(batch.file.path, 'rb'),
+            content_type='application/zip',
+            as_attachment=True,
+            filename=os.path.basename(batch.file.name),
         )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
 
 
 @extend_schema(tags=['Respostas'])
@@ -616,9 +936,11 @@ def download_attachment_respondent(request, answer_id):
 
 
 @extend_schema(tags=['Plano de Ação'])
-class ActionPlanViewSet(viewsets.ModelViewSet):
+class ActionPlanViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     queryset = ActionPlan.objects.all()
     serializer_class = ActionPlanSerializer
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('-id',)
 
     @extend_schema(
         responses={200: OpenApiResponse(response=OpenApiTypes.BINARY, description="Successful file download")}
@@ -659,22 +981,12 @@ class ActionPlanViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     def get_queryset(self):
-        queryset = ActionPlan.objects.all()
-        pole_id = self.request.headers.get('X-Polo-Id')
-        
-        if self.request.user.is_superuser:
-            if pole_id:
-                queryset = queryset.filter(company__poles__id=pole_id)
-        else:
-            # Filter by user's companies
-            queryset = queryset.filter(company__users=self.request.user)
-            
-        return queryset
+        return self.scope_queryset(ActionPlan.objects.all())
 
 
 @extend_schema(tags=["Polos"])
 class PoloViewSet(viewsets.ModelViewSet):
-    queryset = Polo.objects.all().prefetch_related('companies', 'superusers')
+    queryset = Polo.objects.all().prefetch_related('companies', 'users')
     serializer_class = PoloSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
@@ -683,7 +995,7 @@ class PoloViewSet(viewsets.ModelViewSet):
         queryset = super().get_queryset().order_by('name')
         if self.request.user.is_superuser:
             return queryset
-        return queryset.filter(superusers=self.request.user)
+        return queryset.filter(users=self.request.user)
     
     @extend_schema(
         description='Retorna os polos associados ao usuário autenticado.',
@@ -703,3 +1015,35 @@ class PoloViewSet(viewsets.ModelViewSet):
         polos = Polo.objects.filter(is_active=True)
         serializer = self.get_serializer(polos, many=True)
         return Response(serializer.data)
+
+    @extend_schema(
+        description=(
+            'Resumo do polo por empresa e mês (status, nota média, progresso e planos de ação '
+            'em aberto), lido da tabela materializada PoloPeriodSummary.'
+        ),
+        parameters=[
+            OpenApiParameter('period_year', int, description='Ano do período'),
+            OpenApiParameter('period_month', int, description='Mês do período'),
+        ],
+        responses={200: PoloPeriodSummarySerializer(many=True)}
+    )
+    @action(detail=True, methods=['get'], url_path='summary')
+    def summary(self, request, pk=None):
+        polo = self.get_object()
+        summaries = PoloPeriodSummary.objects.filter(polo=polo).select_related('company')
+
+        for param, lookup in (('period_year', 'period__year'), ('period_month', 'period__month')):
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    summaries = summaries.filter(**{lookup: int(value)})
+                except ValueError:
+                    return Response({"detail": f"{param} inválido."}, status=status.HTTP_400_BAD_REQUEST)
+
+        summaries = list(summaries.order_by('-period', 'company__name'))
+        return Response({
+            'polo_id': polo.id,
+            'polo_name': polo.name,
+            'totals': summary_totals(summaries),
+            'results': PoloPeriodSummarySerializer(summaries, many=True).data,
+        })
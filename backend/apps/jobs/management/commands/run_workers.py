@@ -0,0 +1,57 @@
+import os
+import signal
+import socket
+import threading
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from apps.jobs.queue import requeue_stale, run_pending
+
+
+class Command(BaseCommand):
+    help = 'Executa as tarefas em segundo plano da tabela Job com um pool de threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Número de threads consumindo a fila')
+        parser.add_argument('--interval', type=float, default=2.0, help='Intervalo em segundos entre consultas à fila vazia')
+        parser.add_argument('--once', action='store_true', help='Esvazia a fila uma vez e encerra')
+
+    def handle(self, *args, **kwargs):
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+        if kwargs['once']:
+            requeue_stale()
+            processed = run_pending(f"{prefix}:0")
+            self.stdout.write(self.style.SUCCESS(f'{processed} tarefas executadas'))
+            return
+
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self._work, args=(f"{prefix}:{index}", kwargs['interval'], stop), daemon=True)
+            for index in range(kwargs['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(self.style.SUCCESS(f"{len(threads)} workers aguardando tarefas ({prefix})"))
+
+        # SIGTERM (deploy/systemd) encerra como Ctrl+C: termina as tarefas em andamento
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        try:
+            while not stop.is_set():
+                stop.wait(kwargs['interval'])
+                close_old_connections()
+                requeue_stale()
+        except KeyboardInterrupt:
+            stop.set()
+
+        self.stdout.write('Encerrando após as tarefas em andamento...')
+        for thread in threads:
+            thread.join()
+
+    def _work(self, worker_id, interval, stop):
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                if not run_pending(worker_id, limit=1):
+                    stop.wait(interval)
+        finally:
+            connection.close()
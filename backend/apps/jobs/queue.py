@@ -0,0 +1,151 @@
+#apps/jobs/queue.py
+"""
+Fila de tarefas sobre a tabela Job.
+
+- register('nome') associa um handler (função que recebe o Job e devolve o resultado em JSON);
+- enqueue('nome', payload) grava a tarefa, visível para os workers após o commit;
+- claim_next() reserva uma tarefa para o worker: SELECT ... FOR UPDATE SKIP LOCKED
+  onde o banco suporta e, em todos os casos, um UPDATE condicional (status = QUEUED),
+  de modo que dois workers nunca executam a mesma tarefa;
+- run_job() executa o handler e reagenda falhas com espera exponencial.
+"""
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+# Quantas candidatas tentar reservar por consulta quando não há SKIP LOCKED
+CLAIM_BATCH_SIZE = 10
+
+
+class JobError(Exception):
+    """
+    Falha definitiva: a tarefa não é reagendada mesmo que restem tentativas.
+    """
+
+
+def register(name):
+    def decorator(handler):
+        HANDLERS[name] = handler
+        return handler
+    return decorator
+
+
+def enqueue(name, payload=None, created_by=None, run_at=None, max_attempts=None):
+    if name not in HANDLERS:
+        raise ValueError(f"Tarefa desconhecida: {name}")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        created_by=created_by,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or getattr(settings, 'JOBS_MAX_ATTEMPTS', 3),
+    )
+
+
+def backoff_delay(attempts):
+    """
+    Espera antes da próxima tentativa: base * 2^(tentativas - 1), limitada a JOBS_MAX_BACKOFF
+    """
+    base = getattr(settings, 'JOBS_BACKOFF_BASE', 30)
+    limit = getattr(settings, 'JOBS_MAX_BACKOFF', 3600)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), limit))
+
+
+def requeue_stale(now=None):
+    """
+    Devolve à fila tarefas presas em RUNNING (worker encerrado no meio da execução).
+    As que já usaram todas as tentativas falham: uma tarefa que derruba o worker
+    (falta de memória, por exemplo) não volta à fila para sempre. Retorna quantas
+    voltaram à fila.
+    """
+    now = now or timezone.now()
+    timeout = timedelta(seconds=getattr(settings, 'JOBS_LOCK_TIMEOUT', 3600))
+    stale = Job.objects.filter(status='RUNNING', locked_at__lt=now - timeout)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='FAILED', locked_by='', locked_at=None, finished_at=now,
+        error='Worker interrompido durante a execução; tentativas esgotadas',
+    )
+    if failed:
+        logger.error("%s tarefas presas em RUNNING marcadas como FAILED (tentativas esgotadas)", failed)
+    return stale.filter(attempts__lt=F('max_attempts')).update(
+        status='QUEUED', locked_by='', locked_at=None, run_at=now
+    )
+
+
+def _reserve(job_id, worker_id, now):
+    return Job.objects.filter(pk=job_id, status='QUEUED').update(
+        status='RUNNING',
+        locked_by=worker_id,
+        locked_at=now,
+        started_at=now,
+        attempts=F('attempts') + 1,
+    )
+
+
+def claim_next(worker_id):
+    """
+    Reserva a próxima tarefa pronta para execução, ou None se a fila estiver vazia.
+    """
+    now = timezone.now()
+    ready = Job.objects.filter(status='QUEUED', run_at__lte=now).order_by('run_at', 'id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job_id = ready.select_for_update(skip_locked=True).values_list('id', flat=True).first()
+            if job_id is None or not _reserve(job_id, worker_id, now):
+                return None
+        return Job.objects.get(pk=job_id)
+
+    for job_id in ready.values_list('id', flat=True)[:CLAIM_BATCH_SIZE]:
+        if _reserve(job_id, worker_id, now):
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    """
+    Executa a tarefa reservada e grava o resultado, o reagendamento ou a falha.
+    """
+    handler = HANDLERS.get(job.name)
+    try:
+        if handler is None:
+            raise JobError(f"Nenhum handler registrado para {job.name}")
+        result = handler(job)
+    except Exception as exc:
+        now = timezone.now()
+        retry = not isinstance(exc, JobError) and job.attempts < job.max_attempts
+        logger.exception("Falha na tarefa %s #%s (tentativa %s)", job.name, job.pk, job.attempts)
+        updates = {'error': f"{type(exc).__name__}: {exc}", 'locked_by': '', 'locked_at': None}
+        if retry:
+            updates.update(status='QUEUED', run_at=now + backoff_delay(job.attempts))
+        else:
+            updates.update(status='FAILED', finished_at=now)
+        Job.objects.filter(pk=job.pk).update(**updates)
+    else:
+        Job.objects.filter(pk=job.pk).update(
+            status='SUCCEEDED', result=result, error='', locked_by='', locked_at=None, finished_at=timezone.now()
+        )
+    job.refresh_from_db()
+    return job
+
+
+def run_pending(worker_id, limit=None):
+    """
+    Executa tarefas prontas até esvaziar a fila (ou até limit). Retorna quantas rodaram.
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next(worker_id)
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
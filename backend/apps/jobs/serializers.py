@@ -0,0 +1,24 @@
+from rest_framework import serializers
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'name', 'status', 'status_display', 'attempts', 'max_attempts', 'run_at',
+            'result', 'error', 'download_url', 'created_at', 'started_at', 'finished_at',
+        ]
+
+    def get_download_url(self, obj):
+        """
+        Handlers que geram arquivo devolvem download_path no resultado
+        """
+        path = (obj.result or {}).get('download_path') if obj.status == 'SUCCEEDED' else None
+        if not path:
+            return None
+        request = self.context.get('request')
+        return request.build_absolute_uri(path) if request else path
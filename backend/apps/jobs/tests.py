@@ -0,0 +1,117 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .models import Job
+from .queue import HANDLERS, JobError, claim_next, enqueue, register, requeue_stale, run_job
+
+calls = []
+
+
+@register('tests.echo')
+def echo(job):
+    calls.append(job.pk)
+    return {'echo': job.payload.get('value')}
+
+
+@register('tests.flaky')
+def flaky(job):
+    if job.attempts < 2:
+        raise RuntimeError('temporário')
+    return {'attempts': job.attempts}
+
+
+@register('tests.broken')
+def broken(job):
+    raise JobError('dados inválidos')
+
+
+@override_settings(JOBS_BACKOFF_BASE=10, JOBS_MAX_BACKOFF=60)
+class JobQueueTestCase(TestCase):
+
+    def setUp(self):
+        calls.clear()
+        self.user = User.objects.create_user(username='user@empresa.com', password='12345')
+
+    def test_run_workers_executes_queued_jobs(self):
+        job = enqueue('tests.echo', {'value': 42}, created_by=self.user)
+        later = enqueue('tests.echo', run_at=timezone.now() + timedelta(hours=1))
+
+        call_command('run_workers', '--once', stdout=StringIO())
+
+        job.refresh_from_db()
+        later.refresh_from_db()
+        self.assertEqual(job.status, 'SUCCEEDED')
+        self.assertEqual(job.result, {'echo': 42})
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(later.status, 'QUEUED')
+        self.assertEqual(calls, [job.pk])
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        job = enqueue('tests.echo')
+
+        self.assertEqual(claim_next('worker-a').pk, job.pk)
+        self.assertIsNone(claim_next('worker-b'))
+        self.assertEqual(Job.objects.get(pk=job.pk).locked_by, 'worker-a')
+
+    def test_failure_is_retried_with_backoff(self):
+        job = enqueue('tests.flaky', max_attempts=3)
+
+        started = timezone.now()
+        job = run_job(claim_next('worker'))
+        self.assertEqual(job.status, 'QUEUED')
+        self.assertIn('temporário', job.error)
+        self.assertGreaterEqual(job.run_at, started + timedelta(seconds=10))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        job = run_job(claim_next('worker'))
+        self.assertEqual(job.status, 'SUCCEEDED')
+        self.assertEqual(job.result, {'attempts': 2})
+
+    def test_job_error_fails_without_retry(self):
+        enqueue('tests.broken')
+        job = run_job(claim_next('worker'))
+
+        self.assertEqual(job.status, 'FAILED')
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_stale_running_job_returns_to_queue(self):
+        job = enqueue('tests.echo')
+        claim_next('worker')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'QUEUED')
+
+    def test_stale_job_without_attempts_left_fails(self):
+        job = enqueue('tests.echo', max_attempts=1)
+        claim_next('worker')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 1))
+        self.assertIn('tentativas esgotadas', job.error)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_unknown_job_name_is_rejected(self):
+        self.assertNotIn('tests.missing', HANDLERS)
+        with self.assertRaises(ValueError):
+            enqueue('tests.missing')
+
+    def test_status_endpoint_is_restricted_to_owner(self):
+        job = enqueue('tests.echo', created_by=self.user)
+        other = User.objects.create_user(username='other@empresa.com', password='12345')
+        client = APIClient()
+
+        client.force_authenticate(other)
+        self.assertEqual(client.get(f'/api/jobs/{job.pk}/').status_code, 404)
+
+        client.force_authenticate(self.user)
+        response = client.get(f'/api/jobs/{job.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'QUEUED')
@@ -0,0 +1,7 @@
+# apps/jobs/urls.py
+from django.urls import path
+from .views import JobDetailView
+
+urlpatterns = [
+    path('<int:job_id>/', JobDetailView.as_view(), name='job_detail'),
+]
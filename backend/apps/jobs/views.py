@@ -0,0 +1,25 @@
+#apps/jobs/views.py
+from django.shortcuts import get_object_or_404
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .models import Job
+from .serializers import JobSerializer
+
+
+class JobDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(tags=['Tarefas'], responses={200: JobSerializer})
+    def get(self, request, job_id):
+        """
+        Status, tentativas e resultado de uma tarefa em segundo plano.
+        """
+        jobs = Job.objects.all()
+        if not request.user.is_superuser:
+            jobs = jobs.filter(created_by=request.user)
+        job = get_object_or_404(jobs, pk=job_id)
+        serializer = JobSerializer(job, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
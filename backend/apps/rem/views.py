@@ -8,11 +8,12 @@ from django.db import transaction
 from .models import Rem, DieselConsumido, FuncionariosDemitidos
 from .serializers import RemSerializer, DieselConsumidoSerializer, FuncionariosDemitidosSerializer
 from apps.core.models import Company
+from apps.core.tenancy import TenantScopedMixin
 from apps.users.utils.permissions import user_has_access_to_company
 from rest_framework.exceptions import ValidationError
 
 @extend_schema(tags=['REM'])
-class RemViewSet(viewsets.ModelViewSet):
+class RemViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciar os dados de REM.
     """
@@ -24,10 +25,7 @@ class RemViewSet(viewsets.ModelViewSet):
         """
         Filtra os dados de REM com base no usuário autenticado.
         """
-        user = self.request.user
-        if user.is_superuser:
-            return Rem.objects.all()
-        return Rem.objects.filter(company__user=user)
+        return self.scope_queryset(Rem.objects.all())
 
     def perform_create(self, serializer):
         """
@@ -260,7 +258,7 @@ class RemViewSet(viewsets.ModelViewSet):
         return Response(combined_data, status=HTTP_200_OK)
 
 @extend_schema(tags=['Diesel Consumido'])
-class DieselConsumidoViewSet(viewsets.ModelViewSet):
+class DieselConsumidoViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciar os dados de Diesel Consumido.
     """
@@ -269,10 +267,7 @@ class DieselConsumidoViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return DieselConsumido.objects.all()
-        return DieselConsumido.objects.filter(company__user=user)
+        return self.scope_queryset(DieselConsumido.objects.all())
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -292,7 +287,7 @@ class DieselConsumidoViewSet(viewsets.ModelViewSet):
         serializer.save(company=company)
 
 @extend_schema(tags=['Funcionarios Demitidos'])
-class FuncionariosDemitidosViewSet(viewsets.ModelViewSet):
+class FuncionariosDemitidosViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciar os dados de Funcionários Demitidos.
     """
@@ -301,10 +296,7 @@ class FuncionariosDemitidosViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return FuncionariosDemitidos.objects.all()
-        return FuncionariosDemitidos.objects.filter(company__user=user)
+        return self.scope_queryset(FuncionariosDemitidos.objects.all())
 
     def perform_create(self, serializer):
         user = self.request.user
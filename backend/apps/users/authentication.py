@@ -1,5 +1,18 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from django.conf import settings
+from django.contrib.auth.models import User
+from django_auth_adfs.rest_framework import AdfsAccessTokenAuthentication
+from rest_framework import exceptions
+from rest_framework.authentication import get_authorization_header
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from . import user_cache
+from .authorization import attach_snapshot
 
 
 class LenientJWTAuthentication(JWTAuthentication):
@@ -20,4 +33,96 @@ class LenientJWTAuthentication(JWTAuthentication):
             # Token is not one we issued; let other authenticators try.
             return None
 
-        return self.get_user(validated_token), validated_token
+        # Empresas do usuário gravadas no token valem enquanto a versão for a atual
+        return attach_snapshot(self.get_user(validated_token), validated_token), validated_token
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of ADFS access tokens that already passed validation, keyed by the
+    token hash and kept until the token's exp. It is per process, so it only records
+    that the token was verified (username and exp); the user itself is resolved and
+    checked on every hit.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(raw_token):
+        return hashlib.sha256(raw_token).hexdigest()
+
+    def get(self, raw_token):
+        key = self._key(raw_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, raw_token, user):
+        if self.max_size <= 0:
+            return
+        # Assinatura já verificada pelo backend; aqui só interessa o exp
+        exp = jwt.decode(raw_token, options={'verify_signature': False}).get('exp')
+        if not exp:
+            return
+        with self._lock:
+            self._entries[self._key(raw_token)] = (user.username, exp)
+            self._entries.move_to_end(self._key(raw_token))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, raw_token):
+        with self._lock:
+            self._entries.pop(self._key(raw_token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(settings.ADFS_TOKEN_CACHE_SIZE)
+
+
+class CachedAdfsAccessTokenAuthentication(AdfsAccessTokenAuthentication):
+    """
+    ADFS access token auth that skips signature verification and claim processing
+    for tokens it has already accepted; the user comes from user_cache.
+    """
+
+    @staticmethod
+    def get_active_user(username):
+        """
+        User for a token already verified, or None if it was deleted or deactivated.
+        Checked on every hit: user_cache is shared and refreshed when the user is saved.
+        """
+        user = user_cache.get_user(username)
+        if user is None:
+            user = User.objects.filter(username=username).first()
+            if user is not None:
+                user_cache.set_user(user)
+        return user if user is not None and user.is_active else None
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if len(auth) != 2 or auth[0].lower() != b'bearer':
+            return super().authenticate(request)
+
+        entry = verified_tokens.get(auth[1])
+        if entry is not None:
+            user = self.get_active_user(entry[0])
+            if user is None:
+                verified_tokens.discard(auth[1])
+                raise exceptions.AuthenticationFailed('User inactive or deleted.')
+            return user, auth[1]
+
+        user, token = super().authenticate(request)
+        verified_tokens.set(auth[1], user)
+        return user, token
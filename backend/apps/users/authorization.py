@@ -0,0 +1,87 @@
+#apps/users/authorization.py
+"""
+Retrato das autorizações do usuário embutido no token de acesso (claim 'authz').
+
+No login e no refresh o token recebe os IDs das empresas do usuário (ativas em
+companies, inativas em inactive_companies), junto com a versão atual das
+autorizações dele. A versão fica no cache do Django e é
+trocada quando mudam as empresas do usuário ou as flags de superusuário/staff/ativo
+(signals.py). Na autenticação (LenientJWTAuthentication) o retrato só é aceito se a
+versão ainda for a atual e se o cache for compartilhado entre os workers
+(CACHE_IS_SHARED): com um cache por processo a troca feita em um worker não chegaria
+aos outros. Caso contrário as verificações consultam o banco como antes.
+"""
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CLAIM = 'authz'
+
+
+def _key(user_id):
+    return f'users:authz:{user_id}'
+
+
+def _flags(user):
+    return [user.is_superuser, user.is_staff, user.is_active]
+
+
+def current_version(user):
+    """
+    Versão atual das autorizações; criada na primeira consulta (ou se saiu do cache)
+    """
+    cache.add(_key(user.pk), {'version': uuid.uuid4().hex, 'flags': _flags(user)}, timeout=None)
+    return cache.get(_key(user.pk), {}).get('version')
+
+
+def bump(user_ids):
+    """
+    Troca a versão dos usuários: os retratos já emitidos deixam de valer
+    """
+    keys = [_key(user_id) for user_id in user_ids if user_id is not None]
+    if keys:
+        cache.delete_many(keys)
+        # De novo após o commit: um retrato montado antes dele ainda veria os dados antigos
+        transaction.on_commit(lambda: cache.delete_many(keys), robust=True)
+
+
+def flags_changed(user):
+    """
+    Invalida o retrato quando superusuário/staff/ativo mudaram em relação ao registrado
+    """
+    entry = cache.get(_key(user.pk))
+    if entry is not None and entry['flags'] != _flags(user):
+        bump([user.pk])
+
+
+def build_snapshot(user):
+    # A versão é lida antes das relações: uma alteração concorrente invalida este retrato
+    version = current_version(user)
+    companies = [] if user.is_superuser else list(user.companies.order_by('pk').values_list('pk', 'is_active'))
+    return {
+        'ver': version,
+        'companies': [pk for pk, is_active in companies if is_active],
+        'inactive_companies': [pk for pk, is_active in companies if not is_active],
+    }
+
+
+def add_snapshot(token, user):
+    token[CLAIM] = build_snapshot(user)
+    return token
+
+
+def attach_snapshot(user, token):
+    """
+    Associa ao usuário autenticado o retrato do token, se a versão ainda for a atual
+    """
+    if not settings.CACHE_IS_SHARED:
+        return user
+    snapshot = token.get(CLAIM) if token is not None else None
+    if snapshot and snapshot.get('ver') == cache.get(_key(user.pk), {}).get('version'):
+        user._authorization = snapshot
+    return user
+
+
+def get_snapshot(user):
+    return getattr(user, '_authorization', None)
@@ -1,11 +1,82 @@
+import time
+from datetime import datetime, timedelta
+import jwt
+import django_auth_adfs
 from django_auth_adfs.backend import AdfsAccessTokenBackend
+from django_auth_adfs.config import provider_config
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from apps.users import user_cache
 from apps.users.utils.domain_utils import clean_username, associate_user_with_company_by_domain
 from django_auth_adfs.config import Settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Relógio monotônico tem origem arbitrária; -inf garante que a primeira recarga aconteça
+_keys_refreshed_at = {'value': float('-inf')}
+# Versões do django_auth_adfs em que load_config decide a recarga por _config_timestamp
+CONFIG_TIMESTAMP_VERSIONS = ('1.',)
+
+
+def signed_by_unknown_key(access_token):
+    """
+    True se a assinatura do token não confere com nenhuma das chaves carregadas do ADFS
+    """
+    for key in provider_config.signing_keys or []:
+        try:
+            jwt.decode(
+                access_token, key=key, algorithms=['RS256', 'RS384', 'RS512'],
+                options={'verify_signature': True, 'verify_exp': False, 'verify_nbf': False,
+                         'verify_iat': False, 'verify_aud': False, 'verify_iss': False},
+            )
+            return False
+        except jwt.InvalidTokenError:
+            continue
+    return True
+
+
+def refresh_signing_keys():
+    """
+    Recarrega a configuração e as chaves (JWKS) do ADFS, no máximo uma vez por
+    ADFS_KEYS_REFRESH_INTERVAL; fora disso as chaves em memória continuam valendo até
+    o CONFIG_RELOAD_INTERVAL do django_auth_adfs. Retorna True se recarregou.
+    """
+    now = time.monotonic()
+    if now - _keys_refreshed_at['value'] < settings.ADFS_KEYS_REFRESH_INTERVAL:
+        return False
+    _keys_refreshed_at['value'] = now
+    if not expire_provider_config():
+        return False
+    provider_config.load_config()
+    return True
+
+
+def config_expiry_supported():
+    """
+    True se a versão instalada do django_auth_adfs recarrega a configuração por _config_timestamp
+    """
+    version = getattr(django_auth_adfs, '__version__', '')
+    return version.startswith(CONFIG_TIMESTAMP_VERSIONS) and hasattr(provider_config, '_config_timestamp')
+
+
+def expire_provider_config():
+    """
+    Marca a configuração do ADFS como vencida para o próximo load_config. O django_auth_adfs
+    não tem API pública para isso: nas versões de CONFIG_TIMESTAMP_VERSIONS a recarga
+    depende do atributo privado _config_timestamp. Em outra versão registra o erro (o check
+    users.E001 já acusa na inicialização) e as chaves seguem o CONFIG_RELOAD_INTERVAL.
+    Retorna True se a configuração foi vencida.
+    """
+    if not config_expiry_supported():
+        version = getattr(django_auth_adfs, '__version__', '?')
+        logger.error(f"django_auth_adfs {version} não suportado: as chaves do ADFS não serão recarregadas")
+        return False
+    # Data antiga (e não None) mantém a configuração anterior se o ADFS não responder
+    provider_config._config_timestamp = datetime.now() - timedelta(days=365)
+    return True
+
 class CustomAdfsBackend(AdfsAccessTokenBackend):
     """
     Backend customizado que limpa o username e associa empresa na criação
@@ -14,7 +85,6 @@ class CustomAdfsBackend(AdfsAccessTokenBackend):
     def __init__(self):
         super().__init__()
         self.settings = Settings()
-        self._user_cache = {}  # Cache simples para evitar consultas desnecessárias
     
     def create_user(self, claims):
         """
@@ -28,10 +98,9 @@ class CustomAdfsBackend(AdfsAccessTokenBackend):
             logger.error(f"Username inválido após limpeza: {username}")
             return None
         
-        # Verifica cache primeiro
-        cache_key = f"user_{cleaned_username}"
-        if cache_key in self._user_cache:
-            user = self._user_cache[cache_key]
+        # Verifica cache primeiro (compartilhado entre os workers, ver user_cache.py)
+        user = user_cache.get_user(cleaned_username)
+        if user is not None:
             logger.info(f"Usuário {cleaned_username} encontrado no cache")
             return user
         
@@ -52,7 +121,7 @@ class CustomAdfsBackend(AdfsAccessTokenBackend):
                         existing_user = processed_user
             
             # Adiciona ao cache
-            self._user_cache[cache_key] = existing_user
+            user_cache.set_user(existing_user)
             return existing_user
             
         except User.DoesNotExist:
@@ -71,11 +140,24 @@ class CustomAdfsBackend(AdfsAccessTokenBackend):
             final_user = processed_user if processed_user else user
             
             # Adiciona ao cache
-            self._user_cache[cache_key] = final_user
+            user_cache.set_user(final_user)
             return final_user
         
         return None
     
+    def validate_access_token(self, access_token):
+        """
+        Valida com as chaves em memória; se o token foi assinado por uma chave que ainda
+        não conhecemos (rotação no ADFS), recarrega as chaves e tenta mais uma vez
+        """
+        try:
+            return super().validate_access_token(access_token)
+        except PermissionDenied:
+            if not signed_by_unknown_key(access_token) or not refresh_signing_keys():
+                raise
+            logger.info("Chaves de assinatura do ADFS recarregadas")
+            return super().validate_access_token(access_token)
+
     def authenticate(self, request, access_token=None, **kwargs):
         """
         Método principal de autenticação simplificado
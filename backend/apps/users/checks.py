@@ -0,0 +1,17 @@
+from django.core import checks
+
+
+@checks.register()
+def check_adfs_key_refresh(app_configs, **kwargs):
+    """
+    A recarga forçada das chaves do ADFS depende de um atributo privado do django_auth_adfs 1.x
+    """
+    from apps.users.backends import CONFIG_TIMESTAMP_VERSIONS, config_expiry_supported
+    if config_expiry_supported():
+        return []
+    return [checks.Error(
+        'Versão do django_auth_adfs sem suporte à recarga das chaves do ADFS.',
+        hint=f"Use uma versão {' ou '.join(f'{v}x' for v in CONFIG_TIMESTAMP_VERSIONS)} "
+             "(ver requirements.txt) ou atualize apps.users.backends.expire_provider_config.",
+        id='users.E001',
+    )]
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.users import user_cache
+
+
+class Command(BaseCommand):
+    help = 'Mostra os acertos e falhas do cache de usuários do ADFS (requer USER_CACHE_STATS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zera os contadores após exibir')
+
+    def handle(self, *args, **kwargs):
+        if not settings.USER_CACHE_STATS:
+            self.stdout.write(self.style.WARNING('USER_CACHE_STATS desligado: os contadores não são atualizados.'))
+
+        stats = user_cache.stats()
+        hit_rate = f"{stats['hit_rate']}%" if stats['hit_rate'] is not None else '-'
+        self.stdout.write(f"Acertos: {stats['hits']}  Falhas: {stats['misses']}  Taxa de acerto: {hit_rate}")
+
+        if kwargs['reset']:
+            user_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Contadores zerados.'))
@@ -1,7 +1,9 @@
 #apps/users/serializers.py
 from rest_framework import serializers
 from django.contrib.auth.models import User, Group
-from apps.core.serializers import PoloSerializer
+from django.db.models import Exists, OuterRef, Prefetch
+from apps.core.models import Company, Evaluation
+from apps.core.serializers import DynamicFieldsMixin, PoloSerializer
 
 
 class UserProfileSerializer(serializers.Serializer):
@@ -18,7 +20,7 @@ class CustomLoginSerializer(serializers.Serializer):
     user = serializers.DictField()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     companies = serializers.SerializerMethodField()
     groups = serializers.SerializerMethodField()
     full_name = serializers.SerializerMethodField()
@@ -27,13 +29,24 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'full_name', 'is_active', 'is_superuser', 'companies', 'groups', 'date_joined', 'is_staff', 'polos']
+        expandable_fields = ['companies', 'polos']
+        field_querysets = {
+            'companies': lambda queryset: queryset.prefetch_related(Prefetch(
+                'companies',
+                queryset=Company.objects.prefetch_related('users').annotate(
+                    has_evaluations=Exists(Evaluation.objects.filter(company=OuterRef('pk'), is_active=True))
+                ),
+            )),
+            'groups': lambda queryset: queryset.prefetch_related('groups'),
+            'polos': lambda queryset: queryset.prefetch_related('poles__companies', 'poles__users'),
+        }
 
     def get_companies(self, obj):
         from apps.core.serializers import CompanySerializer
         return CompanySerializer(obj.companies.all(), many=True).data
 
     def get_groups(self, obj):
-        return list(obj.groups.values_list('name', flat=True))
+        return [group.name for group in obj.groups.all()]
 
     def get_full_name(self, obj):
         return f"{obj.first_name} {obj.last_name}".strip()
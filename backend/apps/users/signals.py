@@ -0,0 +1,77 @@
+#apps/users/signals.py
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from apps.core.models import Company, Polo
+from . import authorization, user_cache
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    authorization.flags_changed(instance)
+    if update_fields is None:
+        user_cache.refresh_user(instance)
+    else:
+        user_cache.invalidate(instance.username)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    user_cache.invalidate(instance.username)
+
+
+def _user_relation_changed(instance, action, pk_set, users_of):
+    """
+    Invalida os usuários afetados, seja a alteração feita pelo lado do usuário
+    (user.companies.add) ou pelo outro lado (company.users.add, group.user_set.clear)
+    """
+    if isinstance(instance, User):
+        if action.startswith('post_'):
+            # Empresas memorizadas na instância durante a requisição (utils/permissions.py)
+            instance.__dict__.pop('_company_ids', None)
+            user_cache.invalidate(instance.username)
+            authorization.bump([instance.pk])
+        return
+
+    user_ids = None
+    if action == 'pre_clear':
+        instance._cleared_user_ids = list(users_of(instance).values_list('pk', flat=True))
+    elif action == 'post_clear':
+        user_ids = getattr(instance, '_cleared_user_ids', [])
+    elif action in ('post_add', 'post_remove'):
+        user_ids = list(pk_set)
+    if user_ids:
+        user_cache.invalidate_user_ids(user_ids)
+        authorization.bump(user_ids)
+
+
+@receiver(m2m_changed, sender=Company.users.through)
+def company_users_changed(sender, instance, action, pk_set, **kwargs):
+    _user_relation_changed(instance, action, pk_set, lambda company: company.users)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, pk_set, **kwargs):
+    _user_relation_changed(instance, action, pk_set, lambda group: group.user_set)
+
+
+@receiver(m2m_changed, sender=Polo.users.through)
+def polo_users_changed(sender, instance, action, pk_set, **kwargs):
+    _user_relation_changed(instance, action, pk_set, lambda polo: polo.users)
+
+
+@receiver(post_save, sender=Company)
+def company_saved(sender, instance, created, **kwargs):
+    # Empresa ativada/desativada muda a lista de empresas ativas dos usuários
+    if not created:
+        authorization.bump(list(instance.users.values_list('pk', flat=True)))
+
+
+@receiver(pre_delete, sender=Company)
+@receiver(pre_delete, sender=Group)
+@receiver(pre_delete, sender=Polo)
+def relation_deleted(sender, instance, **kwargs):
+    users = instance.user_set if isinstance(instance, Group) else instance.users
+    user_ids = list(users.values_list('pk', flat=True))
+    user_cache.invalidate_user_ids(user_ids)
+    authorization.bump(user_ids)
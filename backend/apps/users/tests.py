@@ -1,3 +1,375 @@
-from django.test import TestCase
+import time
+from datetime import datetime, timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
 
-# Create your tests here.
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from apps.core.domains import company_id_for_domain
+from apps.core.models import Company, Polo
+from apps.core.tenancy import visible_company_ids
+from django_auth_adfs.config import provider_config
+from . import backends, user_cache
+from .authentication import LenientJWTAuthentication, verified_tokens
+from .authorization import get_snapshot
+from .utils.permissions import user_has_access_to_company
+from .backends import CustomAdfsBackend
+from .checks import check_adfs_key_refresh
+from .utils.domain_utils import EMPRESA_GROUP_ID, associate_user_with_company_by_domain
+
+
+class UserListCursorPaginationTestCase(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin@bravaenergia.com', password='12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+        self.polo = Polo.objects.create(name='Polo Norte')
+        companies = [Company.objects.create(name=f'Company {index}', cnpj='00000000000191') for index in range(2)]
+        self.polo.companies.add(*companies)
+        for index in range(5):
+            user = User.objects.create_user(username=f'user{index}@empresa.com', password='12345')
+            # Usuário em duas empresas do mesmo polo gera linhas duplicadas antes do distinct()
+            user.companies.add(*companies)
+
+    def test_cursor_walks_distinct_users(self):
+        ids = []
+        response = self.client.get('/api/users/list/', {'cursor': '', 'page_size': 2}, HTTP_X_POLO_ID=str(self.polo.id))
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'], HTTP_X_POLO_ID=str(self.polo.id))
+
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertEqual(len(ids), 5)
+
+
+class UserSparseFieldsetTestCase(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin@bravaenergia.com', password='12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+        polo = Polo.objects.create(name='Polo Norte')
+        company = Company.objects.create(name='Company', cnpj='00000000000191')
+        polo.companies.add(company)
+        for index in range(4):
+            user = User.objects.create_user(username=f'user{index}@empresa.com', password='12345')
+            user.companies.add(company)
+            polo.users.add(user)
+
+    def test_dropdown_fields(self):
+        response = self.client.get('/api/users/list/', {'fields': 'id,username'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'username'})
+
+    def test_nested_relations_do_not_query_per_user(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/api/users/list/', {'page_size': 2})
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/api/users/list/', {'page_size': 5})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][1]['companies'][0]['name'], 'Company')
+        self.assertEqual(len(few), len(many))
+
+
+class AdfsUserCacheTestCase(TestCase):
+
+    def setUp(self):
+        caches['users'].clear()
+        self.group = Group.objects.create(name='empresa')
+        self.company = Company.objects.create(name='Company', cnpj='00000000000191', dominio='empresa.com')
+        self.user = User.objects.create_user(username='ana@empresa.com', password='12345')
+        self.user.companies.add(self.company)
+        self.user.groups.add(self.group)
+        self.backend = CustomAdfsBackend()
+        self.claims = {self.backend.settings.USERNAME_CLAIM: 'live.com#ana@empresa.com'}
+
+    @override_settings(USER_CACHE_STATS=True)
+    def test_repeated_resolution_is_served_from_cache(self):
+        user_cache.reset_stats()
+        self.assertEqual(self.backend.create_user(dict(self.claims)), self.user)
+        with CaptureQueriesContext(connection) as queries:
+            # Outra instância do backend (outro worker) usa o mesmo cache
+            user = CustomAdfsBackend().create_user(dict(self.claims))
+        self.assertEqual(user, self.user)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(user_cache.stats(), {'hits': 1, 'misses': 1, 'hit_rate': 50.0})
+
+    def test_stats_are_off_by_default(self):
+        user_cache.reset_stats()
+        self.backend.create_user(dict(self.claims))
+        self.backend.create_user(dict(self.claims))
+        self.assertEqual(user_cache.stats()['hits'], 0)
+
+        output = StringIO()
+        call_command('user_cache_stats', stdout=output)
+        self.assertIn('USER_CACHE_STATS desligado', output.getvalue())
+
+    def test_relation_changes_invalidate_entry(self):
+        self.backend.create_user(dict(self.claims))
+
+        self.company.users.remove(self.user)
+        self.assertIsNone(user_cache.get_user('ana@empresa.com'))
+
+        self.backend.create_user(dict(self.claims))
+        self.group.user_set.clear()
+        self.assertIsNone(user_cache.get_user('ana@empresa.com'))
+
+    def test_user_save_refreshes_entry(self):
+        self.backend.create_user(dict(self.claims))
+        self.user.first_name = 'Ana'
+        self.user.save()
+        self.assertEqual(user_cache.get_user('ana@empresa.com').first_name, 'Ana')
+
+        self.user.save(update_fields=['last_login'])
+        self.assertIsNone(user_cache.get_user('ana@empresa.com'))
+
+
+class DomainAssociationTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(pk=EMPRESA_GROUP_ID, name='empresa')
+        self.company = Company.objects.create(name='Company', cnpj='00000000000191', dominio='empresa.com')
+        Company.objects.create(name='Inativa', cnpj='00000000000272', dominio='inativa.com', is_active=False)
+
+    def test_association_uses_domain_map(self):
+        company_id_for_domain('outra.com')
+        user = User.objects.create_user(username='ana@Empresa.com', password='12345')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(associate_user_with_company_by_domain(user), user)
+        self.assertFalse(any('"core_company"' in query['sql'] for query in queries))
+        self.assertEqual(list(user.companies.all()), [self.company])
+        self.assertEqual(list(user.groups.all()), [self.group])
+
+        self.assertIsNone(associate_user_with_company_by_domain(
+            User.objects.create_user(username='joao@inativa.com', password='12345')
+        ))
+        self.assertEqual(Company.find_by_domain('empresa.com'), self.company)
+
+    def test_company_changes_reload_map(self):
+        self.assertIsNone(company_id_for_domain('nova.com'))
+        with self.captureOnCommitCallbacks(execute=True):
+            company = Company.objects.create(name='Nova', cnpj='00000000000353', dominio='nova.com')
+        self.assertEqual(company_id_for_domain('nova.com'), company.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            company.is_active = False
+            company.save()
+        self.assertIsNone(company_id_for_domain('nova.com'))
+
+    def test_missing_group_is_rejected_before_linking(self):
+        self.group.delete()
+        user = User.objects.create_user(username='live.com#ana@empresa.com', password='12345')
+
+        self.assertIsNone(associate_user_with_company_by_domain(user))
+        self.assertFalse(user.companies.exists())
+        self.assertFalse(user.groups.exists())
+        self.assertEqual(User.objects.get(pk=user.pk).username, 'ana@empresa.com')
+
+    def test_superuser_domain(self):
+        user = User.objects.create_user(username='adm@bravaenergia.com', password='12345')
+        user.companies.add(self.company)
+        self.assertTrue(associate_user_with_company_by_domain(user).is_superuser)
+        self.assertFalse(user.companies.exists())
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class AuthorizationSnapshotTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(name='Company', cnpj='00000000000191')
+        self.other = Company.objects.create(name='Other', cnpj='00000000000272')
+        self.polo = Polo.objects.create(name='Polo Norte')
+        self.user = User.objects.create_user(username='ana@empresa.com', password='12345')
+        self.user.companies.add(self.company)
+        self.polo.users.add(self.user)
+
+    def _authenticate(self, access):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        user, _ = LenientJWTAuthentication().authenticate(Request(request))
+        return user
+
+    def _refreshed_access(self):
+        response = self.client.post('/api/users/token/refresh/', {'refresh': str(RefreshToken.for_user(self.user))})
+        self.assertEqual(response.status_code, 200)
+        return response.data['access']
+
+    def test_refresh_embeds_snapshot_trusted_without_queries(self):
+        access = self._refreshed_access()
+        self.assertEqual(set(AccessToken(access)['authz']), {'ver', 'companies', 'inactive_companies'})
+        self.assertEqual(AccessToken(access)['authz']['companies'], [self.company.id])
+
+        user = self._authenticate(access)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIs(user_has_access_to_company(user, self.company), True)
+            self.assertEqual(user_has_access_to_company(user, self.other).status_code, 403)
+            self.assertIs(user_has_access_to_company(user), True)
+        self.assertEqual(len(queries), 0)
+
+    def test_tenant_scope_reads_the_snapshot(self):
+        self.other.is_active = False
+        self.other.save()
+        self.other.users.add(self.user)
+        user = self._authenticate(self._refreshed_access())
+
+        request = SimpleNamespace(user=user, headers={})
+        with CaptureQueriesContext(connection) as queries:
+            # Listagens incluem as empresas inativas do usuário; o acesso, só as ativas
+            self.assertEqual(visible_company_ids(request), {self.company.id, self.other.id})
+            self.assertEqual(user_has_access_to_company(user, self.other).status_code, 403)
+        self.assertEqual(len(queries), 0)
+
+    def test_relation_change_makes_snapshot_stale(self):
+        access = self._refreshed_access()
+        self.other.users.add(self.user)
+
+        user = self._authenticate(access)
+        self.assertIsNone(get_snapshot(user))
+        # Sem retrato válido a verificação volta ao banco e enxerga a nova empresa
+        self.assertIs(user_has_access_to_company(user, self.other), True)
+
+        user = self._authenticate(self._refreshed_access())
+        self.assertEqual(sorted(get_snapshot(user)['companies']), sorted([self.company.id, self.other.id]))
+
+    def test_snapshot_is_ignored_without_shared_cache(self):
+        access = self._refreshed_access()
+        with override_settings(CACHE_IS_SHARED=False):
+            user = self._authenticate(access)
+        # Versão por processo: outro worker pode já ter revogado o acesso
+        self.assertIsNone(get_snapshot(user))
+
+    def test_flag_and_company_status_changes_make_snapshot_stale(self):
+        access = self._refreshed_access()
+        self.user.save()
+        self.assertIsNotNone(get_snapshot(self._authenticate(access)))
+
+        self.user.is_staff = True
+        self.user.save()
+        self.assertIsNone(get_snapshot(self._authenticate(access)))
+
+        access = self._refreshed_access()
+        self.company.is_active = False
+        self.company.save()
+        self.assertIsNone(get_snapshot(self._authenticate(access)))
+
+
+class AuthenticationChainTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['users'].clear()
+        verified_tokens.clear()
+        backends._keys_refreshed_at['value'] = float('-inf')
+        self.key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        patcher = patch.multiple(
+            provider_config, signing_keys=[self.key.public_key()], issuer='https://adfs.test/adfs',
+            _config_timestamp=datetime.now(),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        group = Group.objects.create(name='empresa')
+        company = Company.objects.create(name='Company', cnpj='00000000000191', dominio='empresa.com')
+        self.user = User.objects.create_user(username='ana@empresa.com', password='12345')
+        self.user.companies.add(company)
+        self.user.groups.add(group)
+
+    def _adfs_token(self, key=None):
+        claims = {
+            'aud': settings.AUTH_ADFS['AUDIENCE'], 'iss': provider_config.issuer,
+            'exp': int(time.time()) + 600, 'upn': 'ana@empresa.com', 'groups': ['empresa'],
+        }
+        return jwt.encode(claims, key or self.key, algorithm='RS256')
+
+    def _get(self, token):
+        return self.client.get('/api/companies/my-companies/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_verified_adfs_token_is_reused_until_exp(self):
+        token = self._adfs_token()
+        with patch.object(CustomAdfsBackend, 'validate_access_token', autospec=True,
+                          side_effect=CustomAdfsBackend.validate_access_token) as validate:
+            self.assertEqual(self._get(token).status_code, 200)
+            with CaptureQueriesContext(connection) as queries:
+                response = self._get(token)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(validate.call_count, 1)
+        # Usuário vem do cache: só as consultas da view (empresas e prefetch dos usuários)
+        self.assertEqual(len(queries), 2)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self._get(token).status_code, 401)
+
+    def test_local_jwt_is_tried_first(self):
+        access = RefreshToken.for_user(self.user).access_token
+        with patch.object(CustomAdfsBackend, 'validate_access_token') as validate:
+            self.assertEqual(self._get(access).status_code, 200)
+        validate.assert_not_called()
+
+    def test_unknown_signing_key_refreshes_keys_once(self):
+        rotated = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        reloads = []
+
+        def load_config():
+            if provider_config._config_timestamp < datetime.now() - timedelta(days=1):
+                reloads.append(1)
+                provider_config.signing_keys = [self.key.public_key(), rotated.public_key()]
+                provider_config._config_timestamp = datetime.now()
+
+        with patch.object(provider_config, 'load_config', side_effect=load_config):
+            self.assertEqual(self._get(self._adfs_token(rotated)).status_code, 200)
+            forged = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+            self.assertEqual(self._get(self._adfs_token(forged)).status_code, 401)
+        self.assertEqual(len(reloads), 1)
+
+    def test_first_refresh_does_not_depend_on_monotonic_origin(self):
+        with patch.object(backends.time, 'monotonic', return_value=0.0), \
+                patch.object(provider_config, 'load_config') as load_config:
+            self.assertTrue(backends.refresh_signing_keys())
+        load_config.assert_called_once()
+
+    def test_config_is_expired_only_on_known_versions(self):
+        loaded_at = provider_config._config_timestamp
+        with patch.object(backends.django_auth_adfs, '__version__', '2.0.0'), \
+                patch.object(provider_config, 'load_config') as load_config:
+            with self.assertLogs('apps.users.backends', 'ERROR'):
+                self.assertFalse(backends.expire_provider_config())
+            self.assertFalse(backends.refresh_signing_keys())
+            self.assertEqual([error.id for error in check_adfs_key_refresh(None)], ['users.E001'])
+        load_config.assert_not_called()
+        self.assertEqual(provider_config._config_timestamp, loaded_at)
+
+        self.assertEqual(check_adfs_key_refresh(None), [])
+        self.assertTrue(backends.expire_provider_config())
+        self.assertLess(provider_config._config_timestamp, datetime.now() - timedelta(days=1))
+
+    def test_cached_token_checks_user_state_on_each_hit(self):
+        token = self._adfs_token()
+        self.assertEqual(self._get(token).status_code, 200)
+        # Desativado sem save() (sem sinais): a próxima leitura do usuário vem do banco
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        user_cache.invalidate(self.user.username)
+        with patch.object(CustomAdfsBackend, 'validate_access_token') as validate:
+            self.assertEqual(self._get(token).status_code, 401)
+        validate.assert_not_called()
+        self.assertIsNone(verified_tokens.get(token.encode()))
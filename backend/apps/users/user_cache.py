@@ -0,0 +1,89 @@
+#apps/users/user_cache.py
+"""
+Cache dos usuários resolvidos a partir dos claims do ADFS, no alias 'users' de CACHES.
+
+O cache do Django é compartilhado entre os workers (Redis, Memcached ou banco), expira
+as entradas após USER_CACHE_TTL e limita o tamanho (LRU) pelo backend. As entradas são
+atualizadas quando o usuário é salvo e removidas quando mudam as empresas ou os grupos
+do usuário (ver signals.py). Em produção o backend precisa ser compartilhado (settings
+recusa LocMem): um cache por processo deixaria os outros workers com o usuário antigo.
+Com USER_CACHE_STATS os contadores de acertos e falhas também ficam no cache.
+"""
+import copy
+import hashlib
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+
+CACHE_ALIAS = 'users'
+STATS_KEYS = {'hits': 'stats:hits', 'misses': 'stats:misses'}
+# Atributos que só valem para a requisição em que o usuário foi autenticado
+REQUEST_ATTRIBUTES = ('_authorization', '_company_ids')
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _key(username):
+    # Usernames podem ter espaços e outros caracteres não aceitos pelo Memcached
+    return f'user:{hashlib.sha1(username.encode()).hexdigest()}'
+
+
+def _count(name):
+    cache = _cache()
+    key = STATS_KEYS[name]
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Removido entre o add e o incr (LRU); a contagem recomeça
+        cache.add(key, 1, timeout=None)
+
+
+def get_user(username):
+    user = _cache().get(_key(username))
+    if settings.USER_CACHE_STATS:
+        _count('hits' if user is not None else 'misses')
+    return user
+
+
+def set_user(user):
+    if any(attr in user.__dict__ for attr in REQUEST_ATTRIBUTES):
+        user = copy.copy(user)
+        for attr in REQUEST_ATTRIBUTES:
+            user.__dict__.pop(attr, None)
+    _cache().set(_key(user.username), user)
+
+
+def refresh_user(user):
+    """
+    Substitui a entrada do usuário salvo, se existir; instâncias parciais apenas invalidam
+    """
+    if _cache().get(_key(user.username)) is None:
+        return
+    if user.get_deferred_fields():
+        invalidate(user.username)
+    else:
+        set_user(user)
+
+
+def invalidate(*usernames):
+    if usernames:
+        _cache().delete_many([_key(username) for username in usernames])
+
+
+def invalidate_user_ids(user_ids):
+    if user_ids:
+        invalidate(*User.objects.filter(pk__in=user_ids).values_list('username', flat=True))
+
+
+def stats():
+    counters = _cache().get_many(STATS_KEYS.values())
+    hits, misses = (counters.get(key, 0) for key in STATS_KEYS.values())
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total * 100, 2) if total else None}
+
+
+def reset_stats():
+    _cache().delete_many(list(STATS_KEYS.values()))
@@ -1,9 +1,13 @@
-from apps.core.models import Company
-from django.contrib.auth.models import User, Group
+from apps.core.domains import company_id_for_domain
+from django.contrib.auth.models import Group
+from django.db import transaction
 import logging
 
 logger = logging.getLogger(__name__)
 
+SUPERUSER_DOMAIN = 'bravaenergia.com'
+EMPRESA_GROUP_ID = 1
+
 def clean_username(username):
     """
     Limpa o username removendo tudo antes do # se existir
@@ -20,6 +24,9 @@ def associate_user_with_company_by_domain(user):
     """
     Associa um usuário a uma empresa baseado no domínio do seu username
     EXCETO se for domínio "bravaenergia.com" (que são superusers)
+
+    A empresa vem do mapa de domínios em memória (apps.core.domains) e grupo,
+    empresa e flags são gravados juntos em uma única transação.
     """
     if not user.username:
         logger.error(f"Usuário sem username: ID {user.id}")
@@ -30,51 +37,55 @@ def associate_user_with_company_by_domain(user):
         logger.error(f"Username inválido: {user.username}")
         return None
     
+    update_fields = []
     if cleaned_username != user.username:
         user.username = cleaned_username
-        user.save(update_fields=['username'])
+        update_fields.append('username')
     
     try:
         domain = cleaned_username.split('@')[1]
         
         # Usuários administrativos especiais - SUPERUSERS
-        if domain == "bravaenergia.com":
+        if domain == SUPERUSER_DOMAIN:
             user.is_superuser = True
-            user.companies.clear()
-            user.groups.clear()
-            user.save(update_fields=['is_superuser'])
+            with transaction.atomic():
+                user.companies.clear()
+                user.groups.clear()
+                user.save(update_fields=[*update_fields, 'is_superuser'])
             logger.info(f"Usuário {cleaned_username} configurado como superuser")
             return user
 
         # Busca empresa correspondente
-        company = Company.objects.filter(dominio=domain, is_active=True).first()
+        company_id = company_id_for_domain(domain)
+        if company_id is None:
+            if update_fields:
+                user.save(update_fields=update_fields)
+            logger.warning(f"Empresa não encontrada para domínio: {domain}")
+            return None
+
+        # Verificado antes: a FK do vínculo só falharia no commit, que pode ser de uma
+        # transação externa, fora deste tratamento
+        if not Group.objects.filter(id=EMPRESA_GROUP_ID).exists():
+            # O username limpo é gravado mesmo assim: é a chave usada no login e no user_cache
+            if update_fields:
+                user.save(update_fields=update_fields)
+            logger.error(f"Grupo 'empresa' (ID {EMPRESA_GROUP_ID}) não encontrado")
+            return None
+
+        user.is_superuser = False
+        user.is_staff = False
+        with transaction.atomic():
+            # add() só insere o vínculo que ainda não existe
+            user.groups.add(EMPRESA_GROUP_ID)
 
-        if company:
-            user.is_superuser = False
-            user.is_staff = False
-            
-            # Associa ao grupo empresa se necessário
-            try:
-                if not user.groups.filter(id=1).exists():
-                    empresa_group = Group.objects.get(id=1)
-                    user.groups.add(empresa_group)
-                    logger.info(f"Usuário {cleaned_username} adicionado ao grupo empresa")
-                    
-            except Group.DoesNotExist:
-                logger.error("Grupo 'empresa' (ID 1) não encontrado")
-                return None
-            
             # Associa à empresa se necessário
-            if not user.companies.filter(id=company.id).exists():
+            if not user.companies.through.objects.filter(user_id=user.pk, company_id=company_id).exists():
                 user.companies.clear()
-                user.companies.add(company)
-                logger.info(f"Usuário {cleaned_username} associado à empresa {company.name}")
-            
-            user.save(update_fields=['is_superuser', 'is_staff'])
-            return user
-        else:
-            logger.warning(f"Empresa não encontrada para domínio: {domain}")
-            return None
+                user.companies.add(company_id)
+                logger.info(f"Usuário {cleaned_username} associado à empresa {company_id} ({domain})")
+
+            user.save(update_fields=[*update_fields, 'is_superuser', 'is_staff'])
+        return user
                 
     except Exception as e:
         logger.error(f"Erro ao processar usuário {cleaned_username}: {str(e)}")
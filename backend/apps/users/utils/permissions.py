@@ -2,6 +2,36 @@
 
 from rest_framework.response import Response
 from rest_framework import status 
+from apps.users.authorization import get_snapshot
+
+
+def get_user_company_ids(user):
+    """
+    Retorna {id: is_active} das empresas associadas ao usuário, do retrato do token
+    quando ainda válido. Consultado uma vez por instância: o usuário autenticado vale
+    por uma requisição.
+    """
+    company_ids = getattr(user, '_company_ids', None)
+    if company_ids is None:
+        snapshot = get_snapshot(user)
+        # Tokens emitidos antes de inactive_companies existir não trazem as empresas inativas
+        if snapshot is not None and 'inactive_companies' in snapshot:
+            company_ids = {
+                **dict.fromkeys(snapshot['inactive_companies'], False),
+                **dict.fromkeys(snapshot['companies'], True),
+            }
+        else:
+            company_ids = dict(user.companies.values_list('pk', 'is_active'))
+        user._company_ids = company_ids
+    return company_ids
+
+
+def _active_company_ids(user):
+    # Retrato das autorizações do token ainda válido: sem consulta ao banco
+    snapshot = get_snapshot(user)
+    if snapshot is not None:
+        return set(snapshot['companies'])
+    return {pk for pk, is_active in get_user_company_ids(user).items() if is_active}
 
 
 def user_has_access_to_company(user, company=None):
@@ -12,12 +42,14 @@ def user_has_access_to_company(user, company=None):
     if user.is_superuser:
         return True
     
+    company_ids = _active_company_ids(user)
+
     if company is None:
         # Verifica se o usuário está associado a pelo menos uma empresa ativa
-        return user.companies.filter(is_active=True).exists()
+        return bool(company_ids)
     
     # Verifica se o usuário está associado à empresa específica
-    if user.companies.filter(id=company.id, is_active=True).exists():
+    if company.id in company_ids:
         return True
     
     return Response(
@@ -31,11 +63,11 @@ def get_user_companies(user):
     Retorna todas as empresas ativas associadas ao usuário.
     Para superusers, retorna todas as empresas ativas do sistema.
     """
+    from apps.core.models import Company
     if user.is_superuser:
-        from apps.core.models import Company
         return Company.objects.filter(is_active=True)
-    
-    return user.companies.filter(is_active=True)
+
+    return Company.objects.filter(pk__in=_active_company_ids(user))
 
 
 def user_can_access_evaluation(user, evaluation):
@@ -45,4 +77,4 @@ def user_can_access_evaluation(user, evaluation):
     if user.is_superuser:
         return True
     
-    return user.companies.filter(id=evaluation.company.id, is_active=True).exists()
+    return evaluation.company_id in _active_company_ids(user)
@@ -3,27 +3,23 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.contrib.auth.models import User, Group
 from django.db.models import Q
 from .serializers import UserProfileSerializer, CustomLoginSerializer, UserSerializer, UserUpdateSerializer, GroupSerializer, UserGroupSerializer
 from apps.core.serializers import CompanySerializer
+from apps.core.tenancy import polo_company_ids
 from django.contrib.auth import authenticate
 from django.shortcuts import get_object_or_404
-from rest_framework.pagination import PageNumberPagination
+from apps.core.pagination import CursorOrPageNumberPagination
 from apps.users.utils.domain_utils import associate_user_with_company_by_domain
+from .authorization import add_snapshot
 import logging
 
 logger = logging.getLogger(__name__)
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = UserProfileSerializer
@@ -78,7 +74,7 @@ class CustomLoginView(APIView):
                 companies_data = CompanySerializer(companies, many=True).data
 
                 refresh = RefreshToken.for_user(user)
-                access_token = str(refresh.access_token)
+                access_token = str(add_snapshot(refresh.access_token, user))
 
                 response_data = {
                     'token': access_token,
@@ -142,6 +138,7 @@ class CustomTokenRefreshView(TokenRefreshView):
             raise InvalidToken(e.args[0])
 
         response_data = serializer.validated_data
+        response_data['access'] = str(add_snapshot(AccessToken(response_data['access']), user))
         response = Response(response_data, status=status.HTTP_200_OK)
 
         new_refresh_token = response_data.get('refresh')
@@ -158,9 +155,10 @@ class CustomTokenRefreshView(TokenRefreshView):
 
 class UserListView(APIView):
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ('id',)
  
     def get(self, request):
-        pagination_class = StandardResultsSetPagination()
+        pagination_class = CursorOrPageNumberPagination()
         users = User.objects.all()
         
         # Verificar o tipo de filtro primeiro
@@ -171,7 +169,7 @@ class UserListView(APIView):
             pole_id = request.headers.get('X-Polo-Id')
             if pole_id:
                 users = users.filter(
-                    Q(companies__poles__id=pole_id) |  # usuários de empresas do polo
+                    Q(companies__id__in=polo_company_ids(request, pole_id)) |  # usuários de empresas do polo
                     Q(poles__id=pole_id)
                 )
 
@@ -193,10 +191,10 @@ class UserListView(APIView):
                 Q(companies__name__icontains=search)
             )
 
-        users = users.distinct()
+        users = UserSerializer.optimize_queryset(users.distinct().order_by('id'), request)
 
-        paginated_users = pagination_class.paginate_queryset(users, request)
-        serializer = UserSerializer(paginated_users, many=True)
+        paginated_users = pagination_class.paginate_queryset(users, request, view=self)
+        serializer = UserSerializer(paginated_users, many=True, context={'request': request})
         return pagination_class.get_paginated_response(serializer.data)
 
 
@@ -204,8 +202,8 @@ class UserDetailView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, user_id):
-        user = get_object_or_404(User, id=user_id)
-        serializer = UserSerializer(user)
+        user = get_object_or_404(UserSerializer.optimize_queryset(User.objects.all(), request), id=user_id)
+        serializer = UserSerializer(user, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
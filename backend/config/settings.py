@@ -36,8 +36,10 @@ ALLOWED_HOSTS = config('ALLOWED_HOSTS', cast=Csv())
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # JWT emitido pelo login primeiro (HMAC, sem rede); tokens do ADFS já validados vêm de cache
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'django_auth_adfs.rest_framework.AdfsAccessTokenAuthentication',
+        'apps.users.authentication.LenientJWTAuthentication',
+        'apps.users.authentication.CachedAdfsAccessTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -87,6 +89,7 @@ INSTALLED_APPS = [
     'apps.core',
     'apps.rem',
     'apps.users',
+    'apps.jobs',
     'django_auth_adfs',
 ]
 
@@ -212,4 +215,64 @@ LOGGING = {
             'propagate': False,
         },
     },
-}
\ No newline at end of file
+}
+
+# Cache compartilhado entre processos: configure CACHE_BACKEND/CACHE_LOCATION com Redis, Memcached
+# ou banco (DatabaseCache); o padrão em memória vale apenas para o processo atual
+CACHE_BACKEND = config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+CACHE_LOCATION = config('CACHE_LOCATION', default='')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+    },
+    # Usuários resolvidos no login ADFS (apps.users.user_cache): expiram após USER_CACHE_TTL segundos
+    'users': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION or 'users',
+        'KEY_PREFIX': 'users',
+        'TIMEOUT': config('USER_CACHE_TTL', default=300, cast=int),
+        # Redis e Memcached limitam pela própria política LRU (maxmemory); os demais pelo número de entradas
+        'OPTIONS': {} if 'redis' in CACHE_BACKEND or 'memcached' in CACHE_BACKEND else {
+            'MAX_ENTRIES': config('USER_CACHE_MAX_ENTRIES', default=5000, cast=int),
+        },
+    },
+}
+# Usuários (is_active inclusive) e versões de autorização precisam ser os mesmos em todos os workers
+CACHE_IS_SHARED = not CACHE_BACKEND.endswith(('LocMemCache', 'DummyCache'))
+if ENVIRONMENT == 'production' and not CACHE_IS_SHARED:
+    raise ValueError("CACHE_BACKEND must be a shared cache (Redis, Memcached or DatabaseCache) in production.")
+# Contadores de acertos/falhas do cache de usuários (comando user_cache_stats): custam duas
+# operações extras no cache a cada consulta, por isso ficam desligados por padrão
+USER_CACHE_STATS = config('USER_CACHE_STATS', default=False, cast=bool)
+
+# Tokens do ADFS já validados mantidos em memória (por processo) até o exp
+ADFS_TOKEN_CACHE_SIZE = config('ADFS_TOKEN_CACHE_SIZE', default=2048, cast=int)
+# Token assinado por chave desconhecida recarrega as chaves do ADFS no máximo uma vez neste intervalo (segundos)
+ADFS_KEYS_REFRESH_INTERVAL = config('ADFS_KEYS_REFRESH_INTERVAL', default=300, cast=int)
+
+# Exportação em lote: 0 usa todos os núcleos; 1 renderiza sem pool de processos
+EXPORT_BATCH_WORKERS = config('EXPORT_BATCH_WORKERS', default=0, cast=int)
+
+# Cache em disco das exportações PDF/XLSX (MEDIA_ROOT/export_cache); 0 desliga o cache
+EXPORT_CACHE_MAX_SIZE = config('EXPORT_CACHE_MAX_SIZE', default=512 * 1024 * 1024, cast=int)
+
+# Busca de empresas: 'prefix' (índice de Company.search_key) ou 'fulltext' (FTS5/SQL Server,
+# encontra qualquer palavra; requer o comando setup_company_search)
+COMPANY_SEARCH_BACKEND = config('COMPANY_SEARCH_BACKEND', default='prefix')
+
+# Linhas lidas do banco por lote nas listagens com ?stream=true
+STREAM_CHUNK_SIZE = config('STREAM_CHUNK_SIZE', default=500, cast=int)
+
+# Resumos dos polos: as alterações marcam as chaves e a tarefa core.refresh_summaries roda
+# após este intervalo (segundos), recalculando de uma vez tudo o que foi marcado nele
+POLO_SUMMARY_REFRESH_DELAY = config('POLO_SUMMARY_REFRESH_DELAY', default=5, cast=int)
+# A tarefa só roda com o comando run_workers ativo; sem worker, False recalcula os resumos
+# no commit da própria requisição
+POLO_SUMMARY_REFRESH_ASYNC = config('POLO_SUMMARY_REFRESH_ASYNC', default=True, cast=bool)
+
+# Fila de tarefas em segundo plano (apps.jobs, comando run_workers)
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', default=3, cast=int)
+JOBS_BACKOFF_BASE = config('JOBS_BACKOFF_BASE', default=30, cast=int)  # segundos; dobra a cada tentativa
+JOBS_MAX_BACKOFF = config('JOBS_MAX_BACKOFF', default=3600, cast=int)
+JOBS_LOCK_TIMEOUT = config('JOBS_LOCK_TIMEOUT', default=3600, cast=int)  # RUNNING há mais tempo volta para a fila
@@ -9,6 +9,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('apps.core.urls')),
     path('api/users/', include('apps.users.urls')),
+    path('api/jobs/', include('apps.jobs.urls')),
 
     path('api-auth/', include('rest_framework.urls')),
     path('api/', include('apps.rem.urls')),